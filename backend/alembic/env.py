@@ -23,12 +23,13 @@ from app.models.remito import Remito
 from app.models.pedido_listo import PedidoListo
 from app.models.ruta import Ruta, RutaParada, RutaExcluido
 from app.models.geo_cache import GeoCache
-from app.models.historico import HistoricoEntregado
+from app.models.historico import HistoricoEntregado, HistoricoResumenMensual
 from app.models.audit_log import AuditLog
 from app.models.billing import BillingTrace
 from app.models.config import ConfigRuta
 from app.models.usuario import Usuario
 from app.models.distance_cache import DistanceMatrixCache
+from app.models.travel_zone import TravelZoneParam
 
 config = context.config
 
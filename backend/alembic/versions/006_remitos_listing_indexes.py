@@ -0,0 +1,38 @@
+"""006 indexes for remitos listing (keyset + trigram search)
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 00:00:00.000000
+
+Índices para GET /remitos:
+- (fecha_ingreso DESC, id DESC) para paginación keyset.
+- GIN pg_trgm sobre numero y cliente para los ILIKE '%q%'.
+"""
+from alembic import op
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_remitos_fecha_ingreso_id "
+        "ON remitos (fecha_ingreso DESC, id DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_remitos_numero_trgm "
+        "ON remitos USING gin (numero gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_remitos_cliente_trgm "
+        "ON remitos USING gin (cliente gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_remitos_cliente_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_remitos_numero_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_remitos_fecha_ingreso_id")
@@ -0,0 +1,38 @@
+"""007 indexes for the dashboard aggregate
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 00:00:00.000000
+
+Índices para la consulta única de /dashboard:
+- historico_entregados (fecha_entregado) para el rango de entregas de hoy.
+- rutas (fecha, id DESC) para la última ruta del día.
+- ruta_paradas (ruta_id, estado) para contar paradas entregadas.
+"""
+from alembic import op
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_historico_fecha_entregado "
+        "ON historico_entregados (fecha_entregado)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_rutas_fecha_id "
+        "ON rutas (fecha, id DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_ruta_paradas_ruta_id_estado "
+        "ON ruta_paradas (ruta_id, estado)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_ruta_paradas_ruta_id_estado")
+    op.execute("DROP INDEX IF EXISTS ix_rutas_fecha_id")
+    op.execute("DROP INDEX IF EXISTS ix_historico_fecha_entregado")
@@ -0,0 +1,38 @@
+"""008 historico_resumen_mensual
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 00:00:00.000000
+
+Tabla de resúmenes mensuales que escribe el cierre mensual: entregas,
+urgentes, prioridad y lead time promedio por mes, carrier y localidad.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "historico_resumen_mensual",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("mes_cierre", sa.String(7), nullable=False),
+        sa.Column("dimension", sa.String(20), nullable=False),
+        sa.Column("valor", sa.String(200), nullable=False, server_default=""),
+        sa.Column("entregas", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("urgentes", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("prioridad", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("lead_time_promedio_min", sa.Float),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("NOW()")),
+        sa.UniqueConstraint(
+            "mes_cierre", "dimension", "valor", name="uq_historico_resumen_mes_dim_valor"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("historico_resumen_mensual")
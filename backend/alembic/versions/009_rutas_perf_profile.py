@@ -0,0 +1,25 @@
+"""009 rutas.perf_profile
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 00:00:00.000000
+
+Perfil de generate_route (tiempos por etapa y contadores) guardado junto
+a config_snapshot.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("rutas", sa.Column("perf_profile", postgresql.JSONB, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("rutas", "perf_profile")
@@ -0,0 +1,29 @@
+"""010 negative entries in geo_cache
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 00:00:00.000000
+
+Entradas negativas de geocodificación: lat/lng pasan a nullable y
+negative_reason guarda el motivo (no_result, out_of_bbox, city_centroid).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("geo_cache", sa.Column("negative_reason", sa.String(30), nullable=True))
+    op.alter_column("geo_cache", "lat", existing_type=sa.Float, nullable=True)
+    op.alter_column("geo_cache", "lng", existing_type=sa.Float, nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM geo_cache WHERE negative_reason IS NOT NULL")
+    op.alter_column("geo_cache", "lng", existing_type=sa.Float, nullable=False)
+    op.alter_column("geo_cache", "lat", existing_type=sa.Float, nullable=False)
+    op.drop_column("geo_cache", "negative_reason")
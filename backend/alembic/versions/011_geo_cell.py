@@ -0,0 +1,48 @@
+"""011 geo_cell en remitos y ruta_paradas
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 00:00:00.000000
+
+Columna generada con la celda de la grilla espacial (core/spatial_grid.py:
+0.01° sobre el bbox de Mendoza, 150 × 150) para prefiltrar por zona.
+La expresión queda fija acá: si cambia la grilla, va en otra migración.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def _cell_sql(lat: str, lng: str) -> str:
+    return (
+        f"CASE WHEN {lat} BETWEEN -33.5 AND -32.0 AND {lng} BETWEEN -69.5 AND -68.0 THEN "
+        f"LEAST(149, floor(({lat} - (-33.5)) / 0.01)::int) * 150 "
+        f"+ LEAST(149, floor(({lng} - (-69.5)) / 0.01)::int) END"
+    )
+
+
+def upgrade() -> None:
+    op.add_column(
+        "remitos",
+        sa.Column("geo_cell", sa.Integer, sa.Computed(_cell_sql("lat", "lng"), persisted=True)),
+    )
+    op.create_index("ix_remitos_geo_cell", "remitos", ["geo_cell"])
+    op.add_column(
+        "ruta_paradas",
+        sa.Column(
+            "geo_cell", sa.Integer,
+            sa.Computed(_cell_sql("lat_snapshot", "lng_snapshot"), persisted=True),
+        ),
+    )
+    op.create_index("ix_ruta_paradas_geo_cell", "ruta_paradas", ["geo_cell"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ruta_paradas_geo_cell", table_name="ruta_paradas")
+    op.drop_column("ruta_paradas", "geo_cell")
+    op.drop_index("ix_remitos_geo_cell", table_name="remitos")
+    op.drop_column("remitos", "geo_cell")
@@ -0,0 +1,32 @@
+"""012 travel_zone_params
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 00:00:00.000000
+
+Parámetros del modelo de viaje por zonas (core/travel_model.py) usado como
+fallback de la matriz. Vacía = defaults del código; se llena con
+scripts/fit_travel_model.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "travel_zone_params",
+        sa.Column("zona", sa.String(30), primary_key=True),
+        sa.Column("speed_kmh", sa.Float, nullable=False),
+        sa.Column("road_factor", sa.Float, nullable=False),
+        sa.Column("samples", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("fitted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("travel_zone_params")
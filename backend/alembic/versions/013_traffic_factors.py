@@ -0,0 +1,42 @@
+"""013 factores de tráfico por franja en config_ruta
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 00:00:00.000000
+
+Los factores por franja horaria (core/time_buckets.py) van en config_ruta,
+en 1.0 hasta calibrarlos con scripts/fit_travel_model.py. distance_matrix_cache
+no cambia: ningún proveedor recibe hora de salida, el cache guarda sólo
+flujo libre.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "013"
+down_revision = "012"
+branch_labels = None
+depends_on = None
+
+TRAFFIC_DEFAULTS = [
+    ("factor_trafico_am_pico", "1.0", "float", "Factor de tráfico 07-11 sobre el flujo libre"),
+    ("factor_trafico_mediodia", "1.0", "float", "Factor de tráfico 11-14 sobre el flujo libre"),
+    ("factor_trafico_pm", "1.0", "float", "Factor de tráfico 14-21 sobre el flujo libre"),
+]
+
+
+def upgrade() -> None:
+    for key, value, tipo, desc in TRAFFIC_DEFAULTS:
+        op.execute(
+            sa.text(
+                "INSERT INTO config_ruta (key, value, tipo, descripcion) "
+                "VALUES (:key, :value, :tipo, :desc) ON CONFLICT (key) DO NOTHING"
+            ).bindparams(key=key, value=value, tipo=tipo, desc=desc)
+        )
+
+
+def downgrade() -> None:
+    op.execute(
+        sa.text("DELETE FROM config_ruta WHERE key IN :keys").bindparams(
+            sa.bindparam("keys", [k for k, *_ in TRAFFIC_DEFAULTS], expanding=True)
+        )
+    )
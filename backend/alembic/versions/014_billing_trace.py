@@ -0,0 +1,44 @@
+"""014 billing_traces → billing_trace
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19 00:00:00.000000
+
+001 creó la tabla como billing_traces y sin las columnas que usan
+models/billing.py y billing_service.track(): el insert en lote fallaba en
+toda base armada con alembic. Se renombra y se completan las columnas.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "014"
+down_revision = "013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.rename_table("billing_traces", "billing_trace")
+    op.execute("ALTER SEQUENCE billing_traces_id_seq RENAME TO billing_trace_id_seq")
+    op.execute("ALTER INDEX billing_traces_pkey RENAME TO billing_trace_pkey")
+    op.alter_column("billing_trace", "id", type_=sa.BigInteger)
+    op.execute("ALTER SEQUENCE billing_trace_id_seq AS bigint")
+    op.add_column("billing_trace", sa.Column("response_code", sa.Integer))
+    op.add_column("billing_trace", sa.Column("latency_ms", sa.Integer))
+    op.add_column("billing_trace", sa.Column("url_length", sa.Integer))
+    op.add_column("billing_trace", sa.Column("metadata", postgresql.JSONB))
+    # Presupuesto diario del refresco de geo_cache (geocode_refresher._calls_today)
+    op.create_index("ix_billing_trace_stage_created", "billing_trace", ["stage", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_billing_trace_stage_created", table_name="billing_trace")
+    op.drop_column("billing_trace", "metadata")
+    op.drop_column("billing_trace", "url_length")
+    op.drop_column("billing_trace", "latency_ms")
+    op.drop_column("billing_trace", "response_code")
+    op.alter_column("billing_trace", "id", type_=sa.Integer)
+    op.execute("ALTER INDEX billing_trace_pkey RENAME TO billing_traces_pkey")
+    op.execute("ALTER SEQUENCE billing_trace_id_seq RENAME TO billing_traces_id_seq")
+    op.rename_table("billing_trace", "billing_traces")
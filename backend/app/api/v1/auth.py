@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status, Path
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.dependencies import get_db, get_current_user, require_admin
+from app.dependencies import get_db, get_current_user, require_admin, invalidate_principal
 from app.models.usuario import Usuario
 from app.schemas.auth import (
     LoginRequest, TokenResponse, UserCreate, UserResponse,
@@ -74,8 +74,11 @@ async def change_password(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contraseña actual incorrecta",
         )
-    current_user.password_hash = hash_password(body.new_password)
+    # current_user puede venir del cache de principals (detached): modificar la fila de esta sesión
+    user = await db.get(Usuario, current_user.id)
+    user.password_hash = hash_password(body.new_password)
     await db.commit()
+    invalidate_principal(user.id)
     return OkResponse(message="Contraseña actualizada correctamente")
 
 
@@ -128,5 +131,6 @@ async def update_user(
     if body.activo is not None:
         user.activo = body.activo
     await db.commit()
+    invalidate_principal(user.id)
     await db.refresh(user)
     return user
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, distinct
+from sqlalchemy import select, func, distinct, or_
 
 from app.dependencies import get_db, get_current_user, require_admin
 from app.models.billing import BillingTrace
 from app.models.usuario import Usuario
 from app.schemas.common import PaginatedResponse
+from app.services import billing_service
 from typing import Optional
 
 router = APIRouter(prefix="/billing", tags=["billing"])
@@ -40,6 +41,8 @@ async def list_billing(
             "sku": b.sku,
             "units": b.units,
             "estimated_cost": b.estimated_cost,
+            "response_code": b.response_code,
+            "latency_ms": b.latency_ms,
             "created_at": str(b.created_at) if b.created_at else None,
         } for b in items],
         total=total,
@@ -49,11 +52,19 @@ async def list_billing(
     )
 
 
+@router.get("/health")
+async def billing_health(current_user: Usuario = Depends(get_current_user)):
+    """Estado del write-behind de trazas en este worker (flush fallidos, descartes)."""
+    return billing_service.stats()
+
+
 @router.get("/summary")
 async def billing_summary(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
+    p50 = func.percentile_cont(0.5).within_group(BillingTrace.latency_ms)
+    p95 = func.percentile_cont(0.95).within_group(BillingTrace.latency_ms)
     result = await db.execute(
         select(
             BillingTrace.service,
@@ -61,11 +72,29 @@ async def billing_summary(
             func.sum(BillingTrace.estimated_cost).label("total_cost"),
             func.sum(BillingTrace.units).label("total_units"),
             func.count().label("calls"),
+            p50.label("p50_ms"),
+            p95.label("p95_ms"),
         )
         .group_by(BillingTrace.service, BillingTrace.sku)
         .order_by(func.sum(BillingTrace.estimated_cost).desc())
     )
     rows = result.all()
+
+    # Latencia por proveedor (todas las skus juntas)
+    latency_rows = (await db.execute(
+        select(
+            BillingTrace.service,
+            func.count().label("calls"),
+            func.count().filter(
+                or_(BillingTrace.response_code == 0, BillingTrace.response_code >= 400)
+            ).label("errors"),
+            p50.label("p50_ms"),
+            p95.label("p95_ms"),
+        )
+        .group_by(BillingTrace.service)
+        .order_by(BillingTrace.service)
+    )).all()
+
     grand_total = sum(r.total_cost or 0 for r in rows)
     return {
         "grand_total_usd": round(grand_total, 6),
@@ -76,7 +105,23 @@ async def billing_summary(
                 "total_cost_usd": round(r.total_cost or 0, 6),
                 "total_units": r.total_units,
                 "calls": r.calls,
+                "p50_ms": _ms(r.p50_ms),
+                "p95_ms": _ms(r.p95_ms),
             }
             for r in rows
-        ]
+        ],
+        "latency_by_service": [
+            {
+                "service": r.service,
+                "calls": r.calls,
+                "errors": r.errors,
+                "p50_ms": _ms(r.p50_ms),
+                "p95_ms": _ms(r.p95_ms),
+            }
+            for r in latency_rows
+        ],
     }
+
+
+def _ms(value) -> Optional[float]:
+    return round(float(value), 1) if value is not None else None
@@ -10,7 +10,7 @@ from app.schemas.carrier import (
     CarrierDetectRequest, CarrierDetectResponse
 )
 from app.schemas.common import OkResponse
-from app.services.carrier_service import detect
+from app.services.carrier_service import detect, invalidate_rules
 from app.core.exceptions import not_found, bad_request
 
 router = APIRouter(prefix="/carriers", tags=["carriers"])
@@ -42,6 +42,7 @@ async def create_carrier(body: CarrierCreate, db: AsyncSession = Depends(get_db)
     )
     db.add(carrier)
     await db.commit()
+    invalidate_rules()
     await db.refresh(carrier)
     return carrier
 
@@ -72,6 +73,7 @@ async def update_carrier(
     for field, value in body.model_dump(exclude_unset=True).items():
         setattr(carrier, field, value)
     await db.commit()
+    invalidate_rules()
     await db.refresh(carrier)
     return carrier
 
@@ -84,6 +86,7 @@ async def delete_carrier(carrier_id: int = Path(...), db: AsyncSession = Depends
         raise not_found("Carrier")
     await db.delete(carrier)
     await db.commit()
+    invalidate_rules()
     return OkResponse(message=f"Carrier {carrier_id} eliminado")
 
 
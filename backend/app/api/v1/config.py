@@ -8,6 +8,7 @@ from app.models.usuario import Usuario
 from app.schemas.config import ConfigRutaResponse, ConfigRutaUpdate
 from app.schemas.common import OkResponse
 from app.core.exceptions import not_found
+from app.services import config_service
 
 router = APIRouter(prefix="/config", tags=["config"])
 
@@ -28,6 +29,9 @@ DEFAULT_CONFIG = {
     "dm_block_size": ("10", "int", "Tamaño de bloque para matriz de distancias"),
     "geocode_cache_days": ("30", "int", "Días de validez para caché de geocodificación"),
     "max_remitos_ruta": ("40", "int", "Máximo de remitos por ruta"),
+    "factor_trafico_am_pico": ("1.0", "float", "Factor de tráfico 07-11 sobre el flujo libre"),
+    "factor_trafico_mediodia": ("1.0", "float", "Factor de tráfico 11-14 sobre el flujo libre"),
+    "factor_trafico_pm": ("1.0", "float", "Factor de tráfico 14-21 sobre el flujo libre"),
 }
 
 
@@ -65,6 +69,7 @@ async def update_config(
         raise not_found(f"Config '{key}'")
     cfg.value = body.value
     await db.commit()
+    config_service.invalidate()
     await db.refresh(cfg)
     return cfg
 
@@ -81,4 +86,5 @@ async def reset_config(db: AsyncSession = Depends(get_db)):
             cfg = ConfigRuta(key=key, value=value, tipo=tipo, descripcion=desc)
             db.add(cfg)
     await db.commit()
+    config_service.invalidate()
     return OkResponse(message="Configuración restaurada a valores default")
@@ -1,21 +1,27 @@
 """
 Router de dashboard: KPIs y estadísticas del día.
 """
-from datetime import date, datetime, timezone
+from datetime import date, timedelta
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, and_, or_, true, cast, Date
 
 from app.dependencies import get_db, get_current_user
 from app.models.remito import Remito, RemitoEstadoClasificacion, RemitoEstadoLifecycle
 from app.models.ruta import Ruta, RutaParada
 from app.models.historico import HistoricoEntregado
 from app.models.usuario import Usuario
+from app.core.ttl_cache import TTLCache
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
+# Todas las pestañas abiertas hacen polling de /dashboard: unos segundos de
+# desfase son aceptables y evitan repetir la agregación por request.
+_dashboard_cache = TTLCache(ttl_seconds=5, maxsize=4)
+
+
 @router.get("/")
 async def dashboard(
     db: AsyncSession = Depends(get_db),
@@ -23,74 +29,100 @@ async def dashboard(
 ):
     """KPIs principales del sistema."""
     today = date.today()
-    mes_actual = today.strftime("%Y-%m")
+    return await _dashboard_cache.get_or_compute(today, lambda: _compute_dashboard(db, today))
 
-    # Remitos activos por estado de clasificación
-    clasificacion_rows = await db.execute(
-        select(Remito.estado_clasificacion, func.count(Remito.id))
-        .group_by(Remito.estado_clasificacion)
-    )
-    clasificacion = {k: v for k, v in clasificacion_rows.all()}
 
-    # Remitos activos por lifecycle
-    lifecycle_rows = await db.execute(
-        select(Remito.estado_lifecycle, func.count(Remito.id))
-        .group_by(Remito.estado_lifecycle)
+async def _compute_dashboard(db: AsyncSession, today: date) -> dict:
+    """
+    Todos los KPIs en una sola consulta: conteos de remitos por
+    (clasificación, lifecycle) con FILTER, la última ruta del día con sus
+    paradas entregadas, y los conteos del histórico. Las entregas de hoy se
+    filtran por rango sobre fecha_entregado (no date(...)) para usar el índice;
+    el cast a date respeta la zona horaria de la sesión igual que date().
+    """
+    mes_actual = today.strftime("%Y-%m")
+    manana = today + timedelta(days=1)
+
+    counts = (
+        select(
+            Remito.estado_clasificacion.label("clasificacion"),
+            Remito.estado_lifecycle.label("lifecycle"),
+            func.count().label("n"),
+            func.count().filter(Remito.es_urgente.is_(True)).label("urgentes"),
+            func.count().filter(Remito.es_prioridad.is_(True)).label("prioridad"),
+        )
+        .group_by(Remito.estado_clasificacion, Remito.estado_lifecycle)
+        .cte("counts")
     )
-    lifecycle = {k: v for k, v in lifecycle_rows.all()}
 
-    # Remitos urgentes y prioridad activos
-    urgentes = (await db.execute(
-        select(func.count(Remito.id)).where(
-            Remito.es_urgente == True,
-            Remito.estado_lifecycle != RemitoEstadoLifecycle.historico.value,
+    completadas = (
+        select(func.count(RutaParada.id))
+        .where(RutaParada.ruta_id == Ruta.id, RutaParada.estado == "entregada")
+        .scalar_subquery()
+    )
+    ruta = (
+        select(
+            Ruta.id.label("ruta_id"),
+            Ruta.estado.label("ruta_estado"),
+            Ruta.total_paradas,
+            completadas.label("paradas_completadas"),
+            Ruta.total_excluidos,
+            Ruta.duracion_estimada_min,
+            Ruta.distancia_total_km,
         )
-    )).scalar_one()
+        .where(Ruta.fecha == today)
+        .order_by(Ruta.id.desc())
+        .limit(1)
+        .cte("ruta_hoy")
+    )
 
-    prioridad = (await db.execute(
-        select(func.count(Remito.id)).where(
-            Remito.es_prioridad == True,
-            Remito.estado_lifecycle != RemitoEstadoLifecycle.historico.value,
+    es_hoy = and_(
+        HistoricoEntregado.fecha_entregado >= cast(today, Date),
+        HistoricoEntregado.fecha_entregado < cast(manana, Date),
+    )
+    es_mes = HistoricoEntregado.mes_cierre == mes_actual
+    hist = (
+        select(
+            func.count().filter(es_hoy).label("entregas_hoy"),
+            func.count().filter(es_mes).label("entregas_mes_actual"),
         )
-    )).scalar_one()
+        .where(or_(es_hoy, es_mes))
+        .cte("hist")
+    )
 
-    # Ruta del día
-    ruta_hoy = (await db.execute(
-        select(Ruta).where(Ruta.fecha == today).order_by(Ruta.id.desc()).limit(1)
-    )).scalar_one_or_none()
+    # hist siempre devuelve una fila; ruta y counts se unen con LEFT JOIN ON true
+    rows = (await db.execute(
+        select(hist, ruta, counts)
+        .select_from(hist)
+        .outerjoin(ruta, true())
+        .outerjoin(counts, true())
+    )).mappings().all()
+
+    first = rows[0]
+    clasificacion: dict[str, int] = {}
+    lifecycle: dict[str, int] = {}
+    urgentes = prioridad = 0
+    for r in rows:
+        if r["n"] is None:
+            continue
+        clasificacion[r["clasificacion"]] = clasificacion.get(r["clasificacion"], 0) + r["n"]
+        lifecycle[r["lifecycle"]] = lifecycle.get(r["lifecycle"], 0) + r["n"]
+        if r["lifecycle"] != RemitoEstadoLifecycle.historico.value:
+            urgentes += r["urgentes"]
+            prioridad += r["prioridad"]
 
     ruta_info = None
-    if ruta_hoy:
-        paradas_completadas = (await db.execute(
-            select(func.count(RutaParada.id)).where(
-                RutaParada.ruta_id == ruta_hoy.id,
-                RutaParada.estado == "entregada",
-            )
-        )).scalar_one()
+    if first["ruta_id"] is not None:
         ruta_info = {
-            "id": ruta_hoy.id,
-            "estado": ruta_hoy.estado,
-            "total_paradas": ruta_hoy.total_paradas,
-            "paradas_completadas": paradas_completadas,
-            "total_excluidos": ruta_hoy.total_excluidos,
-            "duracion_estimada_min": ruta_hoy.duracion_estimada_min,
-            "distancia_total_km": ruta_hoy.distancia_total_km,
+            "id": first["ruta_id"],
+            "estado": first["ruta_estado"],
+            "total_paradas": first["total_paradas"],
+            "paradas_completadas": first["paradas_completadas"],
+            "total_excluidos": first["total_excluidos"],
+            "duracion_estimada_min": first["duracion_estimada_min"],
+            "distancia_total_km": first["distancia_total_km"],
         }
 
-    # Histórico del mes actual
-    historico_mes = (await db.execute(
-        select(func.count(HistoricoEntregado.id)).where(
-            HistoricoEntregado.mes_cierre == mes_actual
-        )
-    )).scalar_one()
-
-    # Entregas hoy (en histórico con fecha_entregado = hoy)
-    entregados_hoy = (await db.execute(
-        select(func.count(HistoricoEntregado.id)).where(
-            func.date(HistoricoEntregado.fecha_entregado) == today
-        )
-    )).scalar_one()
-
     return {
         "fecha": str(today),
         "mes": mes_actual,
@@ -106,8 +138,8 @@ async def dashboard(
         },
         "ruta_hoy": ruta_info,
         "historico": {
-            "entregas_hoy": entregados_hoy,
-            "entregas_mes_actual": historico_mes,
+            "entregas_hoy": first["entregas_hoy"],
+            "entregas_mes_actual": first["entregas_mes_actual"],
         },
     }
 
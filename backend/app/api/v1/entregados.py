@@ -3,7 +3,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependencies import get_db, get_current_user, require_operador
 from app.models.usuario import Usuario
-from app.services.delivery_service import mark_entregado, move_to_historico, scan_qr
+from app.services.delivery_service import (
+    BulkDeliveryResult, mark_entregado, move_to_historico, scan_qr,
+)
 from app.schemas.common import OkResponse
 
 router = APIRouter(prefix="/entregados", tags=["entregados"])
@@ -27,8 +29,8 @@ async def marcar_entregados(
 ):
     """Marca remitos como entregados. body: {ids: [int]} o {remito_ids: [int]}"""
     ids = body.get("ids") or body.get("remito_ids", [])
-    count = await mark_entregado(db, ids)
-    return OkResponse(message=f"{count} remitos marcados como entregados")
+    result = await mark_entregado(db, ids)
+    return OkResponse(message=_bulk_message(result, "marcados como entregados"))
 
 
 @router.post("/procesar", response_model=OkResponse)
@@ -39,5 +41,12 @@ async def procesar_entregados(
 ):
     """Mueve remitos entregados al histórico. body: {ids: [int]} o {remito_ids: [int]}"""
     ids = body.get("ids") or body.get("remito_ids", [])
-    count = await move_to_historico(db, ids)
-    return OkResponse(message=f"{count} remitos movidos al histórico")
+    result = await move_to_historico(db, ids)
+    return OkResponse(message=_bulk_message(result, "movidos al histórico"))
+
+
+def _bulk_message(result: BulkDeliveryResult, accion: str) -> str:
+    msg = f"{result.procesados} remitos {accion}"
+    if result.no_encontrados:
+        msg += f" ({len(result.no_encontrados)} no encontrados: {result.no_encontrados})"
+    return msg
@@ -7,11 +7,15 @@ from app.models.geo_cache import GeoCache
 from app.models.usuario import Usuario
 from app.schemas.geocode import (
     GeocodeRequest, GeocodeResponse, GeocodeValidateRequest,
-    GeocodeValidateResponse, GeocodeStatsResponse, GeocodeBatchRequest
+    GeocodeValidateResponse, GeocodeStatsResponse, GeocodeBatchRequest,
+    GeocodeValidateBatchRequest, GeocodeCheckResult,
 )
 from app.schemas.common import OkResponse
 from app.services.geocode_service import geocode
+from app.services import gazetteer_service, geocode_refresher, geocode_service, provider_health
+from app.core import validators
 from app.core.validators import is_in_mendoza, is_known_city_center
+from app.config import settings
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/geocode", tags=["geocode"])
@@ -79,6 +83,26 @@ async def validate_coords(body: GeocodeValidateRequest, current_user: Usuario =
     return GeocodeValidateResponse(in_bbox=in_bbox, is_city_center=is_center, is_valid=is_valid, message=msg)
 
 
+@router.post("/validate-batch", response_model=list[GeocodeCheckResult])
+async def validate_coords_batch(
+    body: GeocodeValidateBatchRequest, current_user: Usuario = Depends(get_current_user)
+):
+    """Valida un lote de coordenadas: bbox, centro de localidad y distancia al depósito."""
+    lats = [p.lat for p in body.points]
+    lngs = [p.lng for p in body.points]
+    checks = validators.check_batch(
+        lats, lngs,
+        depot=(settings.DEFAULT_DEPOT_LAT, settings.DEFAULT_DEPOT_LNG),
+        max_depot_km=settings.GEOCODE_MAX_DEPOT_KM,
+    )
+    return [
+        GeocodeCheckResult(
+            lat=lat, lng=lng, ok=c.ok, rejection=c.rejection, warnings=c.warnings, depot_km=c.depot_km
+        )
+        for lat, lng, c in zip(lats, lngs, checks)
+    ]
+
+
 @router.get("/cache/stats", response_model=GeocodeStatsResponse)
 async def cache_stats(
     db: AsyncSession = Depends(get_db),
@@ -98,6 +122,30 @@ async def cache_stats(
     return GeocodeStatsResponse(total_entries=total, by_provider=by_provider, expired=expired)
 
 
+@router.get("/providers")
+async def providers_health(current_user: Usuario = Depends(get_current_user)):
+    """Estado del circuit breaker y latencias observadas por proveedor (este worker)."""
+    return provider_health.snapshot()
+
+
+@router.get("/gazetteer")
+async def gazetteer_stats(current_user: Usuario = Depends(get_current_user)):
+    """Tamaño y marcas de carga del gazetteer local (este worker)."""
+    return gazetteer_service.stats()
+
+
+@router.get("/cache/refresher")
+async def refresher_status(current_user: Usuario = Depends(get_current_user)):
+    """Estado del refresco nocturno de entradas por vencer (este worker)."""
+    return geocode_refresher.status()
+
+
+@router.post("/cache/revalidate", dependencies=[Depends(require_admin)])
+async def revalidate_cache(db: AsyncSession = Depends(get_db)):
+    """Pasa a negativas las entradas del caché que hoy no pasan la validación."""
+    return await geocode_service.revalidate_cache(db)
+
+
 @router.delete("/cache", response_model=OkResponse, dependencies=[Depends(require_admin)])
 async def clear_cache(expired_only: bool = Query(True), db: AsyncSession = Depends(get_db)):
     """Limpia la caché de geocodificación."""
@@ -1,14 +1,18 @@
+import os
+
 from fastapi import APIRouter, Depends, Query, Path
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
+from app.database import AsyncSessionLocal
 from app.dependencies import get_db, get_current_user, require_operador
 from app.models.historico import HistoricoEntregado
 from app.models.usuario import Usuario
 from app.schemas.common import PaginatedResponse, OkResponse
 from app.services.delivery_service import restore_from_historico
-from app.services.export_service import export_historico_xlsx, monthly_close
+from app.services.export_service import export_historico_xlsx, iter_historico_csv, monthly_close, get_monthly_summary
 from app.core.exceptions import not_found
 from typing import Optional
 
@@ -49,18 +53,34 @@ async def list_historico(
 @router.get("/export/{mes}")
 async def export_mes(
     mes: str = Path(..., description="YYYY-MM"),
+    formato: str = Query("xlsx", pattern="^(xlsx|csv)$"),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
-    """Exporta el histórico de un mes como XLSX."""
-    data = await export_historico_xlsx(db, mes)
-    return Response(
-        content=data,
+    """Exporta el histórico de un mes como XLSX (default) o CSV."""
+    if formato == "csv":
+        return StreamingResponse(
+            _stream_csv(mes),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f"attachment; filename=historico_{mes}.csv"},
+        )
+
+    path = await export_historico_xlsx(db, mes)
+    return FileResponse(
+        path,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=historico_{mes}.xlsx"}
+        filename=f"historico_{mes}.xlsx",
+        background=BackgroundTask(os.unlink, path),
     )
 
 
+async def _stream_csv(mes: str):
+    # Sesión propia: la de get_db se cierra antes de que termine el streaming
+    async with AsyncSessionLocal() as db:
+        async for chunk in iter_historico_csv(db, mes):
+            yield chunk
+
+
 @router.post("/restaurar/{historico_id}", response_model=OkResponse)
 async def restaurar(
     historico_id: int = Path(...),
@@ -77,11 +97,24 @@ async def cierre_mensual(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(require_operador)
 ):
-    """Ejecuta el cierre mensual: reporta registros del mes anterior."""
+    """Ejecuta el cierre mensual del mes anterior: calcula y guarda su resumen."""
     count = await monthly_close(db)
     return OkResponse(ok=True, message=f"Cierre mensual completado: {count} remitos archivados")
 
 
+@router.get("/resumen/{mes}")
+async def resumen_mes(
+    mes: str = Path(..., description="YYYY-MM"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Resumen precalculado de un mes cerrado (por carrier y localidad)."""
+    resumen = await get_monthly_summary(db, mes)
+    if resumen is None:
+        raise not_found(f"Resumen del mes {mes}")
+    return resumen
+
+
 def _to_dict(h: HistoricoEntregado) -> dict:
     return {
         "id": h.id,
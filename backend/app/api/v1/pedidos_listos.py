@@ -6,9 +6,7 @@ from app.dependencies import get_db, get_current_user, require_operador
 from app.models.pedido_listo import PedidoListo
 from app.models.usuario import Usuario
 from app.schemas.common import OkResponse, PaginatedResponse
-from app.services.pedidos_listos_service import sync_batch
-import csv
-import io
+from app.services.pedidos_listos_service import sync_batch, sync_csv
 
 router = APIRouter(prefix="/pedidos-listos", tags=["pedidos_listos"])
 
@@ -21,8 +19,8 @@ async def sync_pedidos(
 ):
     """Sincroniza datos de Pedidos Listos desde la hoja de cálculo. body: {data: []}"""
     data = body.get("data", [])
-    count = await sync_batch(db, data)
-    return OkResponse(message=f"{count} pedidos sincronizados")
+    result = await sync_batch(db, data)
+    return OkResponse(message=f"{result['total']} pedidos sincronizados")
 
 
 @router.post("/upload-csv", response_model=OkResponse)
@@ -31,13 +29,12 @@ async def upload_csv(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(require_operador)
 ):
-    """Carga datos de pedidos listos desde CSV."""
-    content = await file.read()
-    text = content.decode("utf-8-sig", errors="replace")
-    reader = csv.DictReader(io.StringIO(text))
-    data = [row for row in reader]
-    count = await sync_batch(db, data)
-    return OkResponse(message=f"{count} pedidos cargados desde CSV")
+    """Carga datos de pedidos listos desde CSV (streaming, por chunks)."""
+    result = await sync_csv(db, file.file)
+    return OkResponse(
+        message=f"{result['total']} pedidos cargados desde CSV "
+                f"({result['nuevos']} nuevos, {result['actualizados']} actualizados)"
+    )
 
 
 @router.get("/", response_model=PaginatedResponse)
@@ -1,9 +1,13 @@
+import json
+
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database import AsyncSessionLocal
 from app.dependencies import get_db, get_current_user
 from app.models.usuario import Usuario
-from app.services.delivery_service import scan_qr, mark_entregado, move_to_historico
+from app.services.delivery_service import scan_qr, scan_qr_batch, mark_entregado, move_to_historico
 from app.schemas.common import OkResponse
 from app.core.exceptions import not_found, bad_request
 
@@ -35,19 +39,36 @@ async def scan_post(
     return result
 
 
+# Lotes más grandes que esto se consultan por tramos en modo streaming
+_STREAM_CHUNK = 500
+
+
 @router.post("/scan-batch")
 async def scan_batch(
     body: dict,
+    stream: bool = Query(False, description="Responder NDJSON (una línea por numero)"),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
-    """Escanea múltiples QRs (body: {numeros: [str]})."""
+    """
+    Escanea múltiples QRs (body: {numeros: [str]}).
+    Resultados en el orden de entrada; los no encontrados llevan encontrado=false.
+    Con ?stream=true la respuesta es NDJSON y el lote se resuelve por tramos.
+    """
     numeros = body.get("numeros", [])
-    results = []
-    for numero in numeros:
-        try:
-            r = await scan_qr(db, str(numero).strip())
-            results.append(r)
-        except Exception as e:
-            results.append({"numero": numero, "error": str(e)})
+    if not isinstance(numeros, list):
+        raise bad_request("numeros debe ser una lista")
+
+    if stream:
+        return StreamingResponse(_stream_scan(numeros), media_type="application/x-ndjson")
+
+    results = await scan_qr_batch(db, numeros)
     return {"results": results, "total": len(results)}
+
+
+async def _stream_scan(numeros: list):
+    # Sesión propia: la de get_db se cierra antes de que termine el streaming
+    async with AsyncSessionLocal() as db:
+        for i in range(0, len(numeros), _STREAM_CHUNK):
+            results = await scan_qr_batch(db, numeros[i:i + _STREAM_CHUNK])
+            yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
@@ -1,11 +1,15 @@
 """
 Router de remitos: ingesta, consulta, clasificación y corrección.
 """
+import base64
+import json
+from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Path, Query, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_, literal, any_, or_, and_, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.dependencies import get_db, get_current_user, require_operador
 from app.models.remito import Remito, RemitoEstadoClasificacion, RemitoEstadoLifecycle
@@ -17,11 +21,15 @@ from app.schemas.remito import (
     RemitoResponse, IngestResponse,
 )
 from app.schemas.common import OkResponse, PaginatedResponse
-from app.services import remito_service, geocode_service
-from app.core.exceptions import not_found
+from app.services import remito_service, geocode_service, pending_processor, spatial_service
+from app.core.exceptions import not_found, bad_request
+from app.core.ttl_cache import TTLCache
 
 router = APIRouter(prefix="/remitos", tags=["remitos"])
 
+# Totales de list_remitos por combinación de filtros
+_count_cache = TTLCache(ttl_seconds=30, maxsize=256)
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -35,6 +43,44 @@ async def _resolve_carrier_name(db: AsyncSession, carrier_id: Optional[int]) ->
     return c.nombre_canonico if c else None
 
 
+def _encode_cursor(fecha: Optional[datetime], remito_id: int) -> str:
+    raw = f"{fecha.isoformat() if fecha else ''}|{remito_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[Optional[datetime], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        fecha, remito_id = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(fecha) if fecha else None), int(remito_id)
+    except (ValueError, UnicodeDecodeError):
+        raise bad_request("cursor inválido")
+
+
+async def _count_remitos(db: AsyncSession, stmt, filtros: tuple, total_mode: str) -> int:
+    """count(*) exacto cacheado unos segundos, o la estimación del planner."""
+    key = (total_mode, *filtros)
+    cached = _count_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if total_mode == "estimated":
+        conn = await db.connection()
+        compiled = stmt.compile(dialect=conn.dialect)
+        # Sentencia parametrizada ($1, $2, ...): los filtros del usuario viajan
+        # como parámetros, nunca dentro del SQL
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        total = int(plan[0]["Plan"]["Plan Rows"])
+    else:
+        total = (await db.execute(select(func.count()).select_from(stmt.subquery()))).scalar_one()
+
+    _count_cache.set(key, total)
+    return total
+
+
 def _to_response(r: Remito, carrier_nombre: Optional[str] = None) -> dict:
     return {
         "id": r.id,
@@ -132,37 +178,94 @@ async def list_remitos(
     estado: Optional[str] = Query(None),
     lifecycle: Optional[str] = Query(None),
     q: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (keyset)"),
+    total_mode: str = Query("exact", pattern="^(exact|estimated)$"),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_user),
 ):
-    """Lista remitos con paginación y filtros."""
-    stmt = select(Remito)
+    """
+    Lista remitos con paginación y filtros.
+    Con `cursor` pagina por keyset sobre (fecha_ingreso, id) en lugar de OFFSET;
+    los remitos sin fecha_ingreso van primero (NULLS FIRST, como el índice).
+    `total_mode=estimated` usa la estimación del planner en lugar de count(*).
+    """
+    filtered = select(Remito)
     if estado:
-        stmt = stmt.where(Remito.estado_clasificacion == estado)
+        filtered = filtered.where(Remito.estado_clasificacion == estado)
     if lifecycle:
-        stmt = stmt.where(Remito.estado_lifecycle == lifecycle)
+        filtered = filtered.where(Remito.estado_lifecycle == lifecycle)
     if q:
-        stmt = stmt.where(
+        filtered = filtered.where(
             Remito.numero.ilike(f"%{q}%") | Remito.cliente.ilike(f"%{q}%")
         )
 
-    total_stmt = select(func.count()).select_from(stmt.subquery())
-    total = (await db.execute(total_stmt)).scalar_one()
+    total = await _count_remitos(db, filtered, (estado, lifecycle, q), total_mode)
 
-    stmt = stmt.order_by(Remito.fecha_ingreso.desc()).offset((page - 1) * size).limit(size)
-    rows = (await db.execute(stmt)).scalars().all()
-
-    items = []
-    for r in rows:
-        cn = await _resolve_carrier_name(db, r.carrier_id)
-        items.append(_to_response(r, cn))
+    stmt = (
+        filtered
+        .add_columns(Carrier.nombre_canonico)
+        .outerjoin(Carrier, Carrier.id == Remito.carrier_id)
+        .order_by(Remito.fecha_ingreso.desc().nulls_first(), Remito.id.desc())
+        .limit(size)
+    )
+    if cursor:
+        fecha, last_id = _decode_cursor(cursor)
+        if fecha is None:
+            # Todavía en el tramo sin fecha: el resto de ese tramo y todos los fechados
+            stmt = stmt.where(or_(
+                and_(Remito.fecha_ingreso.is_(None), Remito.id < last_id),
+                Remito.fecha_ingreso.is_not(None),
+            ))
+        else:
+            stmt = stmt.where(tuple_(Remito.fecha_ingreso, Remito.id) < tuple_(fecha, last_id))
+    else:
+        stmt = stmt.offset((page - 1) * size)
+    rows = (await db.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) == size:
+        last = rows[-1][0]
+        next_cursor = _encode_cursor(last.fecha_ingreso, last.id)
 
     return PaginatedResponse(
-        items=items, total=total, page=page, size=size,
+        items=[_to_response(r, cn) for r, cn in rows],
+        total=total, page=page, size=size,
         pages=(total + size - 1) // size,
+        next_cursor=next_cursor,
     )
 
 
+@router.get("/cercanos", response_model=list[dict])
+async def remitos_cercanos(
+    lat: float = Query(...),
+    lng: float = Query(...),
+    radio_km: float = Query(2.0, gt=0, le=50),
+    k: Optional[int] = Query(None, ge=1, le=200, description="Sólo los k más cercanos"),
+    incluir_inactivos: bool = Query(False, description="Buscar también entregados/histórico (en DB)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+):
+    """
+    Remitos cerca de un punto, ordenados por distancia. Por defecto usa el
+    índice en memoria de remitos activos; con incluir_inactivos consulta la
+    tabla prefiltrando por geo_cell.
+    """
+    limit = k or 200
+    if incluir_inactivos:
+        found = await spatial_service.near_sql(db, lat, lng, radio_km, limit)
+    else:
+        near = (await spatial_service.near(db, lat, lng, radio_km, k))[:limit]
+        dist = dict(near)
+        rows = (await db.execute(
+            select(Remito).where(Remito.id == any_(literal(list(dist), type_=ARRAY(Integer))))
+        )).scalars().all() if dist else []
+        found = sorted(((r, dist[r.id]) for r in rows), key=lambda rd: rd[1])
+    return [
+        {**_to_response(r), "distancia_km": round(d, 3)}
+        for r, d in found
+    ]
+
+
 @router.get("/{remito_id}", response_model=dict)
 async def get_remito(
     remito_id: int = Path(...),
@@ -242,7 +345,8 @@ async def corregir_direccion(
     remito.estado_clasificacion = RemitoEstadoClasificacion.pendiente.value
     remito.motivo_clasificacion = "Dirección corregida manualmente"
 
-    await remito_service.process_pipeline(db, remito)
+    # Corrección manual: reintentar proveedores aunque haya un fallo cacheado
+    await remito_service.process_pipeline(db, remito, bypass_negative_geocode_cache=True)
     await db.commit()
     await db.refresh(remito)
     cn = await _resolve_carrier_name(db, remito.carrier_id)
@@ -272,12 +376,20 @@ async def reclasificar(
 
 @router.post("/procesar-pendientes", response_model=OkResponse)
 async def procesar_pendientes(
-    db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(require_operador),
 ):
-    """Lanza el pipeline en todos los remitos con estado 'pendiente'."""
-    count = await remito_service.process_pending(db)
-    return OkResponse(message=f"{count} remitos procesados")
+    """Lanza en background el pipeline sobre todos los remitos 'pendiente'."""
+    if not pending_processor.trigger():
+        return OkResponse(ok=False, message="Ya hay un procesamiento de pendientes en curso")
+    return OkResponse(message="Procesamiento de pendientes iniciado en background")
+
+
+@router.get("/procesar-pendientes/estado", response_model=dict)
+async def procesar_pendientes_estado(
+    current_user: Usuario = Depends(require_operador),
+):
+    """Estado del procesador de pendientes y resultado de la última corrida."""
+    return pending_processor.status()
 
 
 @router.post("/{remito_id}/armar", response_model=dict)
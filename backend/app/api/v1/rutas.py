@@ -16,7 +16,8 @@ from app.schemas.ruta import (
 )
 from app.schemas.common import OkResponse
 from app.services import route_service
-from app.core.exceptions import not_found
+from app.core.exceptions import conflict, not_found
+from app.core.stage_timer import ProfilerBusy
 
 router = APIRouter(prefix="/rutas", tags=["rutas"])
 
@@ -48,6 +49,7 @@ async def _load_ruta_response(db: AsyncSession, ruta: Ruta) -> dict:
         "distancia_total_km": ruta.distancia_total_km,
         "gmaps_links": ruta.gmaps_links or [],
         "config": ruta.config_snapshot or {},
+        "perf_profile": ruta.perf_profile,
         "api_cost_estimate": ruta.api_cost_estimate,
         "created_at": ruta.created_at,
         "paradas": [
@@ -95,12 +97,18 @@ async def _load_ruta_response(db: AsyncSession, ruta: Ruta) -> dict:
 @router.post("/generar", response_model=dict)
 async def generar_ruta(
     body: Optional[RouteConfig] = None,
+    profile: bool = Query(False, description="Incluir cProfile en perf_profile"),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(require_operador),
 ):
     """Genera la ruta del día con todos los remitos en estado 'armado'."""
     config_override = body.model_dump(exclude_none=True) if body else None
-    ruta = await route_service.generate_route(db, config_override=config_override)
+    try:
+        ruta = await route_service.generate_route(
+            db, config_override=config_override, profile=profile
+        )
+    except ProfilerBusy as e:
+        raise conflict(str(e))
     return await _load_ruta_response(db, ruta)
 
 
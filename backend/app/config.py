@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     # Auth
     SECRET_KEY: str = "changeme-use-a-real-secret-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480  # 8 horas
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 15  # 0 = sin cache
     ALGORITHM: str = "HS256"
 
     # API Keys
@@ -22,15 +23,55 @@ class Settings(BaseSettings):
 
     # Geocoding
     GEOCODE_PROVIDER_ORDER: List[str] = ["ors", "mapbox", "google"]
+    GEOCODE_NEGATIVE_CACHE_HOURS: int = 24
+    GEOCODE_HEDGING: bool = False  # disparar el siguiente proveedor si el actual supera su p90
+    GEOCODE_MAX_DEPOT_KM: float = 90.0   # más lejos del depósito → remito a corregir
+    GEOCODE_AGREEMENT_KM: float = 0.5    # discrepancia máxima entre proveedores
+
+    # Refresco en background de entradas de geo_cache por vencer (horario valle en
+    # GEOCODE_REFRESH_TIMEZONE, no en la hora del container)
+    GEOCODE_REFRESH_ENABLED: bool = True
+    GEOCODE_REFRESH_TIMEZONE: str = "America/Argentina/Mendoza"
+    GEOCODE_REFRESH_START_HOUR: int = 1
+    GEOCODE_REFRESH_END_HOUR: int = 6
+    GEOCODE_REFRESH_AHEAD_HOURS: int = 72          # refrescar lo que vence en este plazo
+    GEOCODE_REFRESH_DAILY_BUDGET: int = 500        # llamadas a proveedores por día
+    GEOCODE_REFRESH_INTERVAL_SECONDS: int = 900
     MENDOZA_LAT_MIN: float = -33.5
     MENDOZA_LAT_MAX: float = -32.0
     MENDOZA_LNG_MIN: float = -69.5
     MENDOZA_LNG_MAX: float = -68.0
 
+    # Gazetteer local (direcciones ya entregadas / geocodificadas)
+    GAZETTEER_ENABLED: bool = True
+    GAZETTEER_REFRESH_SECONDS: int = 300
+    GAZETTEER_MIN_CONFIDENCE: float = 0.6
+    GAZETTEER_FUZZY_MIN_SIMILARITY: float = 0.55  # trigramas; misma altura y localidad
+
+    # Proveedores externos: circuit breaker y timeout adaptativo
+    PROVIDER_BREAKER_FAILURES: int = 5
+    PROVIDER_BREAKER_OPEN_SECONDS: float = 30.0
+    PROVIDER_TIMEOUT_MIN_SECONDS: float = 2.0
+    PROVIDER_TIMEOUT_MAX_SECONDS: float = 10.0
+
     # Distance Matrix
     DM_BLOCK_SIZE: int = 10
     DM_CACHE_TTL_SECONDS: int = 21600  # 6h
     DM_MAX_DESTINATIONS: int = 25
+    # Servidor OSRM para proveedor_matrix=osrm (scripts/osrm_local.py para offline)
+    OSRM_BASE_URL: str = "http://router.project-osrm.org"
+
+    # Índice espacial en memoria de remitos activos
+    SPATIAL_REFRESH_SECONDS: float = 5.0
+
+    # Procesamiento de pendientes en background
+    PENDING_CHUNK_SIZE: int = 50
+    PENDING_WORKERS: int = 4
+
+    # Billing: trazas en buffer, escritas en lote por un task en background
+    BILLING_FLUSH_SIZE: int = 200
+    BILLING_FLUSH_INTERVAL_SECONDS: float = 2.0
+    BILLING_QUEUE_MAXSIZE: int = 10000
 
     # Route defaults (se pueden overridear por config_ruta en DB)
     DEFAULT_DEPOT_LAT: float = -32.91973
@@ -50,3 +50,7 @@ MAX_GMAPS_WAYPOINTS = 10
 
 # Max distancia desde depósito para incluir en ruta
 MAX_DISTANCE_FROM_DEPOT_KM = 45.0
+
+# Grilla espacial uniforme sobre el bbox de Mendoza (core/spatial_grid.py).
+# 0.01° ≈ 1.1 km de latitud × 0.93 km de longitud: 150 × 150 celdas.
+GRID_CELL_DEG = 0.01
@@ -0,0 +1,153 @@
+"""
+Índice espacial de grilla uniforme sobre el bbox de Mendoza.
+
+Cada punto cae en una celda de GRID_CELL_DEG grados; la celda se numera
+fila * GRID_COLS + columna (la misma cuenta que la columna generada
+`geo_cell` en remitos y ruta_paradas, ver cell_sql()). Los puntos fuera
+del bbox no tienen celda.
+
+    grid = GridIndex()
+    grid.insert(remito_id, lat, lng)
+    grid.radius(lat, lng, 2.0)     # [(id, km)] ordenado por distancia
+    grid.knn(lat, lng, 5)          # los 5 más cercanos
+    cells_within(lat, lng, 2.0)    # celdas candidatas para prefiltrar en SQL
+"""
+import math
+from typing import Hashable, Iterator, Optional
+
+from app.core.constants import (
+    GRID_CELL_DEG,
+    MENDOZA_LAT_MIN, MENDOZA_LAT_MAX, MENDOZA_LNG_MIN, MENDOZA_LNG_MAX,
+)
+from app.core.haversine import haversine
+
+GRID_ROWS = math.ceil(round((MENDOZA_LAT_MAX - MENDOZA_LAT_MIN) / GRID_CELL_DEG, 6))
+GRID_COLS = math.ceil(round((MENDOZA_LNG_MAX - MENDOZA_LNG_MIN) / GRID_CELL_DEG, 6))
+
+_KM_PER_DEG_LAT = 111.32
+
+
+def _row_col(lat: float, lng: float) -> tuple[int, int]:
+    row = min(GRID_ROWS - 1, math.floor((lat - MENDOZA_LAT_MIN) / GRID_CELL_DEG))
+    col = min(GRID_COLS - 1, math.floor((lng - MENDOZA_LNG_MIN) / GRID_CELL_DEG))
+    return row, col
+
+
+def cell_id(lat: Optional[float], lng: Optional[float]) -> Optional[int]:
+    """Celda del punto, o None si no hay coordenadas o cae fuera del bbox."""
+    if lat is None or lng is None:
+        return None
+    if not (MENDOZA_LAT_MIN <= lat <= MENDOZA_LAT_MAX and MENDOZA_LNG_MIN <= lng <= MENDOZA_LNG_MAX):
+        return None
+    row, col = _row_col(lat, lng)
+    return row * GRID_COLS + col
+
+
+def cell_sql(lat_col: str = "lat", lng_col: str = "lng") -> str:
+    """Expresión SQL equivalente a cell_id() (para columnas generadas)."""
+    return (
+        f"CASE WHEN {lat_col} BETWEEN {MENDOZA_LAT_MIN} AND {MENDOZA_LAT_MAX} "
+        f"AND {lng_col} BETWEEN {MENDOZA_LNG_MIN} AND {MENDOZA_LNG_MAX} THEN "
+        f"LEAST({GRID_ROWS - 1}, floor(({lat_col} - ({MENDOZA_LAT_MIN})) / {GRID_CELL_DEG})::int) * {GRID_COLS} "
+        f"+ LEAST({GRID_COLS - 1}, floor(({lng_col} - ({MENDOZA_LNG_MIN})) / {GRID_CELL_DEG})::int) END"
+    )
+
+
+def _ring_span(lat: float, radius_km: float) -> tuple[int, int]:
+    """Cantidad de celdas (filas, columnas) que cubre radius_km alrededor de lat."""
+    cell_h = GRID_CELL_DEG * _KM_PER_DEG_LAT
+    cell_w = cell_h * max(math.cos(math.radians(lat)), 0.01)
+    return math.ceil(radius_km / cell_h), math.ceil(radius_km / cell_w)
+
+
+def cells_within(lat: float, lng: float, radius_km: float) -> list[int]:
+    """Celdas que pueden contener puntos a <= radius_km (superconjunto)."""
+    row, col = _row_col(
+        min(max(lat, MENDOZA_LAT_MIN), MENDOZA_LAT_MAX),
+        min(max(lng, MENDOZA_LNG_MIN), MENDOZA_LNG_MAX),
+    )
+    dr, dc = _ring_span(lat, radius_km)
+    return [
+        r * GRID_COLS + c
+        for r in range(max(0, row - dr), min(GRID_ROWS, row + dr + 1))
+        for c in range(max(0, col - dc), min(GRID_COLS, col + dc + 1))
+    ]
+
+
+class GridIndex:
+    """Puntos por celda, con alta/baja/movimiento en O(1)."""
+
+    def __init__(self) -> None:
+        self._cells: dict[int, dict[Hashable, tuple[float, float]]] = {}
+        self._where: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def insert(self, key: Hashable, lat: Optional[float], lng: Optional[float]) -> bool:
+        """Alta o movimiento. Sin coordenadas o fuera del bbox se da de baja."""
+        cell = cell_id(lat, lng)
+        self.remove(key)
+        if cell is None:
+            return False
+        self._cells.setdefault(cell, {})[key] = (lat, lng)
+        self._where[key] = cell
+        return True
+
+    def remove(self, key: Hashable) -> None:
+        cell = self._where.pop(key, None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        bucket.pop(key, None)
+        if not bucket:
+            del self._cells[cell]
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._where.clear()
+
+    def _points_in(self, cells: list[int]) -> Iterator[tuple[Hashable, float, float]]:
+        for cell in cells:
+            for key, (lat, lng) in self._cells.get(cell, {}).items():
+                yield key, lat, lng
+
+    def radius(self, lat: float, lng: float, radius_km: float) -> list[tuple[Hashable, float]]:
+        """Puntos a <= radius_km, ordenados por distancia: [(key, km)]."""
+        found = [
+            (key, d)
+            for key, plat, plng in self._points_in(cells_within(lat, lng, radius_km))
+            if (d := haversine(lat, lng, plat, plng)) <= radius_km
+        ]
+        found.sort(key=lambda kd: kd[1])
+        return found
+
+    def knn(
+        self, lat: float, lng: float, k: int, max_km: Optional[float] = None
+    ) -> list[tuple[Hashable, float]]:
+        """
+        Los k puntos más cercanos: [(key, km)]. Duplica el radio hasta tener
+        k puntos dentro: radius() filtra por distancia exacta, así que
+        ningún punto de afuera puede estar más cerca que el k-ésimo.
+        """
+        if k <= 0 or not self._where:
+            return []
+        cell_h = GRID_CELL_DEG * _KM_PER_DEG_LAT
+        limit_km = max_km if max_km is not None else (GRID_ROWS + GRID_COLS) * cell_h
+        radius_km = min(cell_h, limit_km)
+        while True:
+            found = self.radius(lat, lng, radius_km)
+            if len(found) >= k or radius_km >= limit_km:
+                return found[:k]
+            radius_km = min(radius_km * 2, limit_km)
+
+    def neighbors_within(self, radius_km: float) -> dict[Hashable, list[tuple[Hashable, float]]]:
+        """Para cada punto, los demás a <= radius_km (listas de vecinos)."""
+        out: dict[Hashable, list[tuple[Hashable, float]]] = {}
+        for cell, bucket in self._cells.items():
+            for key, (lat, lng) in bucket.items():
+                out[key] = [(other, d) for other, d in self.radius(lat, lng, radius_km) if other != key]
+        return out
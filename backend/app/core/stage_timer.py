@@ -0,0 +1,107 @@
+"""
+Perfil de tiempos por etapa para pipelines lineales (ej. generate_route).
+
+    with StageTimer(profile=False) as timer:
+        ...                       # etapa 1
+        timer.lap("config")
+        ...                       # etapa 2
+        timer.lap("candidatos")
+        timer.count("filas_escritas", 12)
+        profile = timer.finish()  # dict serializable a JSONB
+
+Con profile=True el cProfile se activa al entrar al `with` y se apaga al
+salir aunque el pipeline falle. Hay un solo profiler activo por proceso
+(en 3.12 es global): si ya hay una corrida perfilada, entrar levanta
+ProfilerBusy.
+"""
+import cProfile
+import pstats
+import threading
+import time
+from typing import Optional
+
+from app.core.exceptions import MolyMarketException
+
+PROFILE_TOP_N = 30
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(MolyMarketException):
+    """Ya hay una corrida con cProfile activo en este proceso."""
+    pass
+
+
+class StageTimer:
+    def __init__(self, profile: bool = False):
+        self._start = time.perf_counter()
+        self._last = self._start
+        self.stages_ms: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        # cProfile es por thread: con requests concurrentes también captura
+        # sus corrutinas. Usar sólo para diagnóstico puntual.
+        self._profile = profile
+        self._profiler: Optional[cProfile.Profile] = None
+        self._locked = False
+
+    def __enter__(self) -> "StageTimer":
+        if self._profile:
+            if not _profile_lock.acquire(blocking=False):
+                raise ProfilerBusy("Ya hay una generación perfilada en curso")
+            self._locked = True
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            if self._profiler is not None:
+                self._profiler.disable()
+                self._profiler = None
+        finally:
+            if self._locked:
+                self._locked = False
+                _profile_lock.release()
+
+    def lap(self, stage: str) -> None:
+        """Cierra la etapa en curso: acumula el tiempo desde el lap anterior."""
+        now = time.perf_counter()
+        self.stages_ms[stage] = self.stages_ms.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def update(self, counters: dict) -> None:
+        """Suma contadores numéricos de un dict de stats (ignora el resto)."""
+        for name, n in counters.items():
+            if isinstance(n, (int, float)) and not isinstance(n, bool):
+                self.count(name, n)
+
+    def finish(self) -> dict:
+        total_ms = (time.perf_counter() - self._start) * 1000
+        out = {
+            "total_ms": round(total_ms, 1),
+            "stages_ms": {k: round(v, 1) for k, v in self.stages_ms.items()},
+            "counters": dict(self.counters),
+        }
+        if self._profiler is not None:
+            self._profiler.disable()
+            out["cprofile"] = _top_functions(self._profiler)
+            self._profiler = None
+        return out
+
+
+def _top_functions(profiler: cProfile.Profile, n: int = PROFILE_TOP_N) -> list[dict]:
+    """Top-n funciones por tiempo acumulado."""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda kv: kv[1][3], reverse=True)[:n]
+    return [
+        {
+            "func": f"{filename}:{line}({name})",
+            "ncalls": nc,
+            "tottime_ms": round(tt * 1000, 2),
+            "cumtime_ms": round(ct * 1000, 2),
+        }
+        for (filename, line, name), (_, nc, tt, ct, _) in rows
+    ]
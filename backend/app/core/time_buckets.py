@@ -0,0 +1,57 @@
+"""
+Franjas horarias de tráfico para la matriz de tiempos.
+
+ORS y OSRM devuelven tiempos de flujo libre (sin hora de salida) y eso es lo
+que guarda distance_matrix_cache. Cada franja aplica un factor sobre ese
+valor, leído de config_ruta (factor_trafico_<franja>, 1.0 = sin ajuste) y
+ajustado con scripts/fit_travel_model.py. Fuera de las franjas (None) se usa
+el flujo libre tal cual.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.constants import WINDOW_AM_FROM, WINDOW_PM_FROM
+
+TIMEZONE = "America/Argentina/Mendoza"
+CONFIG_PREFIX = "factor_trafico_"
+
+
+@dataclass(frozen=True)
+class TimeBucket:
+    name: str
+    desde_min: int       # minutos desde medianoche, inclusive
+    hasta_min: int       # exclusivo
+
+
+BUCKETS: tuple[TimeBucket, ...] = (
+    TimeBucket("am_pico", 7 * 60, 11 * 60),
+    TimeBucket("mediodia", 11 * 60, 14 * 60),
+    TimeBucket("pm", 14 * 60, 21 * 60),
+)
+NAMES: tuple[str, ...] = tuple(b.name for b in BUCKETS)
+
+
+def bucket_for(minute_of_day: float) -> Optional[str]:
+    """Franja que contiene la hora (minutos desde medianoche); None = flujo libre."""
+    minute = minute_of_day % (24 * 60)
+    for b in BUCKETS:
+        if b.desde_min <= minute < b.hasta_min:
+            return b.name
+    return None
+
+
+def bucket_for_ventana(ventana_tipo: str) -> Optional[str]:
+    """Franja en la que arranca un grupo AM / PM del optimizador."""
+    if ventana_tipo == "AM":
+        return bucket_for(WINDOW_AM_FROM)
+    if ventana_tipo == "PM":
+        return bucket_for(WINDOW_PM_FROM)
+    return None
+
+
+def factors_from_config(config: dict) -> dict[Optional[str], float]:
+    """{franja: factor} desde config_ruta; None (flujo libre) siempre 1.0."""
+    factors: dict[Optional[str], float] = {None: 1.0}
+    for name in NAMES:
+        factors[name] = float(config.get(CONFIG_PREFIX + name, 1.0))
+    return factors
@@ -0,0 +1,103 @@
+"""
+Modelo de tiempos de viaje por zonas (sin red).
+
+Cada punto cae en una zona según su distancia al centro de la Ciudad de
+Mendoza; cada zona tiene una velocidad media y un factor de desvío
+(km por calle / km en línea recta). Un tramo A→B se estima como
+
+    km_calle = haversine(A, B) × promedio(factor_A, factor_B)
+    minutos  = (km_calle / 2) / vel_A + (km_calle / 2) / vel_B
+
+es decir, medio tramo en la zona de cada extremo. matrix() calcula la zona
+de cada punto una sola vez.
+"""
+import math
+from dataclasses import dataclass, replace
+from typing import Optional, Sequence
+
+from app.core.constants import KNOWN_CITY_CENTERS
+from app.core.haversine import haversine
+
+CENTER_LAT, CENTER_LNG = KNOWN_CITY_CENTERS[0]   # Ciudad de Mendoza
+
+
+@dataclass(frozen=True)
+class Zone:
+    name: str
+    max_km: float        # radio exterior, medido desde el centro
+    speed_kmh: float
+    road_factor: float
+
+
+DEFAULT_ZONES: tuple[Zone, ...] = (
+    Zone("centro", 3.0, 22.0, 1.35),
+    Zone("urbano", 12.0, 32.0, 1.30),
+    Zone("periurbano", 30.0, 45.0, 1.25),
+    Zone("rural", math.inf, 60.0, 1.20),
+)
+
+
+class TravelModel:
+    def __init__(self, zones: Sequence[Zone] = DEFAULT_ZONES):
+        self.zones = tuple(sorted(zones, key=lambda z: z.max_km))
+
+    def with_overrides(
+        self,
+        speeds: Optional[dict[str, float]] = None,
+        road_factors: Optional[dict[str, float]] = None,
+    ) -> "TravelModel":
+        """Copia con velocidades / factores reemplazados por nombre de zona."""
+        speeds = speeds or {}
+        road_factors = road_factors or {}
+        return TravelModel([
+            replace(
+                z,
+                speed_kmh=speeds.get(z.name, z.speed_kmh),
+                road_factor=road_factors.get(z.name, z.road_factor),
+            )
+            for z in self.zones
+        ])
+
+    def zone_of(self, lat: float, lng: float) -> Zone:
+        d = haversine(CENTER_LAT, CENTER_LNG, lat, lng)
+        for zone in self.zones:
+            if d <= zone.max_km:
+                return zone
+        return self.zones[-1]
+
+    @staticmethod
+    def _leg(straight_km: float, za: Zone, zb: Zone) -> tuple[float, float]:
+        road_km = straight_km * (za.road_factor + zb.road_factor) / 2
+        minutes = (road_km / 2) / za.speed_kmh * 60 + (road_km / 2) / zb.speed_kmh * 60
+        return minutes, road_km
+
+    def minutes(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+        straight = haversine(lat1, lng1, lat2, lng2)
+        return self._leg(straight, self.zone_of(lat1, lng1), self.zone_of(lat2, lng2))[0]
+
+    def matrix(
+        self,
+        sources: Sequence[tuple[float, float]],
+        destinations: Optional[Sequence[tuple[float, float]]] = None,
+    ) -> tuple[list[list[float]], list[list[float]]]:
+        """(minutos, km por calle) de cada origen a cada destino."""
+        destinations = sources if destinations is None else destinations
+        src_zones = [self.zone_of(lat, lng) for lat, lng in sources]
+        dst_zones = (
+            src_zones if destinations is sources
+            else [self.zone_of(lat, lng) for lat, lng in destinations]
+        )
+        durations: list[list[float]] = []
+        distances: list[list[float]] = []
+        for (alat, alng), za in zip(sources, src_zones):
+            drow, krow = [], []
+            for (blat, blng), zb in zip(destinations, dst_zones):
+                minutes, km = self._leg(haversine(alat, alng, blat, blng), za, zb)
+                drow.append(minutes)
+                krow.append(km)
+            durations.append(drow)
+            distances.append(krow)
+        return durations, distances
+
+
+default_model = TravelModel()
@@ -0,0 +1,63 @@
+"""
+Cache TTL en memoria del proceso (uno por worker de uvicorn).
+Para resultados baratos de recalcular donde unos segundos de desfase son aceptables.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds: float, maxsize: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Valor cacheado o None si no existe o expiró."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if time.monotonic() >= expires:
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if len(self._data) >= self.maxsize and key not in self._data:
+            # Descartar la entrada más vieja (orden de inserción)
+            self._data.pop(next(iter(self._data)))
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Borra una clave, o todo el cache si key es None."""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Borra todas las claves para las que predicate(key) es True."""
+        for key in [k for k in self._data if predicate(k)]:
+            self._data.pop(key, None)
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Valor cacheado o el resultado de await compute().
+        Si varias corrutinas piden la misma clave expirada, sólo una calcula
+        y las demás esperan su resultado (evita el stampede al vencer el TTL).
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            value = self.get(key)
+            if value is None:
+                value = await compute()
+                self.set(key, value)
+        if not lock.locked():
+            self._locks.pop(key, None)
+        return value
@@ -1,8 +1,30 @@
+import math
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
 from app.core.constants import (
     MENDOZA_LAT_MIN, MENDOZA_LAT_MAX, MENDOZA_LNG_MIN, MENDOZA_LNG_MAX,
     KNOWN_CITY_CENTERS, CITY_CENTER_TOLERANCE_DEG,
 )
 
+# Motivos estructurados de validación de coordenadas geocodificadas.
+# Rechazo: el resultado se descarta (y la cascada puede cachearlo negativo).
+OUT_OF_BBOX = "out_of_bbox"
+CITY_CENTROID = "city_centroid"
+NULL_COORDS = "null_coords"
+# Advertencia: el resultado se usa pero el remito queda para corregir.
+FAR_FROM_DEPOT = "far_from_depot"
+PROVIDER_DISAGREEMENT = "provider_disagreement"
+
+# Centros de localidad por celda de tamaño = tolerancia: un punto sólo puede
+# estar cerca de los centros de su celda o de las 8 vecinas.
+_CENTER_BUCKETS: dict[tuple[int, int], list[tuple[float, float]]] = {}
+for _clat, _clng in KNOWN_CITY_CENTERS:
+    _CENTER_BUCKETS.setdefault(
+        (math.floor(_clat / CITY_CENTER_TOLERANCE_DEG), math.floor(_clng / CITY_CENTER_TOLERANCE_DEG)),
+        [],
+    ).append((_clat, _clng))
+
 
 def is_in_mendoza(lat: float, lng: float, strict: bool = False) -> bool:
     """Verifica si un punto está dentro del bounding box de Mendoza."""
@@ -21,12 +43,16 @@ def is_in_mendoza(lat: float, lng: float, strict: bool = False) -> bool:
 
 def is_known_city_center(lat: float, lng: float) -> bool:
     """True si las coordenadas corresponden al centro exacto de una localidad conocida."""
-    for clat, clng in KNOWN_CITY_CENTERS:
-        if (
-            abs(lat - clat) < CITY_CENTER_TOLERANCE_DEG
-            and abs(lng - clng) < CITY_CENTER_TOLERANCE_DEG
-        ):
-            return True
+    row = math.floor(lat / CITY_CENTER_TOLERANCE_DEG)
+    col = math.floor(lng / CITY_CENTER_TOLERANCE_DEG)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            for clat, clng in _CENTER_BUCKETS.get((row + dr, col + dc), ()):
+                if (
+                    abs(lat - clat) < CITY_CENTER_TOLERANCE_DEG
+                    and abs(lng - clng) < CITY_CENTER_TOLERANCE_DEG
+                ):
+                    return True
     return False
 
 
@@ -44,3 +70,78 @@ def validate_coordinates(lat: float, lng: float) -> dict:
         "in_mendoza": is_in_mendoza(lat, lng),
         "issues": issues,
     }
+
+
+@dataclass
+class GeoCheck:
+    rejection: Optional[str] = None                    # motivo de descarte
+    warnings: list[str] = field(default_factory=list)  # motivos para corregir
+    depot_km: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.rejection is None
+
+
+def _distances_km(
+    lats: Sequence[float], lngs: Sequence[float], lat0: float, lng0: float
+) -> list[float]:
+    """Haversine de cada punto a (lat0, lng0), con los términos fijos calculados una vez."""
+    phi0 = math.radians(lat0)
+    cos0 = math.cos(phi0)
+    lam0 = math.radians(lng0)
+    out = []
+    for lat, lng in zip(lats, lngs):
+        phi = math.radians(lat)
+        a = (
+            math.sin((phi - phi0) / 2) ** 2
+            + cos0 * math.cos(phi) * math.sin((math.radians(lng) - lam0) / 2) ** 2
+        )
+        out.append(2 * 6371.0 * math.asin(min(1.0, math.sqrt(a))))
+    return out
+
+
+def check_batch(
+    lats: Sequence[Optional[float]],
+    lngs: Sequence[Optional[float]],
+    depot: Optional[tuple[float, float]] = None,
+    max_depot_km: Optional[float] = None,
+    alternatives: Optional[Sequence[Sequence[tuple[float, float]]]] = None,
+    agreement_km: float = 0.5,
+) -> list[GeoCheck]:
+    """
+    Valida un lote de coordenadas (listas paralelas) de una sola pasada:
+    - null_coords / out_of_bbox / city_centroid → rechazo;
+    - far_from_depot: a más de max_depot_km del depósito → advertencia;
+    - provider_disagreement: alguna respuesta alternativa para el mismo
+      punto (otro proveedor, resultado anterior) a más de agreement_km → advertencia.
+    """
+    checks = [GeoCheck() for _ in lats]
+    valid = []
+    for i, (lat, lng) in enumerate(zip(lats, lngs)):
+        if lat is None or lng is None or (lat == 0 and lng == 0):
+            checks[i].rejection = NULL_COORDS
+        elif not is_in_mendoza(lat, lng):
+            checks[i].rejection = OUT_OF_BBOX
+        elif is_known_city_center(lat, lng):
+            checks[i].rejection = CITY_CENTROID
+        else:
+            valid.append(i)
+
+    if depot is not None and valid:
+        dists = _distances_km([lats[i] for i in valid], [lngs[i] for i in valid], *depot)
+        for i, d in zip(valid, dists):
+            checks[i].depot_km = round(d, 2)
+            if max_depot_km is not None and d > max_depot_km:
+                checks[i].warnings.append(FAR_FROM_DEPOT)
+
+    if alternatives is not None:
+        for i in valid:
+            alts = alternatives[i]
+            if alts and max(_distances_km([a[0] for a in alts], [a[1] for a in alts], lats[i], lngs[i])) > agreement_km:
+                checks[i].warnings.append(PROVIDER_DISAGREEMENT)
+    return checks
+
+
+def check_point(lat: Optional[float], lng: Optional[float], **kwargs) -> GeoCheck:
+    return check_batch([lat], [lng], **kwargs)[0]
@@ -3,12 +3,24 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.config import settings
+from app.core.ttl_cache import TTLCache
 from app.database import get_db
 from app.core.security import verify_access_token
 from app.models.usuario import Usuario
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
+# Usuario autenticado por (user_id, token). Evita el SELECT en cada request;
+# una desactivación hecha desde otro worker tarda a lo sumo el TTL en aplicarse.
+# Las instancias cacheadas quedan detached: tratarlas como sólo lectura.
+_principal_cache = TTLCache(ttl_seconds=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS, maxsize=1024)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Descarta del cache todas las entradas del usuario (llamar tras modificarlo)."""
+    _principal_cache.invalidate_where(lambda key: key[0] == user_id)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
@@ -27,13 +39,20 @@ async def get_current_user(
             detail="Token inválido o expirado",
         )
     user_id = int(payload.get("sub", 0))
-    result = await db.execute(select(Usuario).where(Usuario.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user or not user.activo:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario no encontrado o inactivo",
-        )
+    cache_key = (user_id, token)
+    user = _principal_cache.get(cache_key) if settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS > 0 else None
+    if user is None:
+        result = await db.execute(select(Usuario).where(Usuario.id == user_id))
+        user = result.scalar_one_or_none()
+        if not user or not user.activo:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuario no encontrado o inactivo",
+            )
+        if settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS > 0:
+            # Fuera de la sesión: un rollback de este request no debe expirarlo
+            db.expunge(user)
+            _principal_cache.set(cache_key, user)
     return user
 
 
@@ -32,7 +32,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error de conexion a DB: {e}")
         raise
+    from app.services import gazetteer_service, geocode_refresher
+    gazetteer_service.start()
+    geocode_refresher.start()
     yield
+    from app.services import pending_processor, billing_service
+    await geocode_refresher.stop()
+    await gazetteer_service.stop()
+    await pending_processor.stop()
+    await billing_service.stop()
     await engine.dispose()
     logger.info("MolyMarket API shutdown completo")
 
@@ -99,8 +107,10 @@ app.include_router(api_router, prefix="/api/v1")
 
 @app.get("/health", tags=["system"])
 async def health():
+    from app.services import billing_service
     return {
         "status": "ok",
         "version": settings.APP_VERSION,
         "environment": settings.ENVIRONMENT,
+        "billing": "ok" if billing_service.stats()["ok"] else "degraded",
     }
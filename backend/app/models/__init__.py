@@ -3,12 +3,13 @@ from app.models.remito import Remito, RemitoEstadoClasificacion, RemitoEstadoLif
 from app.models.pedido_listo import PedidoListo
 from app.models.ruta import Ruta, RutaParada, RutaExcluido, RutaEstado, ParadaEstado
 from app.models.geo_cache import GeoCache
-from app.models.historico import HistoricoEntregado
+from app.models.historico import HistoricoEntregado, HistoricoResumenMensual
 from app.models.audit_log import AuditLog
 from app.models.billing import BillingTrace
 from app.models.config import ConfigRuta
 from app.models.usuario import Usuario, UserRol
 from app.models.distance_cache import DistanceMatrixCache
+from app.models.travel_zone import TravelZoneParam
 
 __all__ = [
     "Carrier",
@@ -23,10 +24,12 @@ __all__ = [
     "ParadaEstado",
     "GeoCache",
     "HistoricoEntregado",
+    "HistoricoResumenMensual",
     "AuditLog",
     "BillingTrace",
     "ConfigRuta",
     "Usuario",
     "UserRol",
     "DistanceMatrixCache",
+    "TravelZoneParam",
 ]
@@ -9,11 +9,12 @@ class GeoCache(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     key_normalizada = Column(String(512), nullable=False, unique=True)
     query_original = Column(Text, nullable=False)
-    lat = Column(Float, nullable=False)
-    lng = Column(Float, nullable=False)
+    lat = Column(Float, nullable=True)                 # NULL en entradas negativas
+    lng = Column(Float, nullable=True)
     formatted_address = Column(Text, nullable=True)
     has_street_number = Column(Boolean, default=False)
     provider = Column(String(50), nullable=False)
     score = Column(Float, nullable=True)
+    negative_reason = Column(String(30), nullable=True)  # no_result / out_of_bbox / city_centroid
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, UniqueConstraint
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -26,3 +26,25 @@ class HistoricoEntregado(Base):
     fecha_archivado = Column(DateTime(timezone=True), server_default=func.now())
     mes_cierre = Column(String(7), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class HistoricoResumenMensual(Base):
+    """
+    Resumen precalculado de un mes cerrado (lo escribe el cierre mensual).
+    Una fila por (mes, dimension, valor): dimension 'total' (valor ''),
+    'carrier' o 'localidad' ('' = sin dato).
+    """
+    __tablename__ = "historico_resumen_mensual"
+    __table_args__ = (
+        UniqueConstraint("mes_cierre", "dimension", "valor", name="uq_historico_resumen_mes_dim_valor"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    mes_cierre = Column(String(7), nullable=False)
+    dimension = Column(String(20), nullable=False)
+    valor = Column(String(200), nullable=False, default="")
+    entregas = Column(Integer, nullable=False, default=0)
+    urgentes = Column(Integer, nullable=False, default=0)
+    prioridad = Column(Integer, nullable=False, default=0)
+    lead_time_promedio_min = Column(Float, nullable=True)  # fecha_ingreso → fecha_entregado
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
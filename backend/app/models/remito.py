@@ -1,7 +1,8 @@
 import enum
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Computed, Integer, String, Boolean, Text, DateTime, Float, ForeignKey
 from sqlalchemy.sql import func
 from app.database import Base
+from app.core.spatial_grid import cell_sql
 
 
 class RemitoEstadoClasificacion(str, enum.Enum):
@@ -40,6 +41,8 @@ class Remito(Base):
     geocode_provider = Column(String(50), nullable=True)
     geocode_score = Column(Float, nullable=True)
     geocode_formatted = Column(Text, nullable=True)
+    # Celda de la grilla espacial (core/spatial_grid.py), para prefiltrar por zona
+    geo_cell = Column(Integer, Computed(cell_sql("lat", "lng"), persisted=True), index=True)
 
     # Clasificación
     estado_clasificacion = Column(String(50), nullable=False,
@@ -1,8 +1,9 @@
 import enum
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Computed, Integer, String, Text, Date, DateTime, Float, Boolean, ForeignKey
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.database import Base
+from app.core.spatial_grid import cell_sql
 
 
 class RutaEstado(str, enum.Enum):
@@ -34,6 +35,7 @@ class Ruta(Base):
     gmaps_links = Column(JSONB, nullable=True, default=list)
     ruta_geom = Column(JSONB, nullable=True)           # GeoJSON LineString
     config_snapshot = Column(JSONB, nullable=False, default=dict)
+    perf_profile = Column(JSONB, nullable=True)        # tiempos por etapa de generate_route
     api_cost_estimate = Column(Float, default=0.0)
     billing_detail = Column(JSONB, nullable=True)
     deposito_lat = Column(Float, nullable=True)
@@ -53,6 +55,7 @@ class RutaParada(Base):
     orden = Column(Integer, nullable=False)
     lat_snapshot = Column(Float, nullable=True)
     lng_snapshot = Column(Float, nullable=True)
+    geo_cell = Column(Integer, Computed(cell_sql("lat_snapshot", "lng_snapshot"), persisted=True), index=True)
     cliente_snapshot = Column(String(500), nullable=True)
     direccion_snapshot = Column(Text, nullable=True)
     observaciones_snapshot = Column(Text, nullable=True)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class TravelZoneParam(Base):
+    __tablename__ = "travel_zone_params"
+
+    zona = Column(String(30), primary_key=True)
+    speed_kmh = Column(Float, nullable=False)
+    road_factor = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False, default=0)
+    fitted_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -9,6 +9,7 @@ class PaginatedResponse(BaseModel):
     page: int
     pages: int
     size: int
+    next_cursor: Optional[str] = None
 
 
 class ErrorResponse(BaseModel):
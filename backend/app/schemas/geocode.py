@@ -22,6 +22,19 @@ class GeocodeValidateRequest(BaseModel):
     lng: float
 
 
+class GeocodeValidateBatchRequest(BaseModel):
+    points: list[GeocodeValidateRequest]
+
+
+class GeocodeCheckResult(BaseModel):
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    ok: bool
+    rejection: Optional[str] = None
+    warnings: list[str] = []
+    depot_km: Optional[float] = None
+
+
 class GeocodeValidateResponse(BaseModel):
     in_bbox: bool
     is_city_center: bool
@@ -64,6 +64,7 @@ class RutaResponse(BaseModel):
     paradas: list[RutaParadaResponse] = []
     excluidos: list[RutaExcluidoResponse] = []
     config: dict = {}
+    perf_profile: Optional[dict] = None
     api_cost_estimate: Optional[float] = None
     created_at: Optional[datetime] = None
 
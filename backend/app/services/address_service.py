@@ -1,5 +1,7 @@
 import re
 import unicodedata
+from functools import lru_cache
+from typing import Optional
 
 
 # Mapa de abreviaciones → forma completa
@@ -41,10 +43,61 @@ _CITY_ALIASES = {
 }
 
 
+# ---------------------------------------------------------------------------
+# Motor precompilado
+# ---------------------------------------------------------------------------
+
+def _strip_marks(text: str) -> str:
+    nfd = unicodedata.normalize("NFD", text)
+    return "".join(c for c in nfd if unicodedata.category(c) != "Mn")
+
+
+# Tabla de traducción para diacríticos del rango latino (U+00C0–U+024F).
+# Fuera de ese rango se cae al camino NFD genérico.
+_DIACRITICS = {
+    cp: _strip_marks(chr(cp))
+    for cp in range(0x00C0, 0x0250)
+    if _strip_marks(chr(cp)) != chr(cp)
+}
+
+# Una sola alternación por mapa; el reemplazo sale del dict de lookup.
+_ABBREV_LOOKUP = {pattern[2:-2]: repl for pattern, repl in _ABBREV_MAP.items()}
+_RE_ABBREV = re.compile(
+    r'\b(' + "|".join(sorted(_ABBREV_LOOKUP, key=len, reverse=True)) + r')\b'
+)
+# Aliases más largos primero: "LUJAN DE CUYO" gana sobre "LUJAN".
+_RE_CITY_ALIAS = re.compile(
+    r'\b(' + "|".join(re.escape(a) for a in sorted(_CITY_ALIASES, key=len, reverse=True)) + r')\b'
+)
+_RE_SPACES = re.compile(r'\s+')
+_RE_PUNCT = re.compile(r'[^\w\s]')
+_RE_WORD_SEP = re.compile(r'[\s_]+')
+# Títulos que se escriben o no delante del nombre de una calle
+_STREET_TITLES = frozenset({
+    "GENERAL", "GRAL", "PRESIDENTE", "PTE", "DOCTOR", "DR", "INGENIERO", "ING",
+    "CORONEL", "CNEL", "TENIENTE", "TTE", "SARGENTO", "SGTO", "CAPITAN", "CAP",
+    "COMANDANTE", "ALMIRANTE", "BRIGADIER", "PROFESOR", "PROF", "PADRE", "FRAY",
+    "MONSENOR", "OBISPO", "GOBERNADOR", "GDOR", "INTENDENTE", "PERITO",
+})
+
+_RE_NUMBER = re.compile(r'\b\d+\b')
+_RE_STREET_PREFIX = re.compile(r'\b(calle|av|avenida|bv|boulevard|pasaje|pje)\b', re.IGNORECASE)
+
+_MEMO_SIZE = 4096
+
+
+def _remove_diacritics(text: str) -> str:
+    text = text.translate(_DIACRITICS)
+    if not text.isascii():
+        text = _strip_marks(text)
+    return text
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
 def normalize(address: str) -> str:
     """
     Normaliza una dirección:
-    1. NFD decomposition → strip diacríticos
+    1. Strip diacríticos (tabla de traducción, NFD como fallback)
     2. Lowercase
     3. Expandir abreviaciones
     4. Colapsar espacios
@@ -53,37 +106,35 @@ def normalize(address: str) -> str:
     """
     if not address:
         return ""
-    # NFD → strip combining characters (diacríticos)
-    nfd = unicodedata.normalize("NFD", address)
-    stripped = "".join(c for c in nfd if unicodedata.category(c) != "Mn")
-    lower = stripped.lower().strip()
+    lower = _remove_diacritics(address).lower().strip()
+    lower = _RE_ABBREV.sub(lambda m: _ABBREV_LOOKUP[m.group(1)], lower)
+    return _RE_SPACES.sub(' ', lower).strip()
 
-    for pattern, replacement in _ABBREV_MAP.items():
-        lower = re.sub(pattern, replacement, lower, flags=re.IGNORECASE)
 
-    # Colapsar espacios múltiples
-    normalized = re.sub(r'\s+', ' ', lower).strip()
-    return normalized
+def _key_from_normalized(normalized: str) -> str:
+    key = _RE_PUNCT.sub('', normalized.upper())
+    return _RE_SPACES.sub('_', key.strip())
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def normalize_with_key(address: str) -> tuple[str, str]:
+    """Retorna (normalizada, clave de cache) con una sola normalización."""
+    normalized = normalize(address)
+    return normalized, _key_from_normalized(normalized)
 
 
 def normalize_key(address: str) -> str:
     """Clave de cache: normalizada + uppercase + sin puntuación."""
-    n = normalize(address)
-    key = n.upper()
-    key = re.sub(r'[^\w\s]', '', key)
-    key = re.sub(r'\s+', '_', key.strip())
-    return key
+    return normalize_with_key(address)[1]
 
 
+@lru_cache(maxsize=_MEMO_SIZE)
 def fix_ciudad_mendoza(address: str) -> str:
     """
     Reemplaza variantes de 'Ciudad/Capital, Mendoza' por 'MENDOZA, MENDOZA'.
     Equivalente a reemplazarCiudadMendoza_().
     """
-    upper = address.upper()
-    for alias, canonical in _CITY_ALIASES.items():
-        upper = re.sub(r'\b' + re.escape(alias) + r'\b', canonical, upper)
-    return upper
+    return _RE_CITY_ALIAS.sub(lambda m: _CITY_ALIASES[m.group(1)], address.upper())
 
 
 def extract_street_base(address: str) -> str:
@@ -92,10 +143,10 @@ def extract_street_base(address: str) -> str:
     Equivalente a extraerCalleBase_().
     """
     # Remover número de calle
-    no_num = re.sub(r'\b\d+\b', '', address)
+    no_num = _RE_NUMBER.sub('', address)
     # Remover prefijos comunes
-    no_prefix = re.sub(r'\b(calle|av|avenida|bv|boulevard|pasaje|pje)\b', '', no_num, flags=re.IGNORECASE)
-    return re.sub(r'\s+', ' ', no_prefix).strip()
+    no_prefix = _RE_STREET_PREFIX.sub('', no_num)
+    return _RE_SPACES.sub(' ', no_prefix).strip()
 
 
 def reorder_components(address: str, localidad: str = "Mendoza") -> str:
@@ -109,3 +160,93 @@ def reorder_components(address: str, localidad: str = "Mendoza") -> str:
     if len(parts) == 2:
         return f"{parts[0]}, {parts[1]}, Mendoza"
     return address
+
+
+# Localidades canónicas (sin tildes) para claves de direcciones; las más
+# largas primero y "MENDOZA" al final: sólo se usa si no hay otra.
+_LOCALITY_CANON = {
+    "GODOY CRUZ": "GODOY CRUZ",
+    "GUAYMALLEN": "GUAYMALLEN",
+    "LAS HERAS": "LAS HERAS",
+    "LUJAN DE CUYO": "LUJAN DE CUYO",
+    "LUJAN": "LUJAN DE CUYO",
+    "MAIPU": "MAIPU",
+    "SAN RAFAEL": "SAN RAFAEL",
+    "TUNUYAN": "TUNUYAN",
+    "SAN MARTIN": "SAN MARTIN",
+    "RIVADAVIA": "RIVADAVIA",
+    "JUNIN": "JUNIN",
+    "CAPITAL": "MENDOZA",
+    "CIUDAD": "MENDOZA",
+    "MENDOZA": "MENDOZA",
+}
+_RE_LOCALITY = re.compile(
+    r'\b(' + "|".join(sorted(_LOCALITY_CANON, key=len, reverse=True)) + r')\b'
+)
+
+
+def canonical_locality(text: str) -> str:
+    """Localidad canónica mencionada en el texto ('MENDOZA' si no hay otra)."""
+    found = {
+        _LOCALITY_CANON[m.group(1)]
+        for m in _RE_LOCALITY.finditer(_remove_diacritics(text or "").upper())
+    }
+    found.discard("MENDOZA")
+    return min(found) if found else "MENDOZA"
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def address_components(address: str, localidad: str = "") -> Optional[tuple[str, str, str]]:
+    """
+    (calle, número, localidad) canónicos de una dirección, o None si la
+    primera parte no tiene calle y número. Misma dirección escrita distinto
+    ("Av. San Martín 1234, Godoy Cruz" / "avenida san martin 1234 gcr")
+    da la misma tupla.
+    """
+    first, _, rest = normalize(address).partition(",")
+    number = _RE_NUMBER.search(first)
+    if not number:
+        return None
+    # Lo que sigue al número ("1234 godoy cruz") cuenta como localidad
+    street = _key_from_normalized(extract_street_base(first[:number.start()]))
+    if not street:
+        return None
+    tail = f"{first[number.end():]} {rest} {localidad}"
+    locality = canonical_locality(fix_ciudad_mendoza(tail))
+    return street, number.group(0), locality
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def trigrams(text: str) -> frozenset[str]:
+    """Trigramas por palabra, con el mismo padding que pg_trgm ('  san ')."""
+    grams = set()
+    for word in _RE_SPACES.split(_RE_PUNCT.sub(' ', text.replace('_', ' ')).lower().strip()):
+        if word:
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _without_titles(name: str) -> tuple[str, ...]:
+    words = [w for w in _RE_WORD_SEP.split(name.upper()) if w]
+    while len(words) > 1 and words[0] in _STREET_TITLES:
+        words.pop(0)
+    return tuple(words)
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    Similitud entre 0 y 1: trigramas (Jaccard), o 1 si sólo difieren en
+    títulos al principio ("SAN MARTIN" / "GENERAL SAN MARTIN"). Si una tiene
+    todas las palabras de la otra y alguna más que no es título ("SAN MARTIN
+    SUR", "PASO DE LOS ANDES") es otra calle: 0.
+    """
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    wa, wb = _without_titles(a), _without_titles(b)
+    if wa == wb:
+        return 1.0
+    if set(wa) < set(wb) or set(wb) < set(wa):
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
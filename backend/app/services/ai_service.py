@@ -8,6 +8,7 @@ from dataclasses import dataclass
 
 from openai import AsyncOpenAI
 from app.config import settings
+from app.services import billing_service
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,15 @@ def _get_client() -> AsyncOpenAI:
     return _client
 
 
+async def _chat_completion(sku: str, **kwargs):
+    """chat.completions.create instrumentado: latencia, status y tokens a billing."""
+    client = _get_client()
+    async with billing_service.track("openai", sku) as call:
+        response = await client.chat.completions.create(**kwargs)
+        call.units = response.usage.total_tokens if response.usage else 0
+    return response
+
+
 @dataclass
 class AIClassification:
     transportista: str
@@ -50,8 +60,8 @@ async def classify_transport(texto: str) -> Optional[AIClassification]:
     if not settings.OPENAI_API_KEY:
         return None
     try:
-        client = _get_client()
-        response = await client.chat.completions.create(
+        response = await _chat_completion(
+            "classify",
             model=settings.OPENAI_MODEL,
             temperature=settings.OPENAI_TEMPERATURE,
             messages=[
@@ -91,8 +101,8 @@ async def normalize_address(address: str) -> Optional[AINormalization]:
     if not settings.OPENAI_API_KEY:
         return None
     try:
-        client = _get_client()
-        response = await client.chat.completions.create(
+        response = await _chat_completion(
+            "normalize",
             model=settings.OPENAI_MODEL,
             temperature=settings.OPENAI_TEMPERATURE,
             messages=[
@@ -132,8 +142,8 @@ async def extract_time_window(texto: str) -> Optional[AITimeWindow]:
     if not settings.OPENAI_API_KEY:
         return None
     try:
-        client = _get_client()
-        response = await client.chat.completions.create(
+        response = await _chat_completion(
+            "time_window",
             model=settings.OPENAI_MODEL,
             temperature=settings.OPENAI_TEMPERATURE,
             messages=[
@@ -168,8 +178,8 @@ async def resolve_poi(name: str, context: str = "Mendoza") -> Optional[dict]:
     if not settings.OPENAI_API_KEY:
         return None
     try:
-        client = _get_client()
-        response = await client.chat.completions.create(
+        response = await _chat_completion(
+            "resolve_poi",
             model=settings.OPENAI_MODEL,
             temperature=settings.OPENAI_TEMPERATURE,
             messages=[
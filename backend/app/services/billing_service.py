@@ -1,9 +1,26 @@
 """
 Billing service: registra costos de llamadas a APIs externas.
+Las trazas se encolan en memoria y un task en background las inserta en lote
+(por tamaño o por tiempo) con su propia sesión: registrar no hace commit en
+la sesión del caller ni puede deshacer su trabajo pendiente.
+
+Las llamadas a proveedores se instrumentan con `track(service, sku)`, que mide
+latencia y status y toma run_id/stage del contexto (`set_run_context`).
 """
+import asyncio
 import logging
 import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
 from app.models.billing import BillingTrace
 
 logger = logging.getLogger(__name__)
@@ -18,13 +35,35 @@ COST_PER_UNIT = {
     "mapbox_distance_matrix": 0.00075,
     "openai_classify": 0.00015 / 1000,  # per token approx
     "openai_normalize": 0.00015 / 1000,
+    "openai_time_window": 0.00015 / 1000,
+    "openai_resolve_poi": 0.00015 / 1000,
+}
+
+# run_id / stage de la operación en curso (ruta, lote de pendientes...).
+# Se heredan en los tasks creados después de fijarlos.
+_run_id: ContextVar[Optional[str]] = ContextVar("billing_run_id", default=None)
+_stage: ContextVar[Optional[str]] = ContextVar("billing_stage", default=None)
+
+_queue: Optional[asyncio.Queue] = None
+_task: Optional[asyncio.Task] = None
+_STOP = object()
+
+# Contadores del proceso: una traza que no se pudo escribir no puede
+# quedar sólo en el log
+_stats = {
+    "written": 0,
+    "failed": 0,          # trazas de lotes que fallaron al insertar
+    "dropped": 0,         # cola llena
+    "last_error": None,
+    "last_error_at": None,
+    "last_flush_at": None,
 }
 
 
 async def record(
-    db: AsyncSession,
-    run_id: str,
-    stage: str,
+    db: Optional[AsyncSession],
+    run_id: Optional[str],
+    stage: Optional[str],
     service: str,
     sku: str,
     units: int = 1,
@@ -32,22 +71,145 @@ async def record(
     latency_ms: int = 0,
     metadata: dict = None,
 ) -> None:
-    """Registra una traza de billing."""
+    """
+    Registra una traza de billing (write-behind: se persiste en el próximo flush).
+    `db` se mantiene por compatibilidad y no se usa.
+    """
     estimated_cost = COST_PER_UNIT.get(f"{service}_{sku}", 0.0) * units
-    entry = BillingTrace(
-        run_id=run_id,
-        stage=stage,
-        service=service,
-        sku=sku,
-        units=units,
-        response_code=response_code,
-        latency_ms=latency_ms,
-        estimated_cost=estimated_cost,
-        metadata_=metadata or {},
-    )
-    db.add(entry)
+    _enqueue({
+        "run_id": run_id,
+        "stage": stage,
+        "service": service,
+        "sku": sku,
+        "units": units,
+        "response_code": response_code,
+        "latency_ms": latency_ms,
+        "estimated_cost": estimated_cost,
+        "metadata_": metadata or {},
+    })
+
+
+def set_run_context(run_id: Optional[str], stage: Optional[str] = None) -> None:
+    """Asocia las trazas siguientes del task actual (y sus hijos) a run_id/stage."""
+    _run_id.set(run_id)
+    _stage.set(stage)
+
+
+@dataclass
+class ProviderCall:
+    """Datos de una llamada en curso; el caller ajusta units/response_code."""
+    units: int = 1
+    response_code: int = 200
+
+
+@asynccontextmanager
+async def track(service: str, sku: str, units: int = 1) -> AsyncIterator[ProviderCall]:
+    """
+    Mide una llamada saliente y la registra en billing al terminar, falle o no.
+    Los errores HTTP toman su status; otras excepciones (red) y las llamadas
+    canceladas (timeout de wait_for, perdedor de un hedge) quedan con 0.
+
+        async with billing_service.track("ors", "distance_matrix", units=n * n):
+            resp = await client.post(...)
+    """
+    call = ProviderCall(units=units)
+    start = time.perf_counter()
     try:
-        await db.commit()
+        yield call
     except Exception as e:
-        logger.warning(f"Error guardando billing trace: {e}")
-        await db.rollback()
+        response = getattr(e, "response", None)
+        call.response_code = (
+            getattr(e, "status_code", None) or getattr(response, "status_code", None) or 0
+        )
+        raise
+    except asyncio.CancelledError:
+        # BaseException: no entra en el except de arriba
+        call.response_code = 0
+        raise
+    finally:
+        await record(
+            None,
+            run_id=_run_id.get(),
+            stage=_stage.get(),
+            service=service,
+            sku=sku,
+            units=call.units,
+            response_code=call.response_code,
+            latency_ms=int((time.perf_counter() - start) * 1000),
+        )
+
+
+def _enqueue(entry: dict) -> None:
+    global _queue, _task
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=settings.BILLING_QUEUE_MAXSIZE)
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_run())
+    try:
+        _queue.put_nowait(entry)
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+        logger.warning("Cola de billing llena, traza descartada")
+
+
+def stats() -> dict:
+    """Estado del write-behind; ok=False si el último flush falló."""
+    return {
+        **_stats,
+        "pending": _queue.qsize() if _queue is not None else 0,
+        "ok": _stats["last_error"] is None,
+    }
+
+
+async def stop() -> None:
+    """Escribe lo pendiente y detiene el flusher (usado en el shutdown de la app)."""
+    global _task
+    if _task is None or _task.done():
+        return
+    await _queue.put(_STOP)
+    await _task
+    _task = None
+
+
+async def _run() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await _queue.get()
+        if item is _STOP:
+            return
+        batch = [item]
+        stopping = False
+        deadline = loop.time() + settings.BILLING_FLUSH_INTERVAL_SECONDS
+        while len(batch) < settings.BILLING_FLUSH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                stopping = True
+                break
+            batch.append(item)
+        await _flush(batch)
+        if stopping:
+            return
+
+
+async def _flush(batch: list[dict]) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(insert(BillingTrace), batch)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Error guardando {len(batch)} billing traces: {e}")
+            await db.rollback()
+            _stats["failed"] += len(batch)
+            _stats["last_error"] = str(e)[:500]
+            _stats["last_error_at"] = now
+            return
+    _stats["written"] += len(batch)
+    _stats["last_error"] = None
+    _stats["last_flush_at"] = now
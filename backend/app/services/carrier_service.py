@@ -3,6 +3,7 @@ Carrier detection service.
 Migra: classifyTransportRegex_(), classifyTransportAI_(), determinarCategoriaFinal_()
 """
 import re
+import time
 import logging
 from dataclasses import dataclass
 from typing import Optional
@@ -11,8 +12,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.models.carrier import Carrier
-from app.core.constants import RE_PICKUP
-from app.services import ai_service
+from app.services import ai_service, window_service
+from app.services.window_service import ObservationAnalysis
 
 logger = logging.getLogger(__name__)
 
@@ -25,17 +26,59 @@ class CarrierDetection:
     confidence: float = 1.0
 
 
+@dataclass(frozen=True)
+class CarrierRules:
+    """Carriers activos con regex, compilados y ordenados por prioridad_regex."""
+    patterns: tuple[tuple[str, re.Pattern], ...]
+    ids: dict[str, int]
+
+
+_RULES_TTL_SECONDS = 60
+_rules_cache: Optional[tuple[float, CarrierRules]] = None
+
+
+def invalidate_rules() -> None:
+    """Descarta las reglas compiladas (llamar al crear/editar/borrar carriers)."""
+    global _rules_cache
+    _rules_cache = None
+
+
+async def get_rules(db: AsyncSession) -> CarrierRules:
+    """Reglas de carriers compiladas, cacheadas en memoria por _RULES_TTL_SECONDS."""
+    global _rules_cache
+    now = time.monotonic()
+    if _rules_cache and now - _rules_cache[0] < _RULES_TTL_SECONDS:
+        return _rules_cache[1]
+
+    result = await db.execute(
+        select(Carrier)
+        .where(Carrier.activo == True, Carrier.regex_pattern.isnot(None))  # noqa: E712
+        .order_by(Carrier.prioridad_regex)
+    )
+    patterns = []
+    ids = {}
+    for carrier in result.scalars().all():
+        ids[carrier.nombre_canonico] = carrier.id
+        try:
+            patterns.append((carrier.nombre_canonico, re.compile(carrier.regex_pattern, re.IGNORECASE)))
+        except re.error:
+            logger.warning(f"Invalid regex in carrier {carrier.nombre_canonico}: {carrier.regex_pattern}")
+
+    rules = CarrierRules(patterns=tuple(patterns), ids=ids)
+    _rules_cache = (now, rules)
+    return rules
+
+
 def detect_pickup(texto: str) -> bool:
     """Detecta si el texto indica un retiro (sync, sin DB)."""
-    if not texto:
-        return False
-    return bool(re.search(RE_PICKUP, texto.upper(), re.IGNORECASE))
+    return window_service.detect_pickup(texto)
 
 
 async def detect(
     db: AsyncSession,
     texto: str,
     provincia: Optional[str] = None,
+    analysis: Optional[ObservationAnalysis] = None,
 ) -> CarrierDetection:
     """
     Cascade de detección de carrier:
@@ -43,13 +86,18 @@ async def detect(
     2. Carriers de DB con regex (prioridad_regex ASC)
     3. AI fallback
     4. Reglas finales
+
+    `analysis` permite reutilizar un análisis ya hecho del mismo texto con
+    las reglas de get_rules(); si no se pasa, se calcula (memoizado).
     """
     if not texto:
         texto = ""
-    upper_text = texto.upper()
+    rules = await get_rules(db)
+    if analysis is None:
+        analysis = window_service.analyze_observation(texto, rules.patterns)
 
     # 1. Pickup hardcoded
-    if re.search(RE_PICKUP, upper_text, re.IGNORECASE):
+    if analysis.pickup:
         carrier = await _find_by_name(db, "RETIRO EN GALPON")
         return CarrierDetection(
             carrier_id=carrier.id if carrier else None,
@@ -59,33 +107,22 @@ async def detect(
         )
 
     # 2. Regex de DB ordenados por prioridad
-    result = await db.execute(
-        select(Carrier)
-        .where(Carrier.activo == True, Carrier.regex_pattern.isnot(None))  # noqa: E712
-        .order_by(Carrier.prioridad_regex)
-    )
-    carriers = result.scalars().all()
-
-    for carrier in carriers:
-        try:
-            if re.search(carrier.regex_pattern, upper_text, re.IGNORECASE):
-                return CarrierDetection(
-                    carrier_id=carrier.id,
-                    nombre_canonico=carrier.nombre_canonico,
-                    source="regex",
-                    confidence=1.0,
-                )
-        except re.error:
-            logger.warning(f"Invalid regex in carrier {carrier.nombre_canonico}: {carrier.regex_pattern}")
+    if analysis.carrier_hint is not None:
+        return CarrierDetection(
+            carrier_id=rules.ids.get(analysis.carrier_hint),
+            nombre_canonico=analysis.carrier_hint,
+            source="regex",
+            confidence=1.0,
+        )
 
     # 3. AI fallback
     ai_result = await ai_service.classify_transport(texto)
     if ai_result and ai_result.confianza >= 0.85:
-        for carrier in carriers:
-            if carrier.nombre_canonico.upper() == ai_result.transportista.upper():
+        for nombre, carrier_id in rules.ids.items():
+            if nombre.upper() == ai_result.transportista.upper():
                 return CarrierDetection(
-                    carrier_id=carrier.id,
-                    nombre_canonico=carrier.nombre_canonico,
+                    carrier_id=carrier_id,
+                    nombre_canonico=nombre,
                     source="ai",
                     confidence=ai_result.confianza,
                 )
@@ -0,0 +1,42 @@
+"""
+Configuración de ruta (tabla config_ruta) cacheada en memoria.
+Se lee una vez por worker y se vuelve a leer al vencer el TTL o al
+modificarla desde /config (invalidate()).
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.ttl_cache import TTLCache
+from app.models.config import ConfigRuta
+
+CONFIG_TTL_SECONDS = 60
+
+_cache = TTLCache(ttl_seconds=CONFIG_TTL_SECONDS, maxsize=1)
+
+
+def _parse(row: ConfigRuta):
+    if row.tipo in ("int", "integer"):
+        return int(row.value)
+    if row.tipo == "float":
+        return float(row.value)
+    if row.tipo in ("bool", "boolean"):
+        return row.value.lower() in ("true", "1", "yes", "si")
+    return row.value
+
+
+async def _load(db: AsyncSession) -> dict:
+    rows = (await db.execute(select(ConfigRuta))).scalars().all()
+    return {row.key: _parse(row) for row in rows}
+
+
+async def get_config(db: AsyncSession) -> dict:
+    """Config parseada según `tipo`. Retorna una copia: el caller puede modificarla."""
+    return dict(await _cache.get_or_compute("config", lambda: _load(db)))
+
+
+async def get_value(db: AsyncSession, key: str, default=None):
+    return (await get_config(db)).get(key, default)
+
+
+def invalidate() -> None:
+    _cache.invalidate()
@@ -2,11 +2,13 @@
 Delivery service: marca remitos como entregados / mueve a histórico.
 """
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, func, literal, any_, Integer, String, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.models.remito import Remito, RemitoEstadoLifecycle
 from app.models.ruta import RutaParada, ParadaEstado
@@ -16,120 +18,190 @@ from app.models.carrier import Carrier
 logger = logging.getLogger(__name__)
 
 
+def _scan_select():
+    """Columnas que devuelve el escaneo, con el carrier resuelto por JOIN."""
+    return (
+        select(
+            Remito.id,
+            Remito.numero,
+            Remito.cliente,
+            func.coalesce(func.nullif(Remito.direccion_normalizada, ""), Remito.direccion_raw).label("direccion"),
+            Remito.estado_lifecycle,
+            Remito.estado_clasificacion,
+            Carrier.nombre_canonico.label("carrier_nombre"),
+            Remito.es_urgente,
+            Remito.es_prioridad,
+            Remito.lat,
+            Remito.lng,
+        )
+        .outerjoin(Carrier, Carrier.id == Remito.carrier_id)
+    )
+
+
+def _scan_found(row) -> dict:
+    return {"encontrado": True, **row._asdict()}
+
+
+def _scan_not_found(numero: str) -> dict:
+    return {"encontrado": False, "numero": numero, "mensaje": "Remito no encontrado"}
+
+
 async def scan_qr(db: AsyncSession, numero: str) -> dict:
     """Escanea QR: busca remito por número y retorna estado."""
-    result = await db.execute(select(Remito).where(Remito.numero == numero.upper()))
-    remito = result.scalar_one_or_none()
-    if remito is None:
-        return {"encontrado": False, "numero": numero, "mensaje": "Remito no encontrado"}
-
-    carrier_nombre = None
-    if remito.carrier_id:
-        cres = await db.execute(select(Carrier).where(Carrier.id == remito.carrier_id))
-        c = cres.scalar_one_or_none()
-        carrier_nombre = c.nombre_canonico if c else None
-
-    return {
-        "encontrado": True,
-        "id": remito.id,
-        "numero": remito.numero,
-        "cliente": remito.cliente,
-        "direccion": remito.direccion_normalizada or remito.direccion_raw,
-        "estado_lifecycle": remito.estado_lifecycle,
-        "estado_clasificacion": remito.estado_clasificacion,
-        "carrier_nombre": carrier_nombre,
-        "es_urgente": remito.es_urgente,
-        "es_prioridad": remito.es_prioridad,
-        "lat": remito.lat,
-        "lng": remito.lng,
-    }
-
-
-async def mark_entregado(db: AsyncSession, ids: list[int]) -> int:
+    row = (await db.execute(
+        _scan_select().where(Remito.numero == numero.upper())
+    )).one_or_none()
+    if row is None:
+        return _scan_not_found(numero)
+    return _scan_found(row)
+
+
+async def scan_qr_batch(db: AsyncSession, numeros: list[str]) -> list[dict]:
     """
-    Marca un lote de remitos como entregados.
-    Actualiza estado_lifecycle → 'entregado' y la parada activa → 'entregada'.
-    Retorna cantidad procesada.
+    Escanea un lote de QRs con una sola consulta (numero = ANY(...)).
+    Retorna un resultado por numero, en el orden de entrada (duplicados
+    incluidos), con el mismo formato que scan_qr.
     """
-    count = 0
-    now = datetime.now(timezone.utc)
+    numeros = [str(n).strip() for n in numeros]
+    keys = list(dict.fromkeys(n.upper() for n in numeros if n))
+    found = {}
+    if keys:
+        rows = (await db.execute(
+            _scan_select().where(Remito.numero == any_(literal(keys, type_=ARRAY(String))))
+        )).all()
+        found = {r.numero: r for r in rows}
+    return [
+        _scan_found(found[n.upper()]) if n.upper() in found else _scan_not_found(n)
+        for n in numeros
+    ]
+
 
-    for remito_id in ids:
-        result = await db.execute(select(Remito).where(Remito.id == remito_id))
-        remito = result.scalar_one_or_none()
-        if not remito:
-            continue
+@dataclass
+class BulkDeliveryResult:
+    procesados: int
+    no_encontrados: list[int]
 
-        remito.estado_lifecycle = RemitoEstadoLifecycle.entregado.value
-        remito.fecha_entregado = now
 
-        # Actualizar parada activa si existe
-        parada_res = await db.execute(
-            select(RutaParada).where(
-                RutaParada.remito_id == remito_id,
+def _ids_array(ids: list[int]):
+    """Lista de ids como un único parámetro int[] (para `= ANY(...)`)."""
+    return literal(ids, type_=ARRAY(Integer))
+
+
+async def mark_entregado(db: AsyncSession, ids: list[int]) -> BulkDeliveryResult:
+    """
+    Marca un lote de remitos como entregados.
+    Actualiza estado_lifecycle → 'entregado' y la parada pendiente más reciente
+    de cada remito → 'entregada'. Dos UPDATE set-based, sin importar el tamaño del lote.
+    """
+    unique_ids = list(dict.fromkeys(int(i) for i in ids))
+    if not unique_ids:
+        return BulkDeliveryResult(procesados=0, no_encontrados=[])
+    now = datetime.now(timezone.utc)
+
+    result = await db.execute(
+        update(Remito)
+        .where(Remito.id == any_(_ids_array(unique_ids)))
+        .values(
+            estado_lifecycle=RemitoEstadoLifecycle.entregado.value,
+            fecha_entregado=now,
+        )
+        .returning(Remito.id)
+        .execution_options(synchronize_session=False)
+    )
+    updated = set(result.scalars().all())
+
+    if updated:
+        # DISTINCT ON (remito_id) + ORDER BY id DESC → la parada pendiente más reciente
+        latest_pendiente = (
+            select(RutaParada.id)
+            .where(
+                RutaParada.remito_id == any_(_ids_array(sorted(updated))),
                 RutaParada.estado == ParadaEstado.pendiente.value,
-            ).order_by(RutaParada.id.desc()).limit(1)
+            )
+            .distinct(RutaParada.remito_id)
+            .order_by(RutaParada.remito_id, RutaParada.id.desc())
+        )
+        await db.execute(
+            update(RutaParada)
+            .where(RutaParada.id.in_(latest_pendiente))
+            .values(estado=ParadaEstado.entregada.value)
+            .execution_options(synchronize_session=False)
         )
-        parada = parada_res.scalar_one_or_none()
-        if parada:
-            parada.estado = ParadaEstado.entregada.value
-
-        count += 1
 
     await db.commit()
-    return count
+    return BulkDeliveryResult(
+        procesados=len(updated),
+        no_encontrados=[i for i in unique_ids if i not in updated],
+    )
 
 
-async def move_to_historico(db: AsyncSession, ids: list[int]) -> int:
+async def move_to_historico(db: AsyncSession, ids: list[int]) -> BulkDeliveryResult:
     """
     Mueve remitos entregados al histórico.
-    Crea HistoricoEntregado y actualiza estado_lifecycle → 'historico'.
+    Un INSERT ... SELECT (JOIN carriers) crea los HistoricoEntregado y un UPDATE
+    pasa estado_lifecycle → 'historico'.
     """
-    count = 0
+    unique_ids = list(dict.fromkeys(int(i) for i in ids))
+    if not unique_ids:
+        return BulkDeliveryResult(procesados=0, no_encontrados=[])
     now = datetime.now(timezone.utc)
     mes_cierre = now.strftime("%Y-%m")
 
-    for remito_id in ids:
-        result = await db.execute(select(Remito).where(Remito.id == remito_id))
-        remito = result.scalar_one_or_none()
-        if not remito:
-            continue
-
-        carrier_nombre = None
-        if remito.carrier_id:
-            cres = await db.execute(select(Carrier).where(Carrier.id == remito.carrier_id))
-            c = cres.scalar_one_or_none()
-            carrier_nombre = c.nombre_canonico if c else None
-
-        fecha_entregado = remito.fecha_entregado or now
-
-        historico = HistoricoEntregado(
-            remito_id=remito.id,
-            numero=remito.numero,
-            cliente=remito.cliente or "",
-            direccion_snapshot=remito.direccion_normalizada or remito.direccion_raw or "",
-            localidad=remito.localidad,
-            observaciones=remito.observaciones or "",
-            lat=remito.lat,
-            lng=remito.lng,
-            carrier_nombre=carrier_nombre,
-            es_urgente=remito.es_urgente,
-            es_prioridad=remito.es_prioridad,
-            obs_entrega="",
-            estado_al_archivar=remito.estado_lifecycle,
-            fecha_ingreso=remito.fecha_ingreso,
-            fecha_armado=remito.fecha_armado,
-            fecha_entregado=fecha_entregado,
-            mes_cierre=mes_cierre,
+    source = (
+        select(
+            Remito.id,
+            Remito.numero,
+            func.coalesce(Remito.cliente, ""),
+            func.coalesce(Remito.direccion_normalizada, Remito.direccion_raw, ""),
+            Remito.localidad,
+            func.coalesce(Remito.observaciones, ""),
+            Remito.lat,
+            Remito.lng,
+            Carrier.nombre_canonico,
+            Remito.es_urgente,
+            Remito.es_prioridad,
+            literal(""),
+            Remito.estado_lifecycle,
+            Remito.fecha_ingreso,
+            Remito.fecha_armado,
+            func.coalesce(Remito.fecha_entregado, literal(now, type_=DateTime(timezone=True))),
+            literal(mes_cierre),
+        )
+        .select_from(Remito)
+        .outerjoin(Carrier, Carrier.id == Remito.carrier_id)
+        .where(Remito.id == any_(_ids_array(unique_ids)))
+    )
+    result = await db.execute(
+        insert(HistoricoEntregado)
+        .from_select(
+            [
+                "remito_id", "numero", "cliente", "direccion_snapshot", "localidad",
+                "observaciones", "lat", "lng", "carrier_nombre", "es_urgente",
+                "es_prioridad", "obs_entrega", "estado_al_archivar", "fecha_ingreso",
+                "fecha_armado", "fecha_entregado", "mes_cierre",
+            ],
+            source,
+        )
+        .returning(HistoricoEntregado.remito_id)
+    )
+    archived = set(result.scalars().all())
+
+    if archived:
+        await db.execute(
+            update(Remito)
+            .where(Remito.id == any_(_ids_array(sorted(archived))))
+            .values(
+                estado_lifecycle=RemitoEstadoLifecycle.historico.value,
+                fecha_historico=now,
+            )
+            .execution_options(synchronize_session=False)
         )
-        db.add(historico)
-
-        remito.estado_lifecycle = RemitoEstadoLifecycle.historico.value
-        remito.fecha_historico = now
-        count += 1
 
     await db.commit()
-    return count
+    return BulkDeliveryResult(
+        procesados=len(archived),
+        no_encontrados=[i for i in unique_ids if i not in archived],
+    )
 
 
 async def restore_from_historico(db: AsyncSession, historico_id: int) -> None:
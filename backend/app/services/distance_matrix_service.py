@@ -1,6 +1,6 @@
 """
 Distance Matrix Service.
-Calcula matrices NxN de tiempos de viaje.
+Calcula matrices NxN de tiempos de viaje, por franja horaria.
 Cache en BD usando coordenadas Float (sin GeoAlchemy2).
 """
 import logging
@@ -13,8 +13,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.distance_cache import DistanceMatrixCache
-from app.core.constants import URBAN_SPEED_KMH
-from app.core.haversine import haversine_minutes
+from app.services import billing_service, travel_model_service
 
 logger = logging.getLogger(__name__)
 
@@ -33,11 +32,34 @@ async def get_matrix_nxn(
     db: AsyncSession,
     points: list[MatrixPoint],
     provider: str = "ors",
+    stats: Optional[dict] = None,
 ) -> list[list[float]]:
+    """Matriz NxN de tiempos de viaje en minutos, en flujo libre. Ver get_matrices()."""
+    return (await get_matrices(db, points, {None: 1.0}, provider, stats))[None]
+
+
+async def get_matrices(
+    db: AsyncSession,
+    points: list[MatrixPoint],
+    factors: dict[Optional[str], float],
+    provider: str = "ors",
+    stats: Optional[dict] = None,
+) -> dict[Optional[str], list[list[float]]]:
     """
-    Retorna una matriz NxN de tiempos de viaje en minutos.
+    Matrices NxN de tiempos de viaje en minutos, una por franja horaria
+    (`factors`: franja → factor, ver core/time_buckets.py).
     Intenta primero el cache, luego llama a la API externa si no está completo.
+    Lo que falte se estima con el modelo de viaje por zonas.
+
+    ORS Matrix y OSRM Table no aceptan hora de salida: el cache guarda flujo
+    libre y cada franja es esa matriz × su factor, así que pedir varias
+    franjas no cuesta llamadas extra.
+
+    Si se pasa `stats`, se completa con contadores (hits/misses de cache,
+    celdas pedidas al proveedor, celdas resueltas por el modelo por zonas).
     """
+    if stats is None:
+        stats = {}
     n = len(points)
     matrix: list[list[Optional[float]]] = [[None] * n for _ in range(n)]
 
@@ -45,6 +67,9 @@ async def get_matrix_nxn(
     for i in range(n):
         matrix[i][i] = 0.0
 
+    # Antes que nada: si el proveedor falla la sesión puede quedar inutilizable
+    travel = await travel_model_service.get_model(db)
+
     # Intentar cache
     now = datetime.now(timezone.utc)
     for i in range(n):
@@ -57,35 +82,40 @@ async def get_matrix_nxn(
 
     # Pares faltantes
     missing = [(i, j) for i in range(n) for j in range(n) if matrix[i][j] is None]
-    if not missing:
-        return _ensure_float(matrix)
-
-    try:
-        if provider == "ors":
-            api_matrix = await _call_ors(points)
-        else:
-            api_matrix = await _call_osrm(points)
-
-        for i, row in enumerate(api_matrix):
-            for j, val in enumerate(row):
-                if matrix[i][j] is None and val is not None:
+    stats["dm_cache_hits"] = n * (n - 1) - len(missing)
+    stats["dm_cache_misses"] = len(missing)
+
+    if missing:
+        try:
+            if provider == "ors":
+                api_matrix, api_dist = await _call_ors(points)
+            else:
+                api_matrix, api_dist = await _call_osrm(points)
+            stats["dm_provider_cells"] = n * n
+
+            for i, j in missing:
+                val = api_matrix[i][j]
+                if val is not None:
                     matrix[i][j] = val
-                    await _save_cache(db, points[i], points[j], val, now)
-        await db.commit()
-    except Exception as exc:
-        logger.warning(f"DM API error ({provider}): {exc}. Usando Haversine fallback.")
-
-    # Fallback Haversine para los que siguen siendo None
-    for i in range(n):
-        for j in range(n):
-            if matrix[i][j] is None:
-                matrix[i][j] = haversine_minutes(
-                    points[i].lat, points[i].lng,
-                    points[j].lat, points[j].lng,
-                    URBAN_SPEED_KMH
-                )
-
-    return _ensure_float(matrix)
+                    await _save_cache(db, points[i], points[j], val, api_dist[i][j], now, provider)
+            await db.commit()
+        except Exception as exc:
+            logger.warning(f"DM API error ({provider}): {exc}. Usando modelo por zonas.")
+            stats["dm_provider_errors"] = 1
+
+        # Fallback (modelo por zonas) para los que siguen siendo None
+        stats["dm_model_cells"] = sum(row.count(None) for row in matrix)
+        if stats["dm_model_cells"]:
+            estimated, _ = travel.matrix([(p.lat, p.lng) for p in points])
+            for i, j in missing:
+                if matrix[i][j] is None:
+                    matrix[i][j] = estimated[i][j]
+
+    free_flow = _ensure_float(matrix)
+    return {
+        f: free_flow if k == 1.0 else [[v * k for v in row] for row in free_flow]
+        for f, k in factors.items()
+    }
 
 
 def _ensure_float(matrix: list[list]) -> list[list[float]]:
@@ -101,7 +131,7 @@ async def _lookup_cache(
     """Busca en cache usando tolerancia Float."""
     tol = CACHE_TOL
     result = await db.execute(
-        select(DistanceMatrixCache).where(
+        select(DistanceMatrixCache.duration_sec).where(
             DistanceMatrixCache.origin_lat.between(origin.lat - tol, origin.lat + tol),
             DistanceMatrixCache.origin_lng.between(origin.lng - tol, origin.lng + tol),
             DistanceMatrixCache.dest_lat.between(dest.lat - tol, dest.lat + tol),
@@ -109,9 +139,9 @@ async def _lookup_cache(
             DistanceMatrixCache.expires_at > now,
         ).limit(1)
     )
-    row = result.scalar_one_or_none()
-    if row:
-        return row.duration_sec / 60.0
+    duration_sec = result.scalar_one_or_none()
+    if duration_sec is not None:
+        return duration_sec / 60.0
     return None
 
 
@@ -120,7 +150,9 @@ async def _save_cache(
     origin: MatrixPoint,
     dest: MatrixPoint,
     duracion_min: float,
+    distancia_m: Optional[float],
     now: datetime,
+    provider: str,
 ) -> None:
     expires = now + timedelta(hours=CACHE_TTL_HOURS)
     entry = DistanceMatrixCache(
@@ -129,7 +161,8 @@ async def _save_cache(
         dest_lat=dest.lat,
         dest_lng=dest.lng,
         duration_sec=round(duracion_min * 60.0, 2),
-        provider="ors",
+        distance_m=round(distancia_m, 1) if distancia_m is not None else None,
+        provider=provider,
         expires_at=expires,
     )
     db.add(entry)
@@ -139,8 +172,10 @@ async def _save_cache(
 # API Calls
 # ---------------------------------------------------------------------------
 
-async def _call_ors(points: list[MatrixPoint]) -> list[list[float]]:
-    """Llama a OpenRouteService Matrix API."""
+async def _call_ors(
+    points: list[MatrixPoint],
+) -> tuple[list[list[Optional[float]]], list[list[Optional[float]]]]:
+    """Llama a OpenRouteService Matrix API. Devuelve (minutos, metros)."""
     from app.config import settings
 
     if not getattr(settings, "ORS_API_KEY", None):
@@ -149,14 +184,16 @@ async def _call_ors(points: list[MatrixPoint]) -> list[list[float]]:
     locations = [[p.lng, p.lat] for p in points]
     payload = {
         "locations": locations,
-        "metrics": ["duration"],
+        "metrics": ["duration", "distance"],
         "units": "km",
     }
     headers = {
         "Authorization": settings.ORS_API_KEY,
         "Content-Type": "application/json",
     }
-    async with httpx.AsyncClient(timeout=30) as client:
+    n = len(points)
+    async with billing_service.track("ors", "distance_matrix", units=n * n), \
+            httpx.AsyncClient(timeout=30) as client:
         resp = await client.post(
             "https://api.openrouteservice.org/v2/matrix/driving-car",
             json=payload,
@@ -165,20 +202,32 @@ async def _call_ors(points: list[MatrixPoint]) -> list[list[float]]:
         resp.raise_for_status()
         data = resp.json()
     durations = data["durations"]  # segundos
-    return [[v / 60.0 for v in row] for row in durations]
+    distances = data.get("distances") or [[None] * n for _ in range(n)]  # km (units=km)
+    return (
+        [[v / 60.0 if v is not None else None for v in row] for row in durations],
+        [[v * 1000.0 if v is not None else None for v in row] for row in distances],
+    )
 
 
-async def _call_osrm(points: list[MatrixPoint]) -> list[list[float]]:
-    """Llama a OSRM Table API (instancia pública o propia)."""
+async def _call_osrm(
+    points: list[MatrixPoint],
+) -> tuple[list[list[Optional[float]]], list[list[Optional[float]]]]:
+    """Llama a OSRM Table API (instancia pública o propia). Devuelve (minutos, metros)."""
     from app.config import settings
-    base_url = getattr(settings, "OSRM_BASE_URL", "http://router.project-osrm.org")
+    base_url = settings.OSRM_BASE_URL.rstrip("/")
 
     coords_str = ";".join(f"{p.lng},{p.lat}" for p in points)
-    url = f"{base_url}/table/v1/driving/{coords_str}?annotations=duration"
+    url = f"{base_url}/table/v1/driving/{coords_str}?annotations=duration,distance"
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    n = len(points)
+    async with billing_service.track("osrm", "distance_matrix", units=n * n), \
+            httpx.AsyncClient(timeout=30) as client:
         resp = await client.get(url)
         resp.raise_for_status()
         data = resp.json()
     durations = data["durations"]  # segundos
-    return [[v / 60.0 for v in row] for row in durations]
+    distances = data.get("distances") or [[None] * n for _ in range(n)]  # metros
+    return (
+        [[v / 60.0 if v is not None else None for v in row] for row in durations],
+        distances,
+    )
@@ -1,97 +1,212 @@
 """
-Export service: genera XLSX mensual del histórico de entregas.
+Export service: genera XLSX / CSV mensual del histórico de entregas.
+Ambos formatos se escriben en streaming, sin materializar el mes en memoria.
 """
+import csv
 import io
 import logging
+import os
+import tempfile
 from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, delete, func, case, extract, literal, literal_column, tuple_
 
-from app.models.historico import HistoricoEntregado
+from app.models.historico import HistoricoEntregado, HistoricoResumenMensual
 
 logger = logging.getLogger(__name__)
 
 
-async def export_historico_xlsx(db: AsyncSession, mes: str) -> bytes:
+# (encabezado, columna, formateador) — el orden define las columnas del archivo
+_EXPORT_COLUMNS: list[tuple[str, Any, Callable[[Any], Any]]] = [
+    ("Remito", HistoricoEntregado.numero, lambda v: v),
+    ("Cliente", HistoricoEntregado.cliente, lambda v: v),
+    ("Domicilio", HistoricoEntregado.direccion_snapshot, lambda v: v),
+    ("Localidad", HistoricoEntregado.localidad, lambda v: v),
+    ("Carrier", HistoricoEntregado.carrier_nombre, lambda v: v),
+    ("Urgente", HistoricoEntregado.es_urgente, lambda v: "Sí" if v else "No"),
+    ("Prioridad", HistoricoEntregado.es_prioridad, lambda v: "Sí" if v else "No"),
+    ("Fecha Ingreso", HistoricoEntregado.fecha_ingreso, lambda v: _fmt_dt(v)),
+    ("Fecha Armado", HistoricoEntregado.fecha_armado, lambda v: _fmt_dt(v)),
+    ("Fecha Entregado", HistoricoEntregado.fecha_entregado, lambda v: _fmt_dt(v)),
+    ("Observaciones", HistoricoEntregado.observaciones, lambda v: v),
+    ("Mes Cierre", HistoricoEntregado.mes_cierre, lambda v: v),
+]
+
+EXPORT_HEADERS = [h for h, _, _ in _EXPORT_COLUMNS]
+_YIELD_PER = 1000
+_WIDTH_SAMPLE_ROWS = 500
+
+
+def _fmt_dt(v: Optional[datetime]) -> str:
+    return v.strftime("%Y-%m-%d %H:%M") if v else ""
+
+
+async def iter_historico_rows(db: AsyncSession, mes: str) -> AsyncIterator[list]:
     """
-    Genera un XLSX con las entregas del mes indicado (formato 'YYYY-MM').
-    Retorna bytes del archivo.
+    Filas ya formateadas del histórico de un mes, leídas con cursor del lado
+    del servidor (yield_per) y sólo con las columnas exportadas.
+    """
+    stmt = (
+        select(*(col for _, col, _ in _EXPORT_COLUMNS))
+        .where(HistoricoEntregado.mes_cierre == mes)
+        .order_by(HistoricoEntregado.fecha_entregado)
+        .execution_options(yield_per=_YIELD_PER)
+    )
+    result = await db.stream(stmt)
+    async for row in result:
+        yield [fmt(v) for (_, _, fmt), v in zip(_EXPORT_COLUMNS, row)]
+
+
+async def export_historico_xlsx(db: AsyncSession, mes: str) -> str:
+    """
+    Genera un XLSX con las entregas del mes indicado (formato 'YYYY-MM')
+    en un archivo temporal y retorna su path (el caller lo borra).
+    Usa openpyxl en modo write_only: las filas van directo a disco; el ancho
+    de columnas se calcula con las primeras filas.
     """
     try:
         import openpyxl
+        from openpyxl.cell import WriteOnlyCell
         from openpyxl.styles import Font, PatternFill, Alignment
+        from openpyxl.utils import get_column_letter
     except ImportError:
         raise RuntimeError("openpyxl no instalado. Añadir a requirements.txt")
 
-    result = await db.execute(
-        select(HistoricoEntregado)
-        .where(HistoricoEntregado.mes_cierre == mes)
-        .order_by(HistoricoEntregado.fecha_entregado)
-    )
-    rows = result.scalars().all()
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Entregas {mes}"
-
-    headers = [
-        "Remito", "Cliente", "Domicilio", "Localidad",
-        "Carrier", "Urgente", "Prioridad",
-        "Fecha Ingreso", "Fecha Armado", "Fecha Entregado",
-        "Observaciones", "Mes Cierre",
-    ]
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=f"Entregas {mes}")
+
+    rows = iter_historico_rows(db, mes)
+    sample = []
+    async for row in rows:
+        sample.append(row)
+        if len(sample) >= _WIDTH_SAMPLE_ROWS:
+            break
+
+    # En write_only los anchos deben fijarse antes de escribir filas
+    for col, header in enumerate(EXPORT_HEADERS, start=1):
+        max_len = max([len(header)] + [len(str(r[col - 1] or "")) for r in sample])
+        ws.column_dimensions[get_column_letter(col)].width = min(max_len + 2, 50)
+
     header_font = Font(bold=True, color="FFFFFF")
     header_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col, value=header)
+    header_cells = []
+    for header in EXPORT_HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
         cell.font = header_font
         cell.fill = header_fill
         cell.alignment = Alignment(horizontal="center")
+        header_cells.append(cell)
+    ws.append(header_cells)
 
-    for row_num, h in enumerate(rows, start=2):
-        ws.cell(row=row_num, column=1, value=h.numero)
-        ws.cell(row=row_num, column=2, value=h.cliente)
-        ws.cell(row=row_num, column=3, value=h.direccion_snapshot)
-        ws.cell(row=row_num, column=4, value=h.localidad)
-        ws.cell(row=row_num, column=5, value=h.carrier_nombre)
-        ws.cell(row=row_num, column=6, value="Sí" if h.es_urgente else "No")
-        ws.cell(row=row_num, column=7, value="Sí" if h.es_prioridad else "No")
-        ws.cell(row=row_num, column=8,
-                value=h.fecha_ingreso.strftime("%Y-%m-%d %H:%M") if h.fecha_ingreso else "")
-        ws.cell(row=row_num, column=9,
-                value=h.fecha_armado.strftime("%Y-%m-%d %H:%M") if h.fecha_armado else "")
-        ws.cell(row=row_num, column=10,
-                value=h.fecha_entregado.strftime("%Y-%m-%d %H:%M") if h.fecha_entregado else "")
-        ws.cell(row=row_num, column=11, value=h.observaciones)
-        ws.cell(row=row_num, column=12, value=h.mes_cierre)
-
-    for col in ws.columns:
-        max_len = max((len(str(c.value or "")) for c in col), default=10)
-        ws.column_dimensions[col[0].column_letter].width = min(max_len + 2, 50)
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return buf.read()
-
-
-async def monthly_close(db: AsyncSession) -> int:
-    """
-    Cierre mensual: retorna cantidad de registros archivados del mes anterior.
-    En este sistema el histórico ya está en DB — el cierre simplemente reporta.
-    """
+    for row in sample:
+        ws.append(row)
+    if len(sample) >= _WIDTH_SAMPLE_ROWS:
+        async for row in rows:
+            ws.append(row)
+
+    fd, path = tempfile.mkstemp(prefix=f"historico_{mes}_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb.save(path)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+async def iter_historico_csv(db: AsyncSession, mes: str) -> AsyncIterator[str]:
+    """CSV del histórico de un mes, de a bloques de líneas (para StreamingResponse)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")  # BOM: Excel detecta UTF-8
+    writer.writerow(EXPORT_HEADERS)
+    n = 0
+    async for row in iter_historico_rows(db, mes):
+        writer.writerow(row)
+        n += 1
+        if n % _YIELD_PER == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _mes_anterior() -> str:
     now = datetime.now(timezone.utc)
     if now.month == 1:
-        mes_anterior = f"{now.year - 1}-12"
-    else:
-        mes_anterior = f"{now.year}-{now.month - 1:02d}"
+        return f"{now.year - 1}-12"
+    return f"{now.year}-{now.month - 1:02d}"
+
 
-    result = await db.execute(
-        select(HistoricoEntregado).where(
-            HistoricoEntregado.mes_cierre == mes_anterior
+async def monthly_close(db: AsyncSession, mes: Optional[str] = None) -> int:
+    """
+    Cierre mensual del mes indicado (default: el anterior). Recalcula en SQL
+    el resumen del mes en historico_resumen_mensual (total, por carrier y por
+    localidad, en un solo GROUPING SETS) y retorna la cantidad de entregas.
+    Es idempotente: re-ejecutarlo reemplaza el resumen del mes.
+    """
+    mes = mes or _mes_anterior()
+    H = HistoricoEntregado
+    # '' literal (no parámetro) para que GROUP BY y GROUPING() matcheen la expresión
+    carrier = func.coalesce(H.carrier_nombre, literal_column("''"))
+    localidad = func.coalesce(H.localidad, literal_column("''"))
+    por_carrier = func.grouping(carrier) == 0
+    por_localidad = func.grouping(localidad) == 0
+
+    resumen = (
+        select(
+            literal(mes).label("mes_cierre"),
+            case((por_carrier, "carrier"), (por_localidad, "localidad"), else_="total").label("dimension"),
+            case((por_carrier, carrier), (por_localidad, localidad), else_="").label("valor"),
+            func.count().label("entregas"),
+            func.count().filter(H.es_urgente.is_(True)).label("urgentes"),
+            func.count().filter(H.es_prioridad.is_(True)).label("prioridad"),
+            func.avg(extract("epoch", H.fecha_entregado - H.fecha_ingreso) / 60).label("lead_time_promedio_min"),
         )
+        .where(H.mes_cierre == mes)
+        .group_by(func.grouping_sets(tuple_(), tuple_(carrier), tuple_(localidad)))
     )
-    entries = result.scalars().all()
-    return len(entries)
+
+    await db.execute(delete(HistoricoResumenMensual).where(HistoricoResumenMensual.mes_cierre == mes))
+    cols = ["mes_cierre", "dimension", "valor", "entregas", "urgentes", "prioridad", "lead_time_promedio_min"]
+    rows = (await db.execute(
+        insert(HistoricoResumenMensual)
+        .from_select(cols, resumen)
+        .returning(HistoricoResumenMensual.dimension, HistoricoResumenMensual.entregas)
+    )).all()
+    await db.commit()
+
+    total = next((n for dim, n in rows if dim == "total"), 0)
+    logger.info(f"Cierre mensual {mes}: {total} entregas, {len(rows)} filas de resumen")
+    return total
+
+
+async def get_monthly_summary(db: AsyncSession, mes: str) -> Optional[dict]:
+    """Resumen precalculado de un mes cerrado, o None si no se cerró todavía."""
+    rows = (await db.execute(
+        select(HistoricoResumenMensual)
+        .where(HistoricoResumenMensual.mes_cierre == mes)
+        .order_by(HistoricoResumenMensual.dimension, HistoricoResumenMensual.entregas.desc())
+    )).scalars().all()
+    if not rows:
+        return None
+
+    def _item(r: HistoricoResumenMensual) -> dict:
+        return {
+            "entregas": r.entregas,
+            "urgentes": r.urgentes,
+            "prioridad": r.prioridad,
+            "lead_time_promedio_min": (
+                round(r.lead_time_promedio_min, 1) if r.lead_time_promedio_min is not None else None
+            ),
+        }
+
+    resumen = {"mes": mes, "total": None, "por_carrier": {}, "por_localidad": {}}
+    for r in rows:
+        if r.dimension == "total":
+            resumen["total"] = _item(r)
+        else:
+            resumen[f"por_{r.dimension}"][r.valor or "sin dato"] = _item(r)
+    return resumen
@@ -0,0 +1,315 @@
+"""
+Gazetteer local: coordenadas ya confirmadas de direcciones conocidas.
+
+Índice en memoria (uno por worker) construido desde historico_entregados
+(entregas reales) y geo_cache (resultados de proveedores, aunque estén
+vencidos). geocode() lo consulta entre el cache en DB y los proveedores.
+
+- Clave por dirección: (calle, número, localidad) de address_components().
+- Índice difuso por (número, localidad) → claves: si la calle no coincide
+  exacta ("SAN MARTN 1234"), se compara por similitud de trigramas contra
+  las calles con la misma altura y localidad.
+- Clave por cliente: cliente normalizado → claves de sus direcciones. Sirve
+  cuando la misma dirección del cliente vuelve escrita con otro número o
+  sin él (misma calle y localidad).
+
+Un task en background hace la carga completa al iniciar y después lee sólo
+lo nuevo (historico por id, geo_cache por created_at). Las transacciones
+abiertas (chunks del pending_processor) pueden commitear filas por debajo de
+la marca: geo_cache se relee con una ventana de solapamiento (idempotente por
+key) y de historico se recuerdan los ids salteados para volver a buscarlos.
+"""
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_, select
+
+from app.config import settings
+from app.core.haversine import haversine
+from app.core.validators import is_in_mendoza, is_known_city_center
+from app.database import AsyncSessionLocal
+from app.models.geo_cache import GeoCache
+from app.models.historico import HistoricoEntregado
+from app.services.address_service import address_components, normalize_key, similarity
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "gazetteer"
+
+_MAX_POINTS = 20             # entregas recordadas por dirección
+_MAX_SPREAD_KM = 0.15        # más dispersión que esto = dirección ambigua
+_CONF_CACHE_ONLY = 0.6       # sólo visto en geo_cache, sin entregas
+_CONF_FIRST_DELIVERY = 0.75
+_CONF_PER_DELIVERY = 0.05
+_CONF_MAX = 0.95
+_CONF_CLIENT_FACTOR = 0.85   # match por cliente (número distinto o faltante)
+_CONF_FUZZY_FACTOR = 0.9     # calle parecida, misma altura y localidad
+_FUZZY_MARGIN = 0.1          # el mejor candidato tiene que separarse del segundo
+_YIELD_PER = 2000
+_OVERLAP = timedelta(minutes=5)   # relectura de geo_cache / vida de un id salteado
+_MAX_GAPS = 1000                  # ids salteados recordados (los más recientes)
+
+Key = tuple[str, str, str]
+
+
+@dataclass
+class _Entry:
+    delivered: deque = field(default_factory=lambda: deque(maxlen=_MAX_POINTS))
+    deliveries: int = 0
+    cached: dict[str, tuple[float, float]] = field(default_factory=dict)  # key_normalizada → punto
+
+    def resolve(self) -> Optional[tuple[float, float, float]]:
+        """(lat, lng, confianza): mediana de las entregas o de los resultados cacheados."""
+        points = list(self.delivered) or list(self.cached.values())
+        if not points:
+            return None
+        lat = statistics.median(p[0] for p in points)
+        lng = statistics.median(p[1] for p in points)
+        if any(haversine(lat, lng, p[0], p[1]) > _MAX_SPREAD_KM for p in points):
+            return lat, lng, 0.0
+        if self.deliveries:
+            conf = _CONF_FIRST_DELIVERY + _CONF_PER_DELIVERY * (self.deliveries - 1)
+        else:
+            conf = _CONF_CACHE_ONLY
+        return lat, lng, min(conf, _CONF_MAX)
+
+
+@dataclass
+class GazetteerMatch:
+    lat: float
+    lng: float
+    confidence: float
+    deliveries: int
+    match: str          # 'direccion' | 'difuso' | 'cliente'
+
+
+_by_address: dict[Key, _Entry] = {}
+_by_client: dict[str, set[Key]] = {}
+_by_number: dict[tuple[str, str], set[Key]] = {}
+_last_historico_id = 0
+_historico_gaps: dict[int, float] = {}   # id salteado → monotonic en que se vio el hueco
+_last_cache_at: Optional[datetime] = None
+_loaded = False
+_task: Optional[asyncio.Task] = None
+
+
+def _valid_point(lat: Optional[float], lng: Optional[float]) -> bool:
+    return (
+        lat is not None and lng is not None
+        and is_in_mendoza(lat, lng) and not is_known_city_center(lat, lng)
+    )
+
+
+def _add_delivery(cliente: Optional[str], direccion: str, localidad: Optional[str], lat: float, lng: float) -> None:
+    key = address_components(direccion, localidad or "")
+    if key is None:
+        return
+    entry = _entry(key)
+    entry.delivered.append((lat, lng))
+    entry.deliveries += 1
+    if cliente:
+        _by_client.setdefault(normalize_key(cliente), set()).add(key)
+
+
+def _add_cached(cache_key: str, query: str, lat: float, lng: float) -> bool:
+    """Indexa un resultado de geo_cache; False si ya estaba igual (relecturas)."""
+    key = address_components(query)
+    if key is None:
+        return False
+    cached = _entry(key).cached
+    if cached.get(cache_key) == (lat, lng):
+        return False
+    cached[cache_key] = (lat, lng)
+    return True
+
+
+def _entry(key: Key) -> _Entry:
+    entry = _by_address.get(key)
+    if entry is None:
+        entry = _by_address[key] = _Entry()
+        _by_number.setdefault((key[1], key[2]), set()).add(key)
+    return entry
+
+
+def lookup(
+    address: str,
+    cliente: Optional[str] = None,
+    localidad: Optional[str] = None,
+) -> Optional[GazetteerMatch]:
+    """
+    Busca la dirección en el gazetteer. `localidad` es la del remito, con la
+    que se indexaron las entregas. Retorna None si no está o si la confianza
+    de la dirección encontrada no llega a GAZETTEER_MIN_CONFIDENCE. El factor
+    de los matches difuso / por cliente rebaja la confianza devuelta, pero no
+    el piso: un match difuso claro contra una dirección sólo cacheada vale.
+    """
+    key = address_components(address, localidad or "")
+    if key is None:
+        return None
+
+    factor = 1.0
+    match = _match(key, "direccion", factor)
+    if match is None:
+        fuzzy = _fuzzy_key(key)
+        if fuzzy is not None:
+            factor = _CONF_FUZZY_FACTOR
+            match = _match(fuzzy, "difuso", factor)
+    if match is None and cliente:
+        # Misma calle y localidad de una dirección ya entregada a este cliente
+        same_street = [
+            k for k in _by_client.get(normalize_key(cliente), ())
+            if k[0] == key[0] and k[2] == key[2]
+        ]
+        if len(same_street) == 1:
+            factor = _CONF_CLIENT_FACTOR
+            match = _match(same_street[0], "cliente", factor)
+
+    if match is None or match.confidence < round(settings.GAZETTEER_MIN_CONFIDENCE * factor, 3):
+        return None
+    return match
+
+
+def _fuzzy_key(key: Key) -> Optional[Key]:
+    """Calle más parecida con la misma altura y localidad, si es clara."""
+    scored = sorted(
+        ((similarity(key[0], other[0]), other) for other in _by_number.get((key[1], key[2]), ())),
+        reverse=True,
+    )
+    if not scored or scored[0][0] < settings.GAZETTEER_FUZZY_MIN_SIMILARITY:
+        return None
+    if len(scored) > 1 and scored[1][0] > scored[0][0] - _FUZZY_MARGIN:
+        return None
+    return scored[0][1]
+
+
+def _match(key: Key, kind: str, factor: float) -> Optional[GazetteerMatch]:
+    entry = _by_address.get(key)
+    resolved = entry.resolve() if entry else None
+    if resolved is None:
+        return None
+    lat, lng, conf = resolved
+    return GazetteerMatch(lat, lng, round(conf * factor, 3), entry.deliveries, kind)
+
+
+async def refresh() -> dict:
+    """Carga incremental: historico con id nuevo y geo_cache escrito desde la última pasada."""
+    global _last_historico_id, _last_cache_at, _loaded
+    added_hist = added_cache = 0
+    now = time.monotonic()
+    for gap_id, seen_at in list(_historico_gaps.items()):
+        if now - seen_at > _OVERLAP.total_seconds():
+            del _historico_gaps[gap_id]     # rollback, o fila sin punto / dirección
+    new_ids = HistoricoEntregado.id > _last_historico_id
+    async with AsyncSessionLocal() as db:
+        rows = await db.stream(
+            select(
+                HistoricoEntregado.id,
+                HistoricoEntregado.cliente,
+                HistoricoEntregado.direccion_snapshot,
+                HistoricoEntregado.localidad,
+                HistoricoEntregado.lat,
+                HistoricoEntregado.lng,
+            )
+            .where(
+                or_(new_ids, HistoricoEntregado.id.in_(list(_historico_gaps))) if _historico_gaps else new_ids,
+                HistoricoEntregado.lat.is_not(None),
+                HistoricoEntregado.direccion_snapshot.is_not(None),
+            )
+            .order_by(HistoricoEntregado.id)
+            .execution_options(yield_per=_YIELD_PER)
+        )
+        async for row in rows:
+            if _historico_gaps.pop(row.id, None) is None and row.id > _last_historico_id:
+                # Ids salteados: pueden ser de transacciones todavía abiertas
+                for gap_id in range(max(_last_historico_id + 1, row.id - _MAX_GAPS), row.id):
+                    _historico_gaps[gap_id] = now
+                _last_historico_id = row.id
+            if _valid_point(row.lat, row.lng):
+                _add_delivery(row.cliente, row.direccion_snapshot, row.localidad, row.lat, row.lng)
+                added_hist += 1
+
+        # Sólo resultados de proveedores: ni negativos ni lo que salió de acá
+        cache_q = (
+            select(
+                GeoCache.key_normalizada,
+                GeoCache.query_original,
+                GeoCache.lat,
+                GeoCache.lng,
+                GeoCache.created_at,
+            )
+            .where(
+                GeoCache.negative_reason.is_(None),
+                GeoCache.lat.is_not(None),
+                GeoCache.has_street_number.is_(True),
+                GeoCache.provider != SOURCE,
+            )
+            .order_by(GeoCache.created_at)
+            .execution_options(yield_per=_YIELD_PER)
+        )
+        if _last_cache_at is not None:
+            # created_at es el inicio de la transacción: releer una ventana
+            cache_q = cache_q.where(GeoCache.created_at > _last_cache_at - _OVERLAP)
+        rows = await db.stream(cache_q)
+        async for row in rows:
+            _last_cache_at = row.created_at
+            if _valid_point(row.lat, row.lng) and _add_cached(
+                row.key_normalizada, row.query_original, row.lat, row.lng
+            ):
+                added_cache += 1
+
+    for gap_id in sorted(_historico_gaps)[:-_MAX_GAPS]:
+        del _historico_gaps[gap_id]
+    _loaded = True
+    return {"historico": added_hist, "geo_cache": added_cache}
+
+
+def stats() -> dict:
+    return {
+        "loaded": _loaded,
+        "direcciones": len(_by_address),
+        "clientes": len(_by_client),
+        "last_historico_id": _last_historico_id,
+        "historico_gaps": len(_historico_gaps),
+        "last_cache_at": _last_cache_at.isoformat() if _last_cache_at else None,
+    }
+
+
+def start() -> None:
+    """Lanza la carga inicial + refresco periódico (idempotente)."""
+    global _task
+    if not settings.GAZETTEER_ENABLED or (_task is not None and not _task.done()):
+        return
+    _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    """Cancela el refresco (usado en el shutdown de la app)."""
+    global _task
+    if _task is None or _task.done():
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+async def _run() -> None:
+    while True:
+        try:
+            added = await refresh()
+            if added["historico"] or added["geo_cache"]:
+                logger.info(
+                    f"Gazetteer: +{added['historico']} entregas, +{added['geo_cache']} cache "
+                    f"({len(_by_address)} direcciones)"
+                )
+        except Exception as e:
+            logger.error(f"Error refrescando gazetteer: {e}")
+        await asyncio.sleep(settings.GAZETTEER_REFRESH_SECONDS)
@@ -0,0 +1,151 @@
+"""
+Refresco en background de geo_cache: en horario valle vuelve a geocodificar
+las entradas positivas que vencen en las próximas GEOCODE_REFRESH_AHEAD_HOURS
+para que la ingesta de la mañana las encuentre vigentes.
+
+- Una sola corrida a la vez entre todos los procesos (advisory lock de Postgres).
+- Ventana y día del presupuesto en GEOCODE_REFRESH_TIMEZONE.
+- Presupuesto diario de llamadas a proveedores: se cuenta con las trazas de
+  billing del día con stage 'geocode_refresh' (sobrevive reinicios y vale
+  para todos los workers). Puede pasarse por unas pocas llamadas: las trazas
+  se escriben en lote cada BILLING_FLUSH_INTERVAL_SECONDS.
+- Las entradas que salieron del gazetteer no se refrescan: se recalculan
+  gratis en memoria.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models.billing import BillingTrace
+from app.models.geo_cache import GeoCache
+from app.services import billing_service, gazetteer_service, geocode_service
+
+logger = logging.getLogger(__name__)
+
+STAGE = "geocode_refresh"
+CHUNK_SIZE = 25
+_LOCK_KEY = 470_047  # pg_advisory_lock: id fijo de este job
+
+_task: Optional[asyncio.Task] = None
+_last_run: dict = {}
+
+
+def _local_now() -> datetime:
+    """Hora en GEOCODE_REFRESH_TIMEZONE (el container corre en UTC)."""
+    return datetime.now(ZoneInfo(settings.GEOCODE_REFRESH_TIMEZONE))
+
+
+def in_window(hour: int) -> bool:
+    start, end = settings.GEOCODE_REFRESH_START_HOUR, settings.GEOCODE_REFRESH_END_HOUR
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end  # ventana que cruza medianoche
+
+
+def status() -> dict:
+    return {"running": _task is not None and not _task.done(), "last_run": _last_run}
+
+
+def start() -> None:
+    """Lanza el loop de refresco (idempotente)."""
+    global _task
+    if not settings.GEOCODE_REFRESH_ENABLED or (_task is not None and not _task.done()):
+        return
+    _task = asyncio.create_task(_loop())
+
+
+async def stop() -> None:
+    """Cancela el loop (usado en el shutdown de la app)."""
+    global _task
+    if _task is None or _task.done():
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+async def _loop() -> None:
+    while True:
+        if in_window(_local_now().hour):
+            try:
+                await run_once()
+            except Exception as e:
+                logger.error(f"Error en refresco de geo_cache: {e}")
+        await asyncio.sleep(settings.GEOCODE_REFRESH_INTERVAL_SECONDS)
+
+
+async def run_once() -> dict:
+    """Una corrida si ningún otro proceso tiene el lock."""
+    async with engine.connect() as lock_conn:
+        locked = (await lock_conn.execute(select(func.pg_try_advisory_lock(_LOCK_KEY)))).scalar()
+        if not locked:
+            return {"skipped": "otra corrida en curso"}
+        try:
+            result = await _refresh_expiring()
+        finally:
+            await lock_conn.execute(select(func.pg_advisory_unlock(_LOCK_KEY)))
+    _last_run.clear()
+    _last_run.update(result)
+    return result
+
+
+async def _calls_today(db: AsyncSession) -> int:
+    midnight = _local_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (await db.execute(
+        select(func.coalesce(func.sum(BillingTrace.units), 0))
+        .where(BillingTrace.stage == STAGE, BillingTrace.created_at >= midnight)
+    )).scalar_one()
+
+
+async def _refresh_expiring() -> dict:
+    started = datetime.now(timezone.utc)
+    billing_service.set_run_context(f"geo-refresh-{started:%Y%m%dT%H%M%S}", STAGE)
+    horizon = started + timedelta(hours=settings.GEOCODE_REFRESH_AHEAD_HOURS)
+    refrescadas = sin_resultado = 0
+    after: tuple = (started - timedelta(days=1), 0)  # también lo vencido en el último día
+
+    async with AsyncSessionLocal() as db:
+        while in_window(_local_now().hour):
+            remaining = settings.GEOCODE_REFRESH_DAILY_BUDGET - await _calls_today(db)
+            if remaining <= 0:
+                break
+            rows = (await db.execute(
+                select(GeoCache.id, GeoCache.key_normalizada, GeoCache.query_original, GeoCache.expires_at)
+                .where(
+                    GeoCache.negative_reason.is_(None),
+                    GeoCache.provider != gazetteer_service.SOURCE,
+                    GeoCache.expires_at < horizon,
+                    tuple_(GeoCache.expires_at, GeoCache.id) > after,
+                )
+                .order_by(GeoCache.expires_at, GeoCache.id)
+                .limit(min(CHUNK_SIZE, remaining))
+            )).all()
+            if not rows:
+                break
+            after = (rows[-1].expires_at, rows[-1].id)
+            for row in rows:
+                if await geocode_service.refresh_cached(db, row.key_normalizada, row.query_original):
+                    refrescadas += 1
+                else:
+                    sin_resultado += 1
+            await db.commit()
+
+    result = {
+        "started_at": started.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "refrescadas": refrescadas,
+        "sin_resultado": sin_resultado,
+    }
+    if refrescadas or sin_resultado:
+        logger.info(f"Refresco de geo_cache: {refrescadas} refrescadas, {sin_resultado} sin resultado")
+    return result
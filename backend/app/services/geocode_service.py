@@ -2,18 +2,22 @@
 Geocodificación multi-proveedor con cache en DB.
 Migra: geocodificarDireccion_(), geocodificadorCascade_(), validateGeoResult_()
 """
+import asyncio
 import logging
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, update, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 
 from app.models.geo_cache import GeoCache
-from app.services.address_service import normalize, normalize_key
-from app.core.validators import is_in_mendoza
+from app.services.address_service import normalize_with_key
+from app.services import billing_service, config_service, gazetteer_service, provider_health
+from app.core import validators
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -25,70 +29,237 @@ class GeocodeResult:
     lng: float
     formatted_address: str
     has_street_number: bool
-    source: str          # 'cache', 'ors', 'mapbox', 'google'
+    source: str          # 'cache', 'gazetteer', 'ors', 'mapbox', 'google'
     confidence: float = 1.0
     provider: Optional[str] = None
+    warnings: list[str] = field(default_factory=list)  # validators.FAR_FROM_DEPOT / PROVIDER_DISAGREEMENT
+    depot_km: Optional[float] = None
+
+
+# Motivos de cache negativo
+NEG_NO_RESULT = "no_result"
+NEG_OUT_OF_BBOX = validators.OUT_OF_BBOX
+NEG_CITY_CENTROID = validators.CITY_CENTROID
+NEGATIVE_PROVIDER = "negativo"
 
 
 async def geocode(
     db: AsyncSession,
     address: str,
     provider_override: Optional[str] = None,
+    bypass_negative_cache: bool = False,
+    cliente: Optional[str] = None,
+    localidad: Optional[str] = None,
 ) -> Optional[GeocodeResult]:
-    """Geocodifica con cascade: cache DB → ORS → Mapbox → Google."""
+    """
+    Geocodifica con cascade: cache DB → gazetteer local → ORS → Mapbox → Google.
+    El gazetteer usa `cliente` para reconocer direcciones ya entregadas a ese
+    cliente escritas con otro número, y `localidad` (la del remito) cuando
+    el texto no la trae, igual que al indexar el histórico.
+    Si la cascada completa falla por la dirección (sin resultado, fuera del
+    bbox o sólo el centro de una localidad) se guarda una entrada negativa
+    con TTL corto y los próximos intentos cortan acá sin llamar proveedores.
+    bypass_negative_cache=True la ignora (corrección manual de dirección).
+    El resultado trae `warnings` (validators) si es dudoso: lejos del
+    depósito o distinto de lo que respondió antes otro proveedor.
+    """
     if not address:
         return None
 
-    normalized = normalize(address)
-    cache_key = normalize_key(address)
+    normalized, cache_key = normalize_with_key(address)
+
+    # 1. Cache DB (positivo o negativo). Una entrada positiva vencida sirve
+    # para comparar con la respuesta nueva.
+    entry = await _lookup_cache(db, cache_key)
+    previous: list[tuple[float, float]] = []
+    if entry is not None and entry.expires_at <= datetime.now(timezone.utc):
+        if entry.negative_reason is None and entry.lat is not None:
+            previous.append((entry.lat, entry.lng))
+        entry = None
+    if entry is not None and entry.negative_reason is None:
+        return _with_warnings(_from_cache(entry))
+
+    # 1b. Gazetteer local (entregas previas): también vale sobre un negativo
+    if not provider_override:
+        match = gazetteer_service.lookup(normalized, cliente, localidad)
+        if match is not None:
+            result = GeocodeResult(
+                lat=match.lat,
+                lng=match.lng,
+                formatted_address=address,
+                has_street_number=True,
+                source=gazetteer_service.SOURCE,
+                confidence=match.confidence,
+                provider=gazetteer_service.SOURCE,
+            )
+            await _save_cache(db, cache_key, address, result)
+            return _with_warnings(result)
 
-    # 1. Cache DB
-    cached = await _lookup_cache(db, cache_key)
-    if cached:
-        return cached
+    if entry is not None and not bypass_negative_cache:
+        logger.debug(f"Geocode negativo cacheado ({entry.negative_reason}): {address}")
+        return None
 
-    # 2. Cascade de proveedores
+    # 2. Cascade de proveedores (con breaker por proveedor y hedging opcional)
     provider_order = (
         [provider_override]
         if provider_override
         else settings.GEOCODE_PROVIDER_ORDER
     )
-
-    result = None
-    for provider in provider_order:
-        try:
-            if provider == "ors" and settings.ORS_API_KEY:
-                result = await _geocode_ors(normalized)
-            elif provider == "mapbox" and settings.MAPBOX_TOKEN:
-                result = await _geocode_mapbox(normalized)
-            elif provider == "google" and settings.GOOGLE_MAPS_API_KEY:
-                result = await _geocode_google(normalized)
-        except Exception as e:
-            logger.warning(f"Geocode {provider} error for '{address}': {e}")
-            continue
-
-        if result and _validate_result(result):
-            result.source = provider
-            result.provider = provider
-            await _save_cache(db, cache_key, address, result)
-            return result
+    providers = [p for p in provider_order if _configured(p)]
+    outcome = (
+        await _cascade_hedged(normalized, providers)
+        if settings.GEOCODE_HEDGING and len(providers) > 1
+        else await _cascade_sequential(normalized, providers)
+    )
+    if outcome.result is not None:
+        result = outcome.result
+        await _save_cache(db, cache_key, address, result)
+        return _with_warnings(result, previous + outcome.alternatives)
+    attempted, failed, rejected = bool(providers), outcome.failed, outcome.rejected
 
     logger.warning(f"Geocodificación sin resultado para: {address}")
+    # Sólo se cachea el fallo si la cascada completa respondió: un error de
+    # red/proveedor es transitorio y se reintenta la próxima vez.
+    if attempted and not failed and not provider_override:
+        if NEG_CITY_CENTROID in rejected:
+            reason = NEG_CITY_CENTROID
+        elif NEG_OUT_OF_BBOX in rejected:
+            reason = NEG_OUT_OF_BBOX
+        else:
+            reason = NEG_NO_RESULT
+        await _save_negative_cache(db, cache_key, address, reason)
     return None
 
 
-async def _lookup_cache(db: AsyncSession, cache_key: str) -> Optional[GeocodeResult]:
-    """Busca en la tabla geo_cache por key."""
-    now = datetime.now(timezone.utc)
-    result = await db.execute(
-        select(GeoCache).where(
-            GeoCache.key_normalizada == cache_key,
-            GeoCache.expires_at > now,
-        )
+def _with_warnings(
+    result: GeocodeResult, alternatives: Optional[list[tuple[float, float]]] = None
+) -> GeocodeResult:
+    check = validators.check_point(
+        result.lat,
+        result.lng,
+        depot=(settings.DEFAULT_DEPOT_LAT, settings.DEFAULT_DEPOT_LNG),
+        max_depot_km=settings.GEOCODE_MAX_DEPOT_KM,
+        alternatives=[alternatives or []],
+        agreement_km=settings.GEOCODE_AGREEMENT_KM,
     )
-    entry = result.scalar_one_or_none()
-    if not entry:
-        return None
+    result.warnings = check.warnings
+    result.depot_km = check.depot_km
+    return result
+
+
+_PROVIDER_FNS = {
+    "ors": lambda address: _geocode_ors(address),
+    "mapbox": lambda address: _geocode_mapbox(address),
+    "google": lambda address: _geocode_google(address),
+}
+
+
+def _configured(provider: str) -> bool:
+    return (
+        (provider == "ors" and bool(settings.ORS_API_KEY))
+        or (provider == "mapbox" and bool(settings.MAPBOX_TOKEN))
+        or (provider == "google" and bool(settings.GOOGLE_MAPS_API_KEY))
+    )
+
+
+@dataclass
+class _CascadeOutcome:
+    result: Optional[GeocodeResult] = None
+    failed: bool = False            # algún proveedor falló o se salteó (breaker abierto)
+    rejected: set = field(default_factory=set)
+    alternatives: list = field(default_factory=list)  # otros resultados válidos (hedging)
+
+
+async def _call_provider(provider: str, address: str) -> tuple[Optional[GeocodeResult], bool]:
+    """
+    Llama a un proveedor con el timeout adaptativo de su breaker.
+    Retorna (resultado, ok); ok=False si falló o el breaker no lo dejó pasar.
+    """
+    health = provider_health.get(f"geocode:{provider}")
+    if not health.allow():
+        logger.info(f"Geocode {provider} salteado: circuit breaker {health.state}")
+        return None, False
+    start = time.monotonic()
+    try:
+        result = await asyncio.wait_for(_PROVIDER_FNS[provider](address), health.timeout())
+    except asyncio.CancelledError:
+        health.release()
+        raise
+    except Exception as e:
+        health.record_failure()
+        logger.warning(f"Geocode {provider} error for '{address}': {e!r}")
+        return None, False
+    health.record_success(time.monotonic() - start)
+    return result, True
+
+
+def _accept(provider: str, result: Optional[GeocodeResult], outcome: _CascadeOutcome) -> bool:
+    """Valida el resultado de un proveedor; si sirve lo deja en outcome.result."""
+    if result is None:
+        return False
+    reason = _rejection_reason(result)
+    if reason:
+        outcome.rejected.add(reason)
+        return False
+    result.source = provider
+    result.provider = provider
+    outcome.result = result
+    return True
+
+
+async def _cascade_sequential(address: str, providers: list[str]) -> _CascadeOutcome:
+    outcome = _CascadeOutcome()
+    for provider in providers:
+        result, ok = await _call_provider(provider, address)
+        outcome.failed |= not ok
+        if _accept(provider, result, outcome):
+            break
+    return outcome
+
+
+async def _cascade_hedged(address: str, providers: list[str]) -> _CascadeOutcome:
+    """
+    Cascada con hedging: si el proveedor en curso no respondió dentro de su
+    p90, se dispara también el siguiente. Gana el primer resultado válido y
+    se cancelan las llamadas restantes.
+    """
+    outcome = _CascadeOutcome()
+    queue = list(providers)
+    pending: dict[asyncio.Task, str] = {}
+
+    def launch() -> str:
+        provider = queue.pop(0)
+        pending[asyncio.create_task(_call_provider(provider, address))] = provider
+        return provider
+
+    last = launch()
+    try:
+        while pending:
+            delay = provider_health.get(f"geocode:{last}").hedge_delay() if queue else None
+            done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                last = launch()
+                continue
+            for task in done:
+                provider = pending.pop(task)
+                result, ok = task.result()
+                outcome.failed |= not ok
+                if outcome.result is None:
+                    _accept(provider, result, outcome)
+                elif result is not None and _rejection_reason(result) is None:
+                    # Respondieron juntos: el otro resultado sirve para comparar
+                    outcome.alternatives.append((result.lat, result.lng))
+            if outcome.result is not None:
+                return outcome
+            if not pending and queue:
+                last = launch()
+        return outcome
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _from_cache(entry: GeoCache) -> GeocodeResult:
     return GeocodeResult(
         lat=entry.lat,
         lng=entry.lng,
@@ -100,47 +271,75 @@ async def _lookup_cache(db: AsyncSession, cache_key: str) -> Optional[GeocodeRes
     )
 
 
+async def _lookup_cache(db: AsyncSession, cache_key: str) -> Optional[GeoCache]:
+    """Busca en la tabla geo_cache por key (vigente o vencida: lo decide el caller)."""
+    result = await db.execute(
+        select(GeoCache).where(GeoCache.key_normalizada == cache_key)
+    )
+    return result.scalar_one_or_none()
+
+
 async def _save_cache(
     db: AsyncSession, cache_key: str, original: str, result: GeocodeResult
 ) -> None:
-    """Guarda resultado en geo_cache."""
-    from app.config import settings as cfg
-    cache_days = 30
-    try:
-        # Intentar leer config de DB
-        from app.models.config import ConfigRuta
-        conf_res = await db.execute(
-            select(ConfigRuta).where(ConfigRuta.key == "geocode_cache_days")
-        )
-        conf = conf_res.scalar_one_or_none()
-        if conf:
-            cache_days = int(conf.value)
-    except Exception:
-        pass
-
-    expires_at = datetime.now(timezone.utc) + timedelta(days=cache_days)
-    entry = GeoCache(
-        key_normalizada=cache_key,
-        query_original=original,
-        lat=result.lat,
-        lng=result.lng,
-        formatted_address=result.formatted_address,
-        has_street_number=result.has_street_number,
-        provider=result.provider or result.source,
-        score=result.confidence,
-        expires_at=expires_at,
+    """Guarda resultado en geo_cache (reemplaza una entrada previa, p. ej. negativa)."""
+    cache_days = int(await config_service.get_value(db, "geocode_cache_days", 30))
+
+    await _upsert_cache(db, {
+        "key_normalizada": cache_key,
+        "query_original": original,
+        "lat": result.lat,
+        "lng": result.lng,
+        "formatted_address": result.formatted_address,
+        "has_street_number": result.has_street_number,
+        "provider": result.provider or result.source,
+        "score": result.confidence,
+        "negative_reason": None,
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=cache_days),
+    })
+
+
+async def _save_negative_cache(
+    db: AsyncSession, cache_key: str, original: str, reason: str
+) -> None:
+    """Guarda un fallo de geocodificación con TTL corto."""
+    await _upsert_cache(db, {
+        "key_normalizada": cache_key,
+        "query_original": original,
+        "lat": None,
+        "lng": None,
+        "formatted_address": None,
+        "has_street_number": False,
+        "provider": NEGATIVE_PROVIDER,
+        "score": None,
+        "negative_reason": reason,
+        "expires_at": datetime.now(timezone.utc)
+        + timedelta(hours=settings.GEOCODE_NEGATIVE_CACHE_HOURS),
+    })
+
+
+async def _upsert_cache(db: AsyncSession, values: dict) -> None:
+    """
+    INSERT ... ON CONFLICT (key_normalizada) DO UPDATE: la key puede existir
+    vencida o negativa, y un insert simple rompería la transacción del caller.
+    """
+    stmt = pg_insert(GeoCache).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GeoCache.key_normalizada],
+        set_={k: stmt.excluded[k] for k in values if k != "key_normalizada"}
+        | {"created_at": func.now()},
     )
-    db.add(entry)
     try:
-        await db.flush()
-    except Exception:
-        await db.rollback()
-        logger.warning(f"Cache save failed for key {cache_key}")
+        # SAVEPOINT: si falla, sólo se descarta el guardado en cache
+        async with db.begin_nested():
+            await db.execute(stmt)
+    except Exception as e:
+        logger.warning(f"Cache save failed for key {values['key_normalizada']}: {e}")
 
 
-def _validate_result(result: GeocodeResult) -> bool:
-    """Valida que el resultado esté dentro de Mendoza."""
-    return is_in_mendoza(result.lat, result.lng)
+def _rejection_reason(result: GeocodeResult) -> Optional[str]:
+    """Motivo de descarte de un resultado (validators), o None si es válido."""
+    return validators.check_point(result.lat, result.lng).rejection
 
 
 async def _geocode_ors(address: str) -> Optional[GeocodeResult]:
@@ -156,7 +355,7 @@ async def _geocode_ors(address: str) -> Optional[GeocodeResult]:
         "size": 1,
         "layers": "address",
     }
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    async with billing_service.track("ors", "geocode"), httpx.AsyncClient(timeout=10.0) as client:
         resp = await client.get(url, params=params)
         resp.raise_for_status()
         data = resp.json()
@@ -190,7 +389,7 @@ async def _geocode_mapbox(address: str) -> Optional[GeocodeResult]:
         "limit": 1,
         "types": "address",
     }
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    async with billing_service.track("mapbox", "geocode"), httpx.AsyncClient(timeout=10.0) as client:
         resp = await client.get(url, params=params)
         resp.raise_for_status()
         data = resp.json()
@@ -220,7 +419,7 @@ async def _geocode_google(address: str) -> Optional[GeocodeResult]:
         "key": settings.GOOGLE_MAPS_API_KEY,
         "components": "country:AR",
     }
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    async with billing_service.track("google", "geocode"), httpx.AsyncClient(timeout=10.0) as client:
         resp = await client.get(url, params=params)
         resp.raise_for_status()
         data = resp.json()
@@ -245,7 +444,6 @@ async def _geocode_google(address: str) -> Optional[GeocodeResult]:
 
 async def get_cache_stats(db: AsyncSession) -> dict:
     """Estadísticas del caché de geocodificación."""
-    from sqlalchemy import func
     result = await db.execute(
         select(GeoCache.provider, func.count().label("cnt"))
         .group_by(GeoCache.provider)
@@ -263,6 +461,68 @@ async def clear_cache(db: AsyncSession) -> int:
     return result.rowcount
 
 
+async def refresh_cached(db: AsyncSession, cache_key: str, query: str) -> Optional[GeocodeResult]:
+    """
+    Vuelve a consultar a los proveedores una entrada positiva del cache (por
+    vencer) y, si hay resultado válido, la reemplaza con vigencia nueva. Si
+    no hay resultado la entrada queda como está hasta vencer.
+    """
+    normalized, _ = normalize_with_key(query)
+    providers = [p for p in settings.GEOCODE_PROVIDER_ORDER if _configured(p)]
+    outcome = await _cascade_sequential(normalized, providers)
+    if outcome.result is None:
+        return None
+    await _save_cache(db, cache_key, query, outcome.result)
+    return outcome.result
+
+
+async def revalidate_cache(db: AsyncSession, chunk_size: int = 2000) -> dict:
+    """
+    Revalida las entradas positivas de geo_cache por lotes (validators.check_batch)
+    y pasa a negativas las que hoy se rechazarían, p. ej. centros de localidad
+    cacheados antes de que la cascada los descartara. Retorna conteos por motivo.
+    """
+    revisadas = 0
+    por_motivo: dict[str, int] = {}
+    after_id = 0
+    while True:
+        rows = (await db.execute(
+            select(GeoCache.id, GeoCache.lat, GeoCache.lng)
+            .where(GeoCache.negative_reason.is_(None), GeoCache.id > after_id)
+            .order_by(GeoCache.id)
+            .limit(chunk_size)
+        )).all()
+        if not rows:
+            break
+        after_id = rows[-1].id
+        revisadas += len(rows)
+        checks = validators.check_batch([r.lat for r in rows], [r.lng for r in rows])
+        by_reason: dict[str, list[int]] = {}
+        for row, check in zip(rows, checks):
+            if not check.ok:
+                by_reason.setdefault(check.rejection, []).append(row.id)
+        for reason, ids in by_reason.items():
+            reason = NEG_NO_RESULT if reason == validators.NULL_COORDS else reason
+            await db.execute(
+                update(GeoCache)
+                .where(GeoCache.id == any_(literal(ids, type_=ARRAY(Integer))))
+                .values(
+                    lat=None,
+                    lng=None,
+                    formatted_address=None,
+                    has_street_number=False,
+                    provider=NEGATIVE_PROVIDER,
+                    score=None,
+                    negative_reason=reason,
+                    expires_at=datetime.now(timezone.utc)
+                    + timedelta(hours=settings.GEOCODE_NEGATIVE_CACHE_HOURS),
+                )
+            )
+            por_motivo[reason] = por_motivo.get(reason, 0) + len(ids)
+    await db.commit()
+    return {"revisadas": revisadas, "invalidadas": sum(por_motivo.values()), "por_motivo": por_motivo}
+
+
 async def validate_address(db: AsyncSession, address: str) -> dict:
     """Valida una dirección y retorna resultado."""
     result = await geocode(db, address)
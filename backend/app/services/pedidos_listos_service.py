@@ -1,70 +1,141 @@
 """
 Pedidos Listos service: sync de datos desde fuente externa.
+Las filas se procesan por chunks: un SELECT de remitos (numero = ANY) y un
+INSERT ... ON CONFLICT (numero_remito) DO UPDATE por chunk.
 """
+import csv
+import io
 import logging
 from datetime import datetime, timezone
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, literal, literal_column, any_, String
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from starlette.concurrency import run_in_threadpool
 
 from app.models.pedido_listo import PedidoListo
 from app.models.remito import Remito
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 1000
 
-async def sync_batch(db: AsyncSession, data: list[dict]) -> dict:
+# Campos de texto que se copian de la fila; en un update, un valor vacío
+# conserva el existente (igual que `row.get(campo) or pl.campo`).
+_TEXT_FIELDS = ("cliente", "domicilio", "localidad", "provincia", "observaciones", "transporte")
+
+
+def _numero(row: dict) -> str:
+    return str(row.get("numero_remito") or row.get("remito") or "").strip().upper()
+
+
+def _dedupe(rows: Iterable[dict]) -> dict[str, dict]:
     """
-    Sincroniza datos de Pedidos Listos a la tabla pedidos_listos.
-    Si el remito ya existe en remitos, actualiza sus datos.
+    Agrupa por numero. Si un numero se repite, los valores no vacíos de la
+    fila posterior pisan a los anteriores y raw_data queda con la última.
     """
-    nuevos = 0
-    actualizados = 0
-
-    for row in data:
-        numero = str(row.get("numero_remito") or row.get("remito") or "").strip().upper()
+    by_numero: dict[str, dict] = {}
+    for row in rows:
+        numero = _numero(row)
         if not numero:
             continue
-
-        # Buscar en PL
-        result = await db.execute(
-            select(PedidoListo).where(PedidoListo.numero_remito == numero)
-        )
-        pl = result.scalar_one_or_none()
-
-        # Buscar remito asociado
-        r_result = await db.execute(
-            select(Remito).where(Remito.numero == numero)
-        )
-        remito = r_result.scalar_one_or_none()
-
-        if pl:
-            # Actualizar
-            pl.cliente = row.get("cliente") or pl.cliente
-            pl.domicilio = row.get("domicilio") or pl.domicilio
-            pl.localidad = row.get("localidad") or pl.localidad
-            pl.provincia = row.get("provincia") or pl.provincia
-            pl.observaciones = row.get("observaciones") or pl.observaciones
-            pl.transporte = row.get("transporte") or pl.transporte
-            pl.synced_at = datetime.now(timezone.utc)
-            pl.raw_data = row
-            actualizados += 1
+        prev = by_numero.get(numero)
+        if prev is None:
+            by_numero[numero] = {"row": row, **{f: row.get(f) for f in _TEXT_FIELDS}}
         else:
-            pl = PedidoListo(
-                numero_remito=numero,
-                cliente=row.get("cliente"),
-                domicilio=row.get("domicilio"),
-                localidad=row.get("localidad"),
-                provincia=row.get("provincia"),
-                observaciones=row.get("observaciones"),
-                transporte=row.get("transporte"),
-                raw_data=row,
-            )
-            db.add(pl)
-            nuevos += 1
-
-        if remito and pl:
-            pl.remito_id = remito.id
+            prev["row"] = row
+            for f in _TEXT_FIELDS:
+                prev[f] = row.get(f) or prev[f]
+    return by_numero
+
+
+async def _upsert_chunk(db: AsyncSession, rows: list[dict]) -> tuple[int, int]:
+    """Upsert de un chunk. Retorna (nuevos, actualizados)."""
+    by_numero = _dedupe(rows)
+    if not by_numero:
+        return 0, 0
+
+    numeros = list(by_numero)
+    remito_ids = dict((await db.execute(
+        select(Remito.numero, Remito.id)
+        .where(Remito.numero == any_(literal(numeros, type_=ARRAY(String))))
+    )).all())
+
+    now = datetime.now(timezone.utc)
+    values = [
+        {
+            "numero_remito": numero,
+            **{f: v[f] for f in _TEXT_FIELDS},
+            "remito_id": remito_ids.get(numero),
+            "raw_data": v["row"],
+            "synced_at": now,
+        }
+        for numero, v in by_numero.items()
+    ]
+
+    stmt = pg_insert(PedidoListo).values(values)
+    table = PedidoListo.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PedidoListo.numero_remito],
+        set_={
+            **{
+                f: func.coalesce(func.nullif(stmt.excluded[f], ""), table.c[f])
+                for f in _TEXT_FIELDS
+            },
+            "remito_id": func.coalesce(stmt.excluded.remito_id, table.c.remito_id),
+            "raw_data": stmt.excluded.raw_data,
+            "synced_at": stmt.excluded.synced_at,
+        },
+    ).returning(literal_column("(xmax = 0)").label("inserted"))
+
+    inserted = (await db.execute(stmt)).scalars().all()
+    nuevos = sum(1 for i in inserted if i)
+    return nuevos, len(inserted) - nuevos
 
+
+async def sync_batch(db: AsyncSession, data: list[dict]) -> dict:
+    """
+    Sincroniza datos de Pedidos Listos a la tabla pedidos_listos.
+    Si el remito ya existe en remitos, vincula remito_id.
+    """
+    nuevos = actualizados = 0
+    for i in range(0, len(data), CHUNK_SIZE):
+        n, a = await _upsert_chunk(db, data[i:i + CHUNK_SIZE])
+        nuevos += n
+        actualizados += a
     await db.commit()
     return {"ok": True, "total": len(data), "nuevos": nuevos, "actualizados": actualizados}
+
+
+def _read_chunk(reader: Iterator[dict], size: int) -> list[dict]:
+    return list(islice(reader, size))
+
+
+async def sync_csv(db: AsyncSession, raw: BinaryIO, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Importa un CSV desde un archivo binario sin cargarlo entero en memoria:
+    decodificación incremental (utf-8-sig), parseo de a chunk_size filas
+    (en threadpool, el archivo puede estar en disco) y un upsert por chunk.
+    Un solo commit al final.
+    """
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        reader = csv.DictReader(text)
+        total = nuevos = actualizados = 0
+        while True:
+            rows = await run_in_threadpool(_read_chunk, reader, chunk_size)
+            if not rows:
+                break
+            total += len(rows)
+            n, a = await _upsert_chunk(db, rows)
+            nuevos += n
+            actualizados += a
+    finally:
+        # No cerrar el archivo subyacente: pertenece al UploadFile
+        text.detach()
+
+    await db.commit()
+    logger.info(f"CSV pedidos listos: {total} filas, {nuevos} nuevos, {actualizados} actualizados")
+    return {"ok": True, "total": total, "nuevos": nuevos, "actualizados": actualizados}
@@ -0,0 +1,101 @@
+"""
+Procesador de remitos pendientes en background.
+Reemplaza el loop sincrónico de /remitos/procesar-pendientes: N workers
+concurrentes, cada uno con su propia sesión, toman chunks con
+SELECT ... FOR UPDATE SKIP LOCKED (paginados por id) y commitean por chunk.
+Varios procesos de la API pueden drenar la cola a la vez sin procesar dos
+veces el mismo remito.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.services import billing_service, remito_service
+
+logger = logging.getLogger(__name__)
+
+_task: Optional[asyncio.Task] = None
+_last_run: dict = {}
+
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def trigger() -> bool:
+    """
+    Lanza una corrida en background si no hay otra en curso.
+    Retorna True si se lanzó, False si ya había una corriendo.
+    """
+    global _task
+    if is_running():
+        return False
+    _task = asyncio.create_task(_run())
+    return True
+
+
+def status() -> dict:
+    return {"running": is_running(), "last_run": _last_run}
+
+
+async def stop() -> None:
+    """Cancela la corrida en curso (usado en el shutdown de la app)."""
+    global _task
+    if not is_running():
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+async def _run() -> None:
+    started = datetime.now(timezone.utc)
+    workers = max(1, settings.PENDING_WORKERS)
+    # Los workers heredan el contexto: sus llamadas a proveedores quedan en este run
+    billing_service.set_run_context(f"pendientes-{started:%Y%m%dT%H%M%S}", "pending")
+    results = await asyncio.gather(
+        *(_worker() for _ in range(workers)), return_exceptions=True
+    )
+    processed = 0
+    errores = []
+    for r in results:
+        if isinstance(r, BaseException):
+            errores.append(str(r)[:200])
+            logger.error(f"Worker de pendientes falló: {r}")
+        else:
+            processed += r
+
+    _last_run.clear()
+    _last_run.update({
+        "started_at": started.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "procesados": processed,
+        "workers": workers,
+        "errores": errores,
+    })
+    logger.info(f"Pendientes procesados en background: {processed} ({workers} workers)")
+
+
+async def _worker() -> int:
+    """Drena chunks hasta que no quedan pendientes sin bloquear."""
+    total = 0
+    after_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            try:
+                processed, last_id = await remito_service.process_pending_chunk(
+                    db, after_id, settings.PENDING_CHUNK_SIZE
+                )
+            except Exception:
+                await db.rollback()
+                raise
+        if last_id is None:
+            return total
+        total += processed
+        after_id = last_id
@@ -0,0 +1,125 @@
+"""
+Salud de proveedores externos: circuit breaker + latencias observadas.
+Estado en memoria del proceso (uno por worker de uvicorn).
+
+- closed: se llama normalmente.
+- open: tras N fallos consecutivos no se llama durante open_seconds.
+- half_open: vencido el plazo se deja pasar una única llamada de prueba;
+  si sale bien se cierra, si falla vuelve a open.
+
+El timeout adaptativo y el umbral de hedging salen de las latencias de las
+últimas llamadas exitosas.
+"""
+import time
+from collections import deque
+from typing import Optional
+
+from app.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_MIN_SAMPLES = 20
+
+
+class ProviderHealth:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        open_seconds: float,
+        timeout_min: float,
+        timeout_max: float,
+        window: int = 200,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.timeout_min = timeout_min
+        self.timeout_max = timeout_max
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def allow(self) -> bool:
+        """True si se puede llamar al proveedor ahora."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self, latency_s: float) -> None:
+        self._latencies.append(latency_s)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Llamada cancelada (p. ej. perdió un hedge): no cuenta como éxito ni fallo."""
+        self._probe_in_flight = False
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._latencies) < _MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def timeout(self) -> float:
+        """Timeout adaptativo: 3 × p95 observado, acotado a [timeout_min, timeout_max]."""
+        p95 = self.percentile(0.95)
+        if p95 is None:
+            return self.timeout_max
+        return max(self.timeout_min, min(self.timeout_max, p95 * 3))
+
+    def hedge_delay(self) -> float:
+        """Espera antes de disparar el siguiente proveedor: p90 observado (o el timeout)."""
+        p90 = self.percentile(0.90)
+        return p90 if p90 is not None else self.timeout()
+
+    def snapshot(self) -> dict:
+        p50, p90 = self.percentile(0.5), self.percentile(0.9)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "samples": len(self._latencies),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p90_ms": round(p90 * 1000, 1) if p90 is not None else None,
+            "timeout_s": round(self.timeout(), 2),
+        }
+
+
+_registry: dict[str, ProviderHealth] = {}
+
+
+def get(name: str) -> ProviderHealth:
+    health = _registry.get(name)
+    if health is None:
+        health = _registry[name] = ProviderHealth(
+            name,
+            failure_threshold=settings.PROVIDER_BREAKER_FAILURES,
+            open_seconds=settings.PROVIDER_BREAKER_OPEN_SECONDS,
+            timeout_min=settings.PROVIDER_TIMEOUT_MIN_SECONDS,
+            timeout_max=settings.PROVIDER_TIMEOUT_MAX_SECONDS,
+        )
+    return health
+
+
+def snapshot() -> dict:
+    return {name: h.snapshot() for name, h in _registry.items()}
@@ -13,6 +13,7 @@ from sqlalchemy import select
 from app.models.remito import Remito, RemitoEstadoClasificacion, RemitoEstadoLifecycle
 from app.models.pedido_listo import PedidoListo
 from app.services import carrier_service, geocode_service, address_service, window_service
+from app.core import validators
 from app.core.constants import KNOWN_LOCALITIES
 
 logger = logging.getLogger(__name__)
@@ -74,7 +75,20 @@ async def ingest_batch(
     )
 
 
-async def process_pipeline(db: AsyncSession, remito: Remito) -> Remito:
+def _geo_warning_motivo(geo_result: geocode_service.GeocodeResult) -> str:
+    partes = []
+    if validators.FAR_FROM_DEPOT in geo_result.warnings:
+        partes.append(f"a {geo_result.depot_km:.0f} km del depósito")
+    if validators.PROVIDER_DISAGREEMENT in geo_result.warnings:
+        partes.append("no coincide con otra respuesta de geocodificación")
+    return "Geocodificación dudosa: " + ", ".join(partes)
+
+
+async def process_pipeline(
+    db: AsyncSession,
+    remito: Remito,
+    bypass_negative_geocode_cache: bool = False,
+) -> Remito:
     """Pipeline de 7 pasos de procesamiento."""
     domicilio = remito.direccion_raw or remito.direccion_normalizada or ""
     observaciones = remito.observaciones or ""
@@ -85,8 +99,17 @@ async def process_pipeline(db: AsyncSession, remito: Remito) -> Remito:
         normalized = address_service.fix_ciudad_mendoza(normalized)
         remito.direccion_normalizada = normalized
 
+    # Un solo análisis de observaciones: pickup, ventana, llamar antes y carrier
+    rules = await carrier_service.get_rules(db)
+    carrier_text = observaciones or remito.direccion_raw or ""
+    obs = window_service.analyze_observation(observaciones, rules.patterns)
+    carrier_obs = (
+        obs if carrier_text == observaciones
+        else window_service.analyze_observation(carrier_text, rules.patterns)
+    )
+
     # PASO 1 — ¿Es RETIRO?
-    if carrier_service.detect_pickup(observaciones) or carrier_service.detect_pickup(domicilio):
+    if obs.pickup or carrier_service.detect_pickup(domicilio):
         carrier = await _find_carrier_by_name(db, "RETIRO EN GALPON")
         remito.carrier_id = carrier.id if carrier else None
         remito.estado_clasificacion = RemitoEstadoClasificacion.retiro_sospechado.value
@@ -96,7 +119,7 @@ async def process_pipeline(db: AsyncSession, remito: Remito) -> Remito:
 
     # PASO 2 — ¿Es TRANSPORTE EXTERNO?
     carrier_detection = await carrier_service.detect(
-        db, observaciones or remito.direccion_raw or "", remito.localidad
+        db, carrier_text, remito.localidad, analysis=carrier_obs
     )
     if carrier_detection.nombre_canonico not in ("ENVIO PROPIO", "DESCONOCIDO", "RETIRO EN GALPON"):
         remito.carrier_id = carrier_detection.carrier_id
@@ -114,14 +137,24 @@ async def process_pipeline(db: AsyncSession, remito: Remito) -> Remito:
         remito.updated_at = datetime.now(timezone.utc)
         return remito
 
-    # PASO 4 — Agregar localidad si no tiene
+    # PASO 4 — Agregar localidad si no tiene (la del remito si la hay: queda
+    # en la clave de geo_cache y del gazetteer igual que en el histórico)
     normalized_upper = (remito.direccion_normalizada or "").upper()
     has_locality = any(loc in normalized_upper for loc in KNOWN_LOCALITIES)
     if not has_locality and remito.direccion_normalizada:
-        remito.direccion_normalizada = f"{remito.direccion_normalizada}, Mendoza"
+        if remito.localidad:
+            remito.direccion_normalizada = f"{remito.direccion_normalizada}, {remito.localidad}, Mendoza"
+        else:
+            remito.direccion_normalizada = f"{remito.direccion_normalizada}, Mendoza"
 
     # PASO 5 — Geocodificación
-    geo_result = await geocode_service.geocode(db, remito.direccion_normalizada or domicilio)
+    geo_result = await geocode_service.geocode(
+        db,
+        remito.direccion_normalizada or domicilio,
+        bypass_negative_cache=bypass_negative_geocode_cache,
+        cliente=remito.cliente,
+        localidad=remito.localidad,
+    )
     if geo_result:
         remito.lat = geo_result.lat
         remito.lng = geo_result.lng
@@ -133,6 +166,11 @@ async def process_pipeline(db: AsyncSession, remito: Remito) -> Remito:
             remito.motivo_clasificacion = "Sin número de calle en geocodificación"
             remito.updated_at = datetime.now(timezone.utc)
             return remito
+        if geo_result.warnings:
+            remito.estado_clasificacion = RemitoEstadoClasificacion.corregir.value
+            remito.motivo_clasificacion = _geo_warning_motivo(geo_result)
+            remito.updated_at = datetime.now(timezone.utc)
+            return remito
     else:
         remito.estado_clasificacion = RemitoEstadoClasificacion.no_encontrado.value
         remito.motivo_clasificacion = "Geocodificación sin resultado"
@@ -140,12 +178,12 @@ async def process_pipeline(db: AsyncSession, remito: Remito) -> Remito:
         return remito
 
     # PASO 6 — Ventana horaria
-    window = window_service.parse_window(observaciones)
+    window = obs.window
     remito.ventana_tipo = window.ventana_tipo
     remito.ventana_desde_min = window.desde_min
     remito.ventana_hasta_min = window.hasta_min
     remito.ventana_raw = window.raw_text
-    remito.llamar_antes = window.llamar_antes
+    remito.llamar_antes = obs.llamar_antes
 
     # PASO 7 — Estado final
     remito.estado_clasificacion = RemitoEstadoClasificacion.enviar.value
@@ -154,24 +192,55 @@ async def process_pipeline(db: AsyncSession, remito: Remito) -> Remito:
     return remito
 
 
-async def process_pending(db: AsyncSession) -> int:
-    """Procesa todos los remitos en estado pendiente."""
+async def claim_pending_chunk(
+    db: AsyncSession,
+    after_id: int = 0,
+    limit: int = 50,
+) -> list[Remito]:
+    """
+    Toma un chunk de remitos pendientes con id > after_id (keyset).
+    FOR UPDATE SKIP LOCKED: las filas quedan bloqueadas hasta el commit y
+    otros workers las saltean en lugar de esperar.
+    """
     result = await db.execute(
-        select(Remito).where(
-            Remito.estado_clasificacion == RemitoEstadoClasificacion.pendiente.value
+        select(Remito)
+        .where(
+            Remito.estado_clasificacion == RemitoEstadoClasificacion.pendiente.value,
+            Remito.id > after_id,
         )
+        .order_by(Remito.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
     )
-    pending = result.scalars().all()
+    return list(result.scalars().all())
+
+
+async def process_pending_chunk(
+    db: AsyncSession,
+    after_id: int = 0,
+    chunk_size: int = 50,
+) -> tuple[int, Optional[int]]:
+    """
+    Procesa un chunk de pendientes y commitea una sola vez.
+    Cada remito corre en un SAVEPOINT para que un error no descarte el resto.
+    Retorna (procesados, último id del chunk); último id = None si no había filas.
+    """
+    pending = await claim_pending_chunk(db, after_id, chunk_size)
+    if not pending:
+        return 0, None
+    last_id = pending[-1].id
+
     processed = 0
     for remito in pending:
+        numero = remito.numero
         try:
-            await process_pipeline(db, remito)
-            await db.commit()
+            async with db.begin_nested():
+                await process_pipeline(db, remito)
             processed += 1
         except Exception as e:
-            await db.rollback()
-            logger.error(f"Error procesando remito pendiente {remito.numero}: {e}")
-    return processed
+            logger.error(f"Error procesando remito pendiente {numero}: {e}")
+    await db.commit()
+    return processed, last_id
 
 
 async def get_by_numero(db: AsyncSession, numero: str) -> Optional[Remito]:
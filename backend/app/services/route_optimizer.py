@@ -8,6 +8,7 @@ import logging
 from dataclasses import dataclass, field
 from typing import Optional
 
+from app.core import time_buckets
 from app.core.haversine import haversine_minutes
 
 logger = logging.getLogger(__name__)
@@ -36,6 +37,7 @@ class OptimizedRoute:
     ordered_points: list[RoutePoint]
     excluded_idxs: list[int]
     exclusion_reasons: dict[int, str] = field(default_factory=dict)
+    stats: dict = field(default_factory=dict)   # contadores para el perfil de la ruta
 
 
 def sweep(
@@ -60,12 +62,13 @@ def sweep(
 def two_opt(
     order: list[int],
     matrix: list[list[float]],
+    stats: Optional[dict] = None,
 ) -> list[int]:
     """
     2-opt local search.
     Δ = [d(A,C) + d(B,D)] - [d(A,B) + d(C,D)]
     Si Δ < -1e-6 → invertir segmento [i..k].
-    Itera hasta convergencia.
+    Itera hasta convergencia (stats["two_opt_passes"] cuenta las pasadas).
     Equivalente a twoOptImprove_() del sistema original.
     """
     n = len(order)
@@ -75,6 +78,8 @@ def two_opt(
     improved = True
     while improved:
         improved = False
+        if stats is not None:
+            stats["two_opt_passes"] = stats.get("two_opt_passes", 0) + 1
         for i in range(n - 1):
             for k in range(i + 2, n):
                 a = order[i]
@@ -167,6 +172,7 @@ def optimize(
     depot_lat: float,
     depot_lng: float,
     evitar_saltos_min: float = 25.0,
+    matrices: Optional[dict[Optional[str], list[list[float]]]] = None,
 ) -> OptimizedRoute:
     """
     Pipeline completo de optimización.
@@ -176,9 +182,15 @@ def optimize(
     4. NORMALES: sweep only
     5. Concat: URG → AM_PRI → AM_NORM → PM_PRI → PM_NORM
     6. fixpoint_filter_jumps post-optimización
+
+    `matrices` (franja horaria → matriz, ver core/time_buckets.py): los
+    tramos hacia un punto AM / PM se miden con la matriz de la franja en
+    que arranca su ventana; urgentes y sin horario, con `matrix`.
     """
     if not points:
         return OptimizedRoute(ordered_points=[], excluded_idxs=[])
+    if matrices:
+        matrix = _matrix_by_window(points, matrix, matrices)
 
     # Clasificar
     urgentes = [p for p in points if p.urgente]
@@ -196,11 +208,13 @@ def optimize(
         idxs = sweep(depot_lat, depot_lng, group)
         return [group[i] for i in idxs]
 
+    stats: dict = {}
+
     # Urgentes: sweep + 2-opt
     urg_sorted = sort_group(urgentes)
     if len(urg_sorted) >= 4:
         local_matrix = _sub_matrix(matrix, [p.idx for p in urg_sorted], points)
-        local_order = two_opt(list(range(len(urg_sorted))), local_matrix)
+        local_order = two_opt(list(range(len(urg_sorted))), local_matrix, stats)
         urg_sorted = [urg_sorted[i] for i in local_order]
 
     # Resto: sweep only
@@ -220,11 +234,14 @@ def optimize(
         points, order_idxs, matrix, evitar_saltos_min
     )
 
+    stats["jump_filter_excluded"] = len(excluded_idxs)
+
     ordered_points = [points[i] for i in filtered_idxs]
     return OptimizedRoute(
         ordered_points=ordered_points,
         excluded_idxs=excluded_idxs,
         exclusion_reasons={i: "salto" for i in excluded_idxs},
+        stats=stats,
     )
 
 
@@ -241,3 +258,19 @@ def _sub_matrix(
             if gi < len(full_matrix) and gj < len(full_matrix[gi]):
                 sub[i][j] = full_matrix[gi][gj]
     return sub
+
+
+def _matrix_by_window(
+    points: list[RoutePoint],
+    base: list[list[float]],
+    matrices: dict[Optional[str], list[list[float]]],
+) -> list[list[float]]:
+    """Matriz donde la columna de cada punto sale de la franja de su ventana."""
+    columns = []
+    for p in points:
+        franja = None if p.urgente else time_buckets.bucket_for_ventana(p.ventana_tipo)
+        columns.append(matrices.get(franja, base) if franja else base)
+    return [
+        [columns[j][i][j] for j in range(len(row))]
+        for i, row in enumerate(base)
+    ]
@@ -3,6 +3,7 @@ Route generation service: orquestador completo.
 Migra: generarRutaDesdeFraccionados_() del sistema original.
 """
 import logging
+import uuid
 from datetime import date, datetime, timezone
 from typing import Optional
 
@@ -11,15 +12,17 @@ from sqlalchemy import select
 
 from app.models.remito import Remito, RemitoEstadoClasificacion, RemitoEstadoLifecycle
 from app.models.ruta import Ruta, RutaParada, RutaExcluido, RutaEstado, ParadaEstado
-from app.models.config import ConfigRuta
-from app.services import distance_matrix_service, route_optimizer, window_service
+from app.services import (
+    billing_service, config_service, distance_matrix_service, route_optimizer,
+    travel_model_service, window_service,
+)
 from app.services.distance_matrix_service import MatrixPoint
 from app.services.route_optimizer import RoutePoint
-from app.core.haversine import haversine, haversine_minutes
-from app.core.constants import (
-    DEPOT_LAT, DEPOT_LNG, MAX_DISTANCE_FROM_DEPOT_KM, URBAN_SPEED_KMH,
-)
+from app.core.haversine import haversine
+from app.core.constants import DEPOT_LAT, DEPOT_LNG, MAX_DISTANCE_FROM_DEPOT_KM
+from app.core import time_buckets, validators
 from app.core.gmaps_link_builder import build_gmaps_links
+from app.core.stage_timer import StageTimer
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +30,28 @@ logger = logging.getLogger(__name__)
 async def generate_route(
     db: AsyncSession,
     config_override: Optional[dict] = None,
+    profile: bool = False,
+) -> Ruta:
+    """
+    Pipeline completo de generación de ruta.
+    Guarda en ruta.perf_profile el tiempo de cada etapa y contadores
+    (cache, proveedor, optimizador, filas); con profile=True agrega el top
+    de cProfile.
+    """
+    run_id = f"ruta-{uuid.uuid4().hex[:12]}"
+    billing_service.set_run_context(run_id, "route")
+    # El profiler se apaga al salir del with aunque el pipeline falle
+    with StageTimer(profile=profile) as timer:
+        return await _generate_route(db, config_override, timer)
+
+
+async def _generate_route(
+    db: AsyncSession,
+    config_override: Optional[dict],
+    timer: StageTimer,
 ) -> Ruta:
-    """Pipeline completo de generación de ruta."""
     # 1. Cargar configuración
-    config = await _load_config(db)
+    config = await config_service.get_config(db)
     if config_override:
         if hasattr(config_override, "model_dump"):
             config.update({k: v for k, v in config_override.model_dump().items() if v is not None})
@@ -47,6 +68,14 @@ async def generate_route(
     tiempo_espera_min = float(config.get("tiempo_espera_min", 10))
     utilizar_ventana = str(config.get("utilizar_ventana", "true")).lower() in ("true", "1", "yes")
     proveedor_matrix = config.get("proveedor_matrix", "ors")
+    travel = await travel_model_service.get_model(db)
+    # Tráfico por franja (factores calibrados en config_ruta, 1.0 = flujo libre).
+    # Todo lo que se compara contra un umbral en minutos (vuelta al galpón,
+    # saltos) usa el mismo ajuste que los tiempos de la ruta.
+    inicio_min = window_service.parse_hhmm(hora_desde)
+    franja_salida = time_buckets.bucket_for(inicio_min)
+    factors = time_buckets.factors_from_config(config)
+    timer.lap("config")
 
     # 2. Cargar candidatos (enviar + armado + lat/lng not null)
     result = await db.execute(
@@ -58,6 +87,8 @@ async def generate_route(
         )
     )
     candidates_raw = result.scalars().all()
+    timer.count("candidatos", len(candidates_raw))
+    timer.lap("candidatos")
 
     if not candidates_raw:
         ruta = Ruta(
@@ -69,6 +100,7 @@ async def generate_route(
             total_paradas=0,
             total_excluidos=0,
             gmaps_links=[],
+            perf_profile=timer.finish(),
         )
         db.add(ruta)
         await db.commit()
@@ -100,9 +132,18 @@ async def generate_route(
     excluded_idxs: list[int] = []
     exclusion_reasons: dict[int, str] = {}
 
-    # 3. Filtro de distancia máxima
-    for i, p in enumerate(all_points):
-        dist = haversine(depot_lat, depot_lng, p.lat, p.lng)
+    # 3. Validación de coordenadas (todo el lote) y distancia máxima.
+    # Coordenadas inválidas (centro de localidad cacheado, fuera del bbox)
+    # se excluyen siempre, aun urgentes.
+    checks = validators.check_batch(
+        [p.lat for p in all_points], [p.lng for p in all_points], depot=(depot_lat, depot_lng)
+    )
+    for i, (p, check) in enumerate(zip(all_points, checks)):
+        if not check.ok:
+            excluded_idxs.append(i)
+            exclusion_reasons[i] = f"geocodificacion_invalida ({check.rejection})"
+            continue
+        dist = check.depot_km
         if dist > distancia_max_km and not p.urgente and not p.prioridad:
             excluded_idxs.append(i)
             exclusion_reasons[i] = f"distancia_maxima ({dist:.1f} km > {distancia_max_km} km)"
@@ -123,15 +164,18 @@ async def generate_route(
                 exclusion_reasons[i] = "ventana_horaria"
 
     # 5. Filtro de vuelta al galpón
+    vuelta, _ = travel.matrix([(p.lat, p.lng) for p in all_points], [(depot_lat, depot_lng)])
     for i, p in enumerate(all_points):
         if i in excluded_idxs or p.urgente or p.prioridad:
             continue
-        time_vuelta = haversine_minutes(p.lat, p.lng, depot_lat, depot_lng, URBAN_SPEED_KMH)
+        time_vuelta = vuelta[i][0] * factors[franja_salida]
         if time_vuelta > vuelta_galpon_min:
             excluded_idxs.append(i)
             exclusion_reasons[i] = f"vuelta_galpon ({time_vuelta:.1f} min > {vuelta_galpon_min} min)"
 
     active_points = [p for i, p in enumerate(all_points) if i not in excluded_idxs]
+    timer.count("excluidos_filtros", len(excluded_idxs))
+    timer.lap("filtros")
 
     if not active_points:
         ruta = Ruta(
@@ -147,32 +191,35 @@ async def generate_route(
         db.add(ruta)
         await db.flush()
         await _save_excluded(db, ruta.id, all_points, excluded_idxs, exclusion_reasons, candidates_raw)
+        timer.count("filas_escritas", 1 + len(set(excluded_idxs)))
+        timer.lap("persistencia")
+        ruta.perf_profile = timer.finish()
         await db.commit()
         await db.refresh(ruta)
         return ruta
 
     # 6. Distance Matrix NxN
     matrix_points = [MatrixPoint(lat=p.lat, lng=p.lng, label=p.numero) for p in active_points]
+    # Una matriz por franja horaria; la base es la de la hora de salida
+    dm_stats: dict = {}
     try:
-        matrix = await distance_matrix_service.get_matrix_nxn(
-            db, matrix_points, provider=proveedor_matrix
+        matrices = await distance_matrix_service.get_matrices(
+            db, matrix_points, factors, provider=proveedor_matrix, stats=dm_stats
         )
     except Exception as e:
-        logger.warning(f"DM API failed, usando Haversine fallback: {e}")
-        n = len(active_points)
-        matrix = [[
-            haversine_minutes(
-                active_points[i].lat, active_points[i].lng,
-                active_points[j].lat, active_points[j].lng,
-                URBAN_SPEED_KMH
-            ) if i != j else 0.0
-            for j in range(n)
-        ] for i in range(n)]
+        logger.warning(f"DM API failed, usando modelo por zonas: {e}")
+        free_flow, _ = travel.matrix([(p.lat, p.lng) for p in active_points])
+        matrices = {f: [[v * k for v in row] for row in free_flow] for f, k in factors.items()}
+    matrix = matrices[franja_salida]
+    timer.update(dm_stats)
+    timer.lap("distance_matrix")
 
     # 7. Optimizar ruta
     opt_result = route_optimizer.optimize(
-        active_points, matrix, depot_lat, depot_lng, evitar_saltos_min
+        active_points, matrix, depot_lat, depot_lng, evitar_saltos_min, matrices=matrices
     )
+    timer.update(opt_result.stats)
+    timer.lap("optimizacion")
 
     for i in opt_result.excluded_idxs:
         orig_idx = active_points[i].idx
@@ -191,8 +238,10 @@ async def generate_route(
         p_idx_in_active = next(
             (j for j, ap in enumerate(active_points) if ap.idx == p.idx), 0
         )
+        # Franja de la hora en que sale hacia esta parada
+        franja = time_buckets.bucket_for(inicio_min + minutes_accumulated)
         if i == 0:
-            dur = haversine_minutes(depot_lat, depot_lng, p.lat, p.lng, URBAN_SPEED_KMH)
+            dur = travel.minutes(depot_lat, depot_lng, p.lat, p.lng) * factors[franja]
             dist = haversine(depot_lat, depot_lng, p.lat, p.lng)
         else:
             prev_p = final_points[i - 1]
@@ -200,9 +249,9 @@ async def generate_route(
                 (j for j, ap in enumerate(active_points) if ap.idx == prev_p.idx), 0
             )
             try:
-                dur = matrix[prev_idx_in_active][p_idx_in_active]
+                dur = matrices[franja][prev_idx_in_active][p_idx_in_active]
             except IndexError:
-                dur = haversine_minutes(prev_p.lat, prev_p.lng, p.lat, p.lng, URBAN_SPEED_KMH)
+                dur = travel.minutes(prev_p.lat, prev_p.lng, p.lat, p.lng) * factors[franja]
             dist = haversine(prev_p.lat, prev_p.lng, p.lat, p.lng)
 
         minutes_accumulated += dur + tiempo_espera_min
@@ -228,6 +277,8 @@ async def generate_route(
             "coordinates": coords
         }
 
+    timer.lap("armado")
+
     # 11. Guardar ruta
     ruta = Ruta(
         fecha=date.today(),
@@ -241,6 +292,7 @@ async def generate_route(
         distancia_total_km=round(total_distance, 2),
         gmaps_links=gmaps_links,
         ruta_geom=ruta_geom_json,
+        billing_detail={"run_id": run_id},
     )
     db.add(ruta)
     await db.flush()
@@ -272,7 +324,11 @@ async def generate_route(
 
     # Guardar excluidos
     await _save_excluded(db, ruta.id, all_points, excluded_idxs, exclusion_reasons, candidates_raw)
+    timer.count("filas_escritas", 1 + len(paradas_data) + len(set(excluded_idxs)))
+    timer.lap("persistencia")
 
+    # El commit final queda fuera del perfil (el perfil viaja en ese commit)
+    ruta.perf_profile = timer.finish()
     await db.commit()
     await db.refresh(ruta)
     return ruta
@@ -303,20 +359,3 @@ async def _save_excluded(
             observaciones_snapshot=p.observaciones,
         )
         db.add(exc)
-
-
-async def _load_config(db: AsyncSession) -> dict:
-    """Carga la configuración de ruta desde DB."""
-    result = await db.execute(select(ConfigRuta))
-    rows = result.scalars().all()
-    config: dict = {}
-    for row in rows:
-        if row.tipo in ("int", "integer"):
-            config[row.key] = int(row.value)
-        elif row.tipo == "float":
-            config[row.key] = float(row.value)
-        elif row.tipo in ("bool", "boolean"):
-            config[row.key] = row.value.lower() in ("true", "1", "yes", "si")
-        else:
-            config[row.key] = row.value
-    return config
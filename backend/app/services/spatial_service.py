@@ -0,0 +1,118 @@
+"""
+Índice espacial en memoria de remitos activos (no entregados ni en histórico)
+con coordenadas. Uno por worker.
+
+Se refresca en forma perezosa antes de cada consulta si pasaron más de
+SPATIAL_REFRESH_SECONDS: lee los remitos con updated_at posterior a la
+última pasada (con un margen para transacciones largas) y los da de alta,
+mueve o baja. Cada hora se reconstruye completo (cubre borrados).
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, literal, any_, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.haversine import haversine
+from app.core.spatial_grid import GridIndex, cells_within
+from app.models.remito import Remito, RemitoEstadoLifecycle
+
+_INACTIVE = (RemitoEstadoLifecycle.entregado.value, RemitoEstadoLifecycle.historico.value)
+_OVERLAP = timedelta(minutes=5)
+_FULL_RELOAD_SECONDS = 3600
+
+_grid = GridIndex()
+_watermark: Optional[datetime] = None
+_last_refresh = 0.0
+_last_full = 0.0
+_lock = asyncio.Lock()
+
+
+def _is_active(row) -> bool:
+    return row.estado_lifecycle not in _INACTIVE and row.lat is not None and row.lng is not None
+
+
+async def ensure_fresh(db: AsyncSession) -> None:
+    if time.monotonic() - _last_refresh < settings.SPATIAL_REFRESH_SECONDS:
+        return
+    async with _lock:
+        if time.monotonic() - _last_refresh < settings.SPATIAL_REFRESH_SECONDS:
+            return
+        await _refresh(db)
+
+
+async def _refresh(db: AsyncSession) -> None:
+    global _grid, _watermark, _last_refresh, _last_full
+    now = time.monotonic()
+    full = _watermark is None or now - _last_full > _FULL_RELOAD_SECONDS
+    stmt = select(
+        Remito.id, Remito.lat, Remito.lng, Remito.estado_lifecycle, Remito.updated_at
+    )
+    if full:
+        stmt = stmt.where(
+            Remito.estado_lifecycle.not_in(_INACTIVE),
+            Remito.lat.is_not(None),
+            Remito.lng.is_not(None),
+        )
+    else:
+        stmt = stmt.where(Remito.updated_at > _watermark - _OVERLAP)
+    rows = (await db.execute(stmt)).all()
+
+    # La carga completa arma una grilla nueva y la reemplaza entera
+    grid = GridIndex() if full else _grid
+    watermark = _watermark
+    for row in rows:
+        if _is_active(row):
+            grid.insert(row.id, row.lat, row.lng)
+        else:
+            grid.remove(row.id)
+        if row.updated_at is not None and (watermark is None or row.updated_at > watermark):
+            watermark = row.updated_at
+
+    _grid = grid
+    _watermark = watermark
+    _last_refresh = now
+    if full:
+        _last_full = now
+
+
+async def near(
+    db: AsyncSession,
+    lat: float,
+    lng: float,
+    radio_km: float,
+    k: Optional[int] = None,
+) -> list[tuple[int, float]]:
+    """Remitos activos a <= radio_km: [(remito_id, km)] por distancia; con k, los k más cercanos."""
+    await ensure_fresh(db)
+    if k is not None:
+        return _grid.knn(lat, lng, k, max_km=radio_km)
+    return _grid.radius(lat, lng, radio_km)
+
+
+async def near_sql(
+    db: AsyncSession,
+    lat: float,
+    lng: float,
+    radio_km: float,
+    limit: int,
+) -> list[tuple[Remito, float]]:
+    """
+    Búsqueda en la tabla (incluye entregados e histórico): prefiltro por
+    geo_cell con el índice y distancia exacta en Python.
+    """
+    cells = cells_within(lat, lng, radio_km)
+    rows = (await db.execute(
+        select(Remito).where(Remito.geo_cell == any_(literal(cells, type_=ARRAY(Integer))))
+    )).scalars().all()
+    found = [
+        (r, d) for r in rows
+        if (d := haversine(lat, lng, r.lat, r.lng)) <= radio_km
+    ]
+    found.sort(key=lambda rd: rd[1])
+    return found[:limit]
+
@@ -0,0 +1,202 @@
+"""
+Modelo de viaje por zonas calibrado (tabla travel_zone_params), usado cuando
+no hay dato de matriz: fallback de distance_matrix_service, filtro de vuelta
+al galpón y primer tramo de la ruta.
+
+fit() lo ajusta offline con las duraciones reales de distance_matrix_cache
+(scripts/fit_travel_model.py). Zonas sin datos suficientes conservan los
+defaults de core/travel_model.py.
+
+fit_traffic() ajusta los factores por franja horaria (core/time_buckets.py)
+comparando los tramos entre entregas consecutivas de una ruta contra el
+modelo en flujo libre; se guardan en config_ruta.
+"""
+import statistics
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import time_buckets
+from app.core.haversine import haversine
+from app.core.travel_model import TravelModel, default_model
+from app.core.ttl_cache import TTLCache
+from app.models.config import ConfigRuta
+from app.models.distance_cache import DistanceMatrixCache
+from app.models.historico import HistoricoEntregado
+from app.models.remito import Remito
+from app.models.ruta import RutaParada
+from app.models.travel_zone import TravelZoneParam
+from app.services import config_service
+
+MODEL_TTL_SECONDS = 300
+MIN_SAMPLES = 30
+MIN_STRAIGHT_KM = 0.5        # tramos más cortos: el desvío domina y mete ruido
+SPEED_RANGE = (8.0, 90.0)
+FACTOR_RANGE = (1.0, 2.5)
+TRAFFIC_RANGE = (1.0, 2.5)
+MIN_LEG_MIN = 3.0            # tramos más cortos: estacionar pesa más que el tráfico
+LEG_RATIO_RANGE = (0.5, 4.0) # fuera de esto: entregas marcadas en lote, desvíos, etc.
+_YIELD_PER = 5000
+
+_cache = TTLCache(ttl_seconds=MODEL_TTL_SECONDS, maxsize=1)
+
+
+async def _load(db: AsyncSession) -> TravelModel:
+    rows = (await db.execute(select(TravelZoneParam))).scalars().all()
+    return default_model.with_overrides(
+        speeds={r.zona: r.speed_kmh for r in rows},
+        road_factors={r.zona: r.road_factor for r in rows},
+    )
+
+
+async def get_model(db: AsyncSession) -> TravelModel:
+    return await _cache.get_or_compute("model", lambda: _load(db))
+
+
+def invalidate() -> None:
+    _cache.invalidate()
+
+
+def _clamp(value: float, bounds: tuple[float, float]) -> float:
+    return max(bounds[0], min(bounds[1], value))
+
+
+async def fit(db: AsyncSession, min_samples: int = MIN_SAMPLES) -> dict:
+    """
+    Ajusta velocidad y factor de desvío por zona con los pares del cache
+    (flujo libre) cuyos dos extremos caen en la misma zona:
+    - factor = mediana(distancia por calle / haversine), con las filas que
+      tienen distance_m (ORS y OSRM la devuelven junto con la duración;
+      filas viejas sin distancia no cuentan). Sin suficientes, queda el default.
+    - velocidad = mediana(haversine × factor / duración).
+    No escribe: ver save().
+    """
+    ratios: dict[str, list[float]] = {}
+    paces: dict[str, list[tuple[float, float]]] = {}   # (km en línea recta, horas)
+    rows = await db.stream(
+        select(
+            DistanceMatrixCache.origin_lat, DistanceMatrixCache.origin_lng,
+            DistanceMatrixCache.dest_lat, DistanceMatrixCache.dest_lng,
+            DistanceMatrixCache.duration_sec, DistanceMatrixCache.distance_m,
+        )
+        .where(DistanceMatrixCache.duration_sec > 0)
+        .execution_options(yield_per=_YIELD_PER)
+    )
+    async for r in rows:
+        zone = default_model.zone_of(r.origin_lat, r.origin_lng)
+        if default_model.zone_of(r.dest_lat, r.dest_lng) is not zone:
+            continue
+        straight = haversine(r.origin_lat, r.origin_lng, r.dest_lat, r.dest_lng)
+        if straight < MIN_STRAIGHT_KM:
+            continue
+        paces.setdefault(zone.name, []).append((straight, r.duration_sec / 3600))
+        if r.distance_m:
+            ratios.setdefault(zone.name, []).append(r.distance_m / 1000 / straight)
+
+    fitted = {}
+    for zone in default_model.zones:
+        samples = paces.get(zone.name, [])
+        if len(samples) < min_samples:
+            continue
+        zone_ratios = ratios.get(zone.name, [])
+        factor = (
+            _clamp(statistics.median(zone_ratios), FACTOR_RANGE)
+            if len(zone_ratios) >= min_samples else zone.road_factor
+        )
+        speed = _clamp(statistics.median(km * factor / h for km, h in samples), SPEED_RANGE)
+        fitted[zone.name] = {
+            "speed_kmh": round(speed, 2),
+            "road_factor": round(factor, 3),
+            "samples": len(samples),
+        }
+    return fitted
+
+
+async def save(db: AsyncSession, fitted: dict) -> None:
+    """Upsert de los parámetros ajustados (commit a cargo del caller)."""
+    if not fitted:
+        return
+    now = datetime.now(timezone.utc)
+    stmt = pg_insert(TravelZoneParam).values([
+        {"zona": zona, "fitted_at": now, **params} for zona, params in fitted.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[TravelZoneParam.zona],
+        set_={
+            "speed_kmh": stmt.excluded.speed_kmh,
+            "road_factor": stmt.excluded.road_factor,
+            "samples": stmt.excluded.samples,
+            "fitted_at": stmt.excluded.fitted_at,
+        },
+    ))
+    invalidate()
+
+
+async def fit_traffic(db: AsyncSession, model: TravelModel, min_samples: int = MIN_SAMPLES) -> dict:
+    """
+    Factor por franja = mediana(minutos reales / minutos del modelo) de los
+    tramos entre entregas consecutivas de una misma ruta. Minutos reales =
+    diferencia de fecha_entregado menos el tiempo de espera de la parada; la
+    franja es la de la hora local de la entrega anterior. No escribe: ver
+    save_traffic().
+    """
+    tz = ZoneInfo(time_buckets.TIMEZONE)
+    ratios: dict[str, list[float]] = {}
+    rows = await db.stream(
+        select(
+            RutaParada.ruta_id,
+            RutaParada.lat_snapshot,
+            RutaParada.lng_snapshot,
+            RutaParada.tiempo_espera_min,
+            func.coalesce(Remito.fecha_entregado, HistoricoEntregado.fecha_entregado).label("entregado"),
+        )
+        .outerjoin(Remito, Remito.id == RutaParada.remito_id)
+        .outerjoin(HistoricoEntregado, HistoricoEntregado.numero == RutaParada.remito_numero)
+        .where(RutaParada.lat_snapshot.is_not(None), RutaParada.lng_snapshot.is_not(None))
+        .order_by(RutaParada.ruta_id, RutaParada.orden)
+        .execution_options(yield_per=_YIELD_PER)
+    )
+    prev = None
+    async for r in rows:
+        if prev is not None and prev.ruta_id == r.ruta_id and prev.entregado and r.entregado:
+            observed = (r.entregado - prev.entregado).total_seconds() / 60 - (r.tiempo_espera_min or 0)
+            expected = model.minutes(prev.lat_snapshot, prev.lng_snapshot, r.lat_snapshot, r.lng_snapshot)
+            if expected >= MIN_LEG_MIN and observed > 0:
+                ratio = observed / expected
+                local = prev.entregado.astimezone(tz)
+                franja = time_buckets.bucket_for(local.hour * 60 + local.minute)
+                if franja and LEG_RATIO_RANGE[0] <= ratio <= LEG_RATIO_RANGE[1]:
+                    ratios.setdefault(franja, []).append(ratio)
+        prev = r
+
+    return {
+        name: {
+            "factor": round(_clamp(statistics.median(samples), TRAFFIC_RANGE), 3),
+            "samples": len(samples),
+        }
+        for name, samples in ratios.items()
+        if len(samples) >= min_samples
+    }
+
+
+async def save_traffic(db: AsyncSession, fitted: dict) -> None:
+    """Escribe los factores en config_ruta (commit a cargo del caller)."""
+    if not fitted:
+        return
+    stmt = pg_insert(ConfigRuta).values([
+        {
+            "key": time_buckets.CONFIG_PREFIX + name,
+            "value": str(params["factor"]),
+            "tipo": "float",
+            "descripcion": f"Factor de tráfico {name} sobre el flujo libre ({params['samples']} tramos)",
+        }
+        for name, params in fitted.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[ConfigRuta.key],
+        set_={"value": stmt.excluded.value, "descripcion": stmt.excluded.descripcion},
+    ))
+    config_service.invalidate()
@@ -4,7 +4,8 @@ Migra: interpretarObservacionUnificado_(), asignarVentana_() del sistema origina
 """
 import re
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from functools import lru_cache
 from typing import Optional
 
 from app.core.constants import (
@@ -25,7 +26,7 @@ class WindowResult:
     raw_text: Optional[str] = None
 
 
-def _parse_hhmm(s: str) -> int:
+def parse_hhmm(s: str) -> int:
     """Convierte 'HH:MM' a minutos desde medianoche."""
     h, m = s.split(":")
     return int(h) * 60 + int(m)
@@ -35,60 +36,103 @@ def _ranges_intersect(a_from: int, a_to: int, b_from: int, b_to: int) -> bool:
     return a_from < b_to and b_from < a_to
 
 
-def parse_window(observation_text: str) -> WindowResult:
-    """
-    Cascade de interpretación de ventana horaria.
-    Equivalente a interpretarObservacionUnificado_().
+@dataclass(frozen=True)
+class ObservationAnalysis:
+    """Resultado de un único escaneo de observaciones. Compartido por el memo: no mutar."""
+    pickup: bool
+    window: WindowResult
+    llamar_antes: bool
+    carrier_hint: Optional[str] = None
+
+
+# Un solo patrón para todo el texto de observaciones. DESDE/HASTA capturan un
+# rango pegado ("DESDE 10:00-12:00") para que el rango no quede consumido.
+_TIME = r'\d{1,2}:\d{2}'
+_RE_OBSERVATION = re.compile(
+    rf'(?P<pickup>{RE_PICKUP})'
+    rf'|(?:DESDE|A PARTIR DE)\s+(?:LAS?\s+)?(?P<desde>{_TIME})(?:\s*[–\-]\s*(?P<desde_rango>{_TIME}))?'
+    rf'|HASTA\s+(?:LAS?\s+)?(?P<hasta>{_TIME})(?:\s*[–\-]\s*(?P<hasta_rango>{_TIME}))?'
+    rf'|(?P<rango_desde>{_TIME})\s*[–\-]\s*(?P<rango_hasta>{_TIME})'
+    r'|(?P<manana>\bMA[ÑN]ANA\b)'
+    r'|(?P<tarde>\bTARDE\b)'
+    r'|(?P<comercial>HORARIO COMERCIAL)'
+    r'|(?P<llamar>LLAMAR\s+ANTES|AVISAR\s+ANTES)',
+    re.IGNORECASE,
+)
 
-    Pasos:
-    1. Regex RETIRA/RETIRO → PICKUP
-    2. Formato HH:MM-HH:MM explícito
-    3. "DESDE LAS HH:MM"
-    4. "HASTA LAS HH:MM"
-    5. Palabras vagas (MAÑANA, TARDE, HORARIO COMERCIAL)
-    6. LLAMAR ANTES
-    7. SIN_HORARIO
-    """
-    if not observation_text:
-        return WindowResult(tipo="SIN_HORARIO", ventana_tipo="SIN_HORARIO")
+_ANALYSIS_MEMO_SIZE = 4096
 
-    text = observation_text.upper().strip()
 
+def analyze_observation(
+    observation_text: str,
+    carrier_patterns: tuple[tuple[str, re.Pattern], ...] = (),
+) -> ObservationAnalysis:
+    """
+    Analiza observaciones en una pasada: pickup, ventana, AM/PM, llamar antes
+    y el primer carrier (en orden de prioridad) cuyo patrón matchea.
+    Memoizado sobre el texto normalizado (upper + strip).
+    """
+    text = observation_text.upper().strip() if observation_text else None
+    return _analyze(text, carrier_patterns)
+
+
+@lru_cache(maxsize=_ANALYSIS_MEMO_SIZE)
+def _analyze(
+    text: Optional[str],
+    carrier_patterns: tuple[tuple[str, re.Pattern], ...],
+) -> ObservationAnalysis:
+    if text is None:
+        return ObservationAnalysis(
+            pickup=False,
+            window=WindowResult(tipo="SIN_HORARIO", ventana_tipo="SIN_HORARIO"),
+            llamar_antes=False,
+        )
+
+    found: dict[str, tuple] = {}
+    for m in _RE_OBSERVATION.finditer(text):
+        kind = m.lastgroup
+        if kind in ("desde_rango", "hasta_rango"):
+            # Rango explícito pegado a DESDE/HASTA: cuenta como rango y como DESDE/HASTA
+            base = "desde" if kind == "desde_rango" else "hasta"
+            found.setdefault("rango", (m.group(base), m.group(kind)))
+            found.setdefault(base, (m.group(base),))
+        elif kind in ("desde", "hasta"):
+            found.setdefault(kind, (m.group(kind),))
+        elif kind == "rango_hasta":
+            found.setdefault("rango", (m.group("rango_desde"), m.group("rango_hasta")))
+        else:
+            found.setdefault(kind, ())
+
+    llamar = "llamar" in found
+    carrier_hint = next(
+        (nombre for nombre, pattern in carrier_patterns if pattern.search(text)), None
+    )
+    return ObservationAnalysis(
+        pickup="pickup" in found,
+        window=_window_from_matches(found, text),
+        llamar_antes=llamar,
+        carrier_hint=carrier_hint,
+    )
+
+
+def _window_from_matches(found: dict[str, tuple], text: str) -> WindowResult:
+    """Resuelve la cascada de interpretarObservacionUnificado_() sobre los matches."""
     # 1. Pickup
-    if re.search(RE_PICKUP, text, re.IGNORECASE):
+    if "pickup" in found:
         return WindowResult(tipo="PICKUP", ventana_tipo="SIN_HORARIO", raw_text=text)
 
     # 2. Formato explícito HH:MM-HH:MM
-    m = re.search(r'(\d{1,2}:\d{2})\s*[–\-]\s*(\d{1,2}:\d{2})', text)
-    if m:
-        desde = _parse_hhmm(m.group(1))
-        hasta = _parse_hhmm(m.group(2))
-        return WindowResult(
-            tipo="VENTANA",
-            desde_min=desde,
-            hasta_min=hasta,
-            ventana_tipo=_assign_am_pm(desde, hasta),
-            raw_text=text,
-        )
-
     # 3. "DESDE LAS HH:MM" o "A PARTIR DE HH:MM"
-    m = re.search(r'(?:DESDE|A PARTIR DE)\s+(?:LAS?\s+)?(\d{1,2}:\d{2})', text)
-    if m:
-        desde = _parse_hhmm(m.group(1))
-        hasta = 23 * 60
-        return WindowResult(
-            tipo="VENTANA",
-            desde_min=desde,
-            hasta_min=hasta,
-            ventana_tipo=_assign_am_pm(desde, hasta),
-            raw_text=text,
-        )
-
     # 4. "HASTA LAS HH:MM"
-    m = re.search(r'HASTA\s+(?:LAS?\s+)?(\d{1,2}:\d{2})', text)
-    if m:
-        hasta = _parse_hhmm(m.group(1))
-        desde = 0
+    if "rango" in found:
+        desde, hasta = (parse_hhmm(t) for t in found["rango"])
+    elif "desde" in found:
+        desde, hasta = parse_hhmm(found["desde"][0]), 23 * 60
+    elif "hasta" in found:
+        desde, hasta = 0, parse_hhmm(found["hasta"][0])
+    else:
+        desde = hasta = None
+    if desde is not None:
         return WindowResult(
             tipo="VENTANA",
             desde_min=desde,
@@ -98,21 +142,42 @@ def parse_window(observation_text: str) -> WindowResult:
         )
 
     # 5. Palabras vagas
-    if re.search(r'\bMa[ÑN]ANA\b', text):
+    if "manana" in found:
         return WindowResult(tipo="VENTANA", desde_min=8*60, hasta_min=13*60, ventana_tipo="AM", raw_text=text)
-    if re.search(r'\bTARDE\b', text):
+    if "tarde" in found:
         return WindowResult(tipo="VENTANA", desde_min=14*60, hasta_min=21*60, ventana_tipo="PM", raw_text=text)
-    if re.search(r'HORARIO COMERCIAL', text):
+    if "comercial" in found:
         return WindowResult(tipo="VENTANA", desde_min=9*60, hasta_min=18*60, ventana_tipo="SIN_HORARIO", raw_text=text)
 
     # 6. Llamar antes
-    llamar = bool(re.search(r'LLAMAR\s+ANTES|AVISAR\s+ANTES|LLAMAR\s+ANTES\s+DE', text))
-    if llamar:
+    if "llamar" in found:
         return WindowResult(tipo="SIN_HORARIO", ventana_tipo="SIN_HORARIO", llamar_antes=True, raw_text=text)
 
     return WindowResult(tipo="SIN_HORARIO", ventana_tipo="SIN_HORARIO", raw_text=text)
 
 
+def parse_window(observation_text: str) -> WindowResult:
+    """
+    Cascade de interpretación de ventana horaria.
+    Equivalente a interpretarObservacionUnificado_().
+
+    Pasos:
+    1. Regex RETIRA/RETIRO → PICKUP
+    2. Formato HH:MM-HH:MM explícito
+    3. "DESDE LAS HH:MM"
+    4. "HASTA LAS HH:MM"
+    5. Palabras vagas (MAÑANA, TARDE, HORARIO COMERCIAL)
+    6. LLAMAR ANTES
+    7. SIN_HORARIO
+    """
+    return replace(analyze_observation(observation_text).window)
+
+
+def detect_pickup(observation_text: str) -> bool:
+    """True si el texto indica un retiro (usa el mismo análisis memoizado)."""
+    return analyze_observation(observation_text).pickup
+
+
 def _assign_am_pm(desde_min: int, hasta_min: int) -> str:
     """Asigna AM, PM o SIN_HORARIO a un rango de minutos."""
     if _ranges_intersect(desde_min, hasta_min, WINDOW_AM_FROM, WINDOW_AM_TO):
@@ -135,6 +200,6 @@ def is_within_config_window(
         return True  # Sin restricción horaria → siempre pasa
     if window.desde_min is None or window.hasta_min is None:
         return True
-    config_from = _parse_hhmm(hora_desde_str)
-    config_to = _parse_hhmm(hora_hasta_str)
+    config_from = parse_hhmm(hora_desde_str)
+    config_to = parse_hhmm(hora_hasta_str)
     return _ranges_intersect(window.desde_min, window.hasta_min, config_from, config_to)
@@ -0,0 +1,299 @@
+"""
+Benchmark offline de route_optimizer con instancias sintéticas de Mendoza.
+
+Genera instancias reproducibles dentro del bbox de core/constants.py, corre
+cada motor registrado en ENGINES y reporta tiempo, costo del tour, exclusiones
+y violaciones de ventana horaria como JSON. Con --baseline compara contra una
+corrida anterior y sale con código 1 si hay regresiones.
+
+Uso (desde backend/):
+    python -m scripts.bench_route_optimizer --sizes 50 100 200 500 --out bench.json
+    python -m scripts.bench_route_optimizer --baseline bench.json
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.constants import (  # noqa: E402
+    MENDOZA_LAT_MIN, MENDOZA_LAT_MAX, MENDOZA_LNG_MIN, MENDOZA_LNG_MAX,
+    KNOWN_CITY_CENTERS, DEPOT_LAT, DEPOT_LNG, URBAN_SPEED_KMH,
+    WINDOW_AM_FROM, WINDOW_AM_TO, WINDOW_PM_FROM, WINDOW_PM_TO,
+)
+from app.core.haversine import haversine_minutes  # noqa: E402
+from app.services import route_optimizer  # noqa: E402
+from app.services.route_optimizer import RoutePoint  # noqa: E402
+
+DEFAULT_SIZES = [50, 100, 200, 500]
+DEFAULT_SEEDS = [1, 2, 3]
+
+# Parámetros de simulación (mismos defaults que config_ruta)
+HORA_INICIO_MIN = 9 * 60
+TIEMPO_ESPERA_MIN = 10.0
+EVITAR_SALTOS_MIN = 25.0
+
+
+@dataclass
+class Instance:
+    name: str
+    seed: int
+    points: list[RoutePoint]
+    matrix: list[list[float]]
+    depot_lat: float = DEPOT_LAT
+    depot_lng: float = DEPOT_LNG
+
+
+@dataclass
+class EngineResult:
+    order: list[int]        # idx de RoutePoint en orden de visita
+    excluded: list[int]
+
+
+# ---------------------------------------------------------------------------
+# Generación de instancias
+# ---------------------------------------------------------------------------
+
+def generate_instance(n: int, seed: int) -> Instance:
+    """
+    Instancia reproducible: ~80% de los puntos alrededor de centros urbanos
+    conocidos (Gran Mendoza), el resto uniforme en el bbox provincial.
+    """
+    rng = random.Random(f"{n}-{seed}")
+    points: list[RoutePoint] = []
+    for i in range(n):
+        if rng.random() < 0.8:
+            clat, clng = rng.choice(KNOWN_CITY_CENTERS)
+            lat = rng.gauss(clat, 0.03)
+            lng = rng.gauss(clng, 0.03)
+        else:
+            lat = rng.uniform(MENDOZA_LAT_MIN, MENDOZA_LAT_MAX)
+            lng = rng.uniform(MENDOZA_LNG_MIN, MENDOZA_LNG_MAX)
+        lat = min(max(lat, MENDOZA_LAT_MIN), MENDOZA_LAT_MAX)
+        lng = min(max(lng, MENDOZA_LNG_MIN), MENDOZA_LNG_MAX)
+
+        r = rng.random()
+        if r < 0.30:
+            ventana_tipo, desde, hasta = "AM", WINDOW_AM_FROM, WINDOW_AM_TO
+        elif r < 0.55:
+            ventana_tipo, desde, hasta = "PM", WINDOW_PM_FROM, WINDOW_PM_TO
+        else:
+            ventana_tipo, desde, hasta = "SIN_HORARIO", None, None
+
+        points.append(RoutePoint(
+            idx=i,
+            lat=lat,
+            lng=lng,
+            remito_id=i + 1,
+            numero=f"BENCH{i:04d}",
+            cliente=f"Cliente {i}",
+            direccion="",
+            observaciones="",
+            urgente=rng.random() < 0.05,
+            prioridad=rng.random() < 0.15,
+            ventana_tipo=ventana_tipo,
+            ventana_desde_min=desde,
+            ventana_hasta_min=hasta,
+            llamar_antes=rng.random() < 0.1,
+        ))
+
+    matrix = [[
+        haversine_minutes(a.lat, a.lng, b.lat, b.lng, URBAN_SPEED_KMH) if a.idx != b.idx else 0.0
+        for b in points
+    ] for a in points]
+
+    return Instance(name=f"n{n}_s{seed}", seed=seed, points=points, matrix=matrix)
+
+
+# ---------------------------------------------------------------------------
+# Motores
+# ---------------------------------------------------------------------------
+
+def _closest_to_depot(inst: Instance) -> int:
+    return min(
+        range(len(inst.points)),
+        key=lambda i: haversine_minutes(
+            inst.depot_lat, inst.depot_lng, inst.points[i].lat, inst.points[i].lng
+        ),
+    )
+
+
+def engine_optimize(inst: Instance) -> EngineResult:
+    res = route_optimizer.optimize(
+        inst.points, inst.matrix, inst.depot_lat, inst.depot_lng, EVITAR_SALTOS_MIN
+    )
+    return EngineResult(order=[p.idx for p in res.ordered_points], excluded=list(res.excluded_idxs))
+
+
+def engine_nearest_neighbor(inst: Instance) -> EngineResult:
+    order = route_optimizer.nearest_neighbor(inst.matrix, start=_closest_to_depot(inst))
+    return EngineResult(order=order, excluded=[])
+
+
+def engine_two_opt(inst: Instance) -> EngineResult:
+    start = route_optimizer.nearest_neighbor(inst.matrix, start=_closest_to_depot(inst))
+    order = route_optimizer.two_opt(list(start), inst.matrix)
+    return EngineResult(order=order, excluded=[])
+
+
+def engine_sweep(inst: Instance) -> EngineResult:
+    order = route_optimizer.sweep(inst.depot_lat, inst.depot_lng, inst.points)
+    return EngineResult(order=order, excluded=[])
+
+
+# Registrar acá los motores nuevos: nombre → fn(Instance) -> EngineResult
+ENGINES: dict[str, Callable[[Instance], EngineResult]] = {
+    "optimize": engine_optimize,
+    "nearest_neighbor": engine_nearest_neighbor,
+    "two_opt": engine_two_opt,
+    "sweep": engine_sweep,
+}
+
+
+# ---------------------------------------------------------------------------
+# Métricas
+# ---------------------------------------------------------------------------
+
+def tour_cost(inst: Instance, order: list[int]) -> float:
+    """Minutos de manejo depósito → paradas → depósito."""
+    if not order:
+        return 0.0
+    pts = inst.points
+    first, last = pts[order[0]], pts[order[-1]]
+    cost = haversine_minutes(inst.depot_lat, inst.depot_lng, first.lat, first.lng, URBAN_SPEED_KMH)
+    for a, b in zip(order, order[1:]):
+        cost += inst.matrix[a][b]
+    cost += haversine_minutes(last.lat, last.lng, inst.depot_lat, inst.depot_lng, URBAN_SPEED_KMH)
+    return cost
+
+
+def window_violations(inst: Instance, order: list[int]) -> int:
+    """Paradas cuya llegada estimada cae después del cierre de su ventana."""
+    pts = inst.points
+    clock = float(HORA_INICIO_MIN)
+    violations = 0
+    prev: Optional[int] = None
+    for i in order:
+        p = pts[i]
+        if prev is None:
+            clock += haversine_minutes(inst.depot_lat, inst.depot_lng, p.lat, p.lng, URBAN_SPEED_KMH)
+        else:
+            clock += inst.matrix[prev][i]
+        if p.ventana_desde_min is not None and clock < p.ventana_desde_min:
+            clock = float(p.ventana_desde_min)
+        if p.ventana_hasta_min is not None and clock > p.ventana_hasta_min:
+            violations += 1
+        clock += TIEMPO_ESPERA_MIN
+        prev = i
+    return violations
+
+
+def run_engine(name: str, inst: Instance, repeat: int) -> dict:
+    fn = ENGINES[name]
+    best_ms = math.inf
+    res: Optional[EngineResult] = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = fn(inst)
+        best_ms = min(best_ms, (time.perf_counter() - start) * 1000)
+    assert res is not None
+    return {
+        "instance": inst.name,
+        "n": len(inst.points),
+        "seed": inst.seed,
+        "engine": name,
+        "wall_ms": round(best_ms, 3),
+        "cost_min": round(tour_cost(inst, res.order), 3),
+        "stops": len(res.order),
+        "excluded": len(res.excluded),
+        "window_violations": window_violations(inst, res.order),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Comparación contra baseline
+# ---------------------------------------------------------------------------
+
+def compare(
+    current: dict,
+    baseline: dict,
+    max_slowdown: float,
+    max_cost_increase: float,
+) -> list[str]:
+    """Retorna la lista de regresiones (vacía si no hay)."""
+    base = {(r["instance"], r["engine"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["instance"], r["engine"]))
+        if not b:
+            continue
+        key = f"{r['engine']}@{r['instance']}"
+        if b["wall_ms"] > 0 and r["wall_ms"] > b["wall_ms"] * max_slowdown:
+            regressions.append(f"{key}: wall_ms {b['wall_ms']} → {r['wall_ms']}")
+        if b["cost_min"] > 0 and r["cost_min"] > b["cost_min"] * (1 + max_cost_increase):
+            regressions.append(f"{key}: cost_min {b['cost_min']} → {r['cost_min']}")
+        if r["window_violations"] > b["window_violations"]:
+            regressions.append(
+                f"{key}: window_violations {b['window_violations']} → {r['window_violations']}"
+            )
+        if r["excluded"] > b["excluded"]:
+            regressions.append(f"{key}: excluded {b['excluded']} → {r['excluded']}")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3, help="Corridas por caso (se reporta la mínima)")
+    parser.add_argument("--out", type=Path, help="Archivo JSON de salida (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--max-slowdown", type=float, default=1.5)
+    parser.add_argument("--max-cost-increase", type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    results = []
+    for n in args.sizes:
+        for seed in args.seeds:
+            inst = generate_instance(n, seed)
+            for name in args.engines:
+                results.append(run_engine(name, inst, args.repeat))
+
+    report = {
+        "meta": {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sizes": args.sizes,
+            "seeds": args.seeds,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        args.out.write_text(payload, encoding="utf-8")
+    else:
+        print(payload)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.max_slowdown, args.max_cost_increase)
+        for line in regressions:
+            print(f"REGRESION  {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
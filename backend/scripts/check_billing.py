@@ -0,0 +1,82 @@
+"""
+Verifica contra la base real que billing_service.track() deja una fila en
+billing_trace con latency_ms y response_code (tabla y columnas migradas,
+flush en lote funcionando), también cuando un wait_for corta la llamada
+(response_code 0). Borra las filas de prueba al terminar.
+
+Uso (desde backend/, o dentro del container del backend):
+    python -m scripts.check_billing
+Sale con código 1 si la fila no aparece o le faltan datos.
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import delete, select  # noqa: E402
+
+from app.database import AsyncSessionLocal, engine  # noqa: E402
+from app.models.billing import BillingTrace  # noqa: E402
+from app.services import billing_service  # noqa: E402
+
+
+class _FakeHTTPError(Exception):
+    status_code = 503
+
+
+async def _run() -> int:
+    run_id = f"check-billing-{uuid.uuid4().hex[:8]}"
+    billing_service.set_run_context(run_id, "check")
+    async with billing_service.track("check", "ok", units=3):
+        await asyncio.sleep(0.02)
+    try:
+        async with billing_service.track("check", "error"):
+            raise _FakeHTTPError("simulado")
+    except _FakeHTTPError:
+        pass
+
+    async def _slow() -> None:
+        async with billing_service.track("check", "timeout"):
+            await asyncio.sleep(1)
+    try:
+        await asyncio.wait_for(_slow(), 0.05)
+    except asyncio.TimeoutError:
+        pass
+    await billing_service.stop()   # fuerza el flush
+
+    async with AsyncSessionLocal() as db:
+        rows = {
+            r.sku: r for r in (await db.execute(
+                select(BillingTrace).where(BillingTrace.run_id == run_id)
+            )).scalars()
+        }
+        await db.execute(delete(BillingTrace).where(BillingTrace.run_id == run_id))
+        await db.commit()
+    await engine.dispose()
+
+    problems = []
+    ok, err, tmo = rows.get("ok"), rows.get("error"), rows.get("timeout")
+    if ok is None or err is None or tmo is None:
+        problems.append(f"filas encontradas: {sorted(rows)} (flush: {billing_service.stats()})")
+    else:
+        if ok.response_code != 200 or ok.units != 3 or not ok.latency_ms or ok.latency_ms < 20:
+            problems.append(f"ok: response_code={ok.response_code} units={ok.units} latency_ms={ok.latency_ms}")
+        if err.response_code != 503 or err.latency_ms is None:
+            problems.append(f"error: response_code={err.response_code} latency_ms={err.latency_ms}")
+        if tmo.response_code != 0 or tmo.latency_ms is None or tmo.latency_ms >= 1000:
+            problems.append(f"timeout: response_code={tmo.response_code} latency_ms={tmo.latency_ms}")
+    for p in problems:
+        print(f"FALLA  {p}")
+    if not problems:
+        print(f"OK  track() → billing_trace (latency_ms={ok.latency_ms}, response_code 200/503/0)")
+    return 1 if problems else 0
+
+
+def main() -> None:
+    sys.exit(asyncio.run(_run()))
+
+
+if __name__ == "__main__":
+    main()
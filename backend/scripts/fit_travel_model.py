@@ -0,0 +1,69 @@
+"""
+Ajusta el modelo de viaje por zonas (travel_zone_params) con las duraciones
+reales guardadas en distance_matrix_cache y, con ese modelo, los factores
+de tráfico por franja horaria (config_ruta) desde los tramos entre entregas
+reales. Muestra la comparación contra los valores actuales.
+
+Uso (desde backend/):
+    python -m scripts.fit_travel_model --dry-run
+    python -m scripts.fit_travel_model --min-samples 50
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core import time_buckets  # noqa: E402
+from app.database import AsyncSessionLocal  # noqa: E402
+from app.services import config_service, travel_model_service  # noqa: E402
+
+
+async def _run(min_samples: int, dry_run: bool) -> None:
+    async with AsyncSessionLocal() as db:
+        current = await travel_model_service.get_model(db)
+        fitted = await travel_model_service.fit(db, min_samples=min_samples)
+        for zone in current.zones:
+            new = fitted.get(zone.name)
+            if new is None:
+                print(f"  {zone.name:<11} sin datos suficientes "
+                      f"(queda {zone.speed_kmh:.1f} km/h x{zone.road_factor:.2f})")
+                continue
+            print(
+                f"  {zone.name:<11} {zone.speed_kmh:>5.1f} -> {new['speed_kmh']:>5.1f} km/h  "
+                f"x{zone.road_factor:.2f} -> x{new['road_factor']:.2f}  ({new['samples']} pares)"
+            )
+
+        # Los factores de tráfico se miden contra el modelo ya ajustado
+        model = current.with_overrides(
+            speeds={z: p["speed_kmh"] for z, p in fitted.items()},
+            road_factors={z: p["road_factor"] for z, p in fitted.items()},
+        )
+        factors = time_buckets.factors_from_config(await config_service.get_config(db))
+        traffic = await travel_model_service.fit_traffic(db, model, min_samples=min_samples)
+        for name in time_buckets.NAMES:
+            new = traffic.get(name)
+            if new is None:
+                print(f"  {name:<11} sin tramos suficientes (queda x{factors[name]:.2f})")
+                continue
+            print(f"  {name:<11} x{factors[name]:.2f} -> x{new['factor']:.2f}  ({new['samples']} tramos)")
+
+        if dry_run:
+            return
+        await travel_model_service.save(db, fitted)
+        await travel_model_service.save_traffic(db, traffic)
+        await db.commit()
+        print(f"Guardadas {len(fitted)} zonas y {len(traffic)} franjas")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--min-samples", type=int, default=travel_model_service.MIN_SAMPLES)
+    ap.add_argument("--dry-run", action="store_true", help="sólo mostrar, no guardar")
+    args = ap.parse_args()
+    asyncio.run(_run(args.min_samples, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Servidor local compatible con la Table API de OSRM, para tests y corridas
+sin red. No usa red vial: las duraciones y distancias salen del modelo por
+zonas de app/core/travel_model.py (haversine × factor de desvío, velocidad
+por zona).
+
+Implementa GET /table/v1/{profile}/{lng,lat;lng,lat;...} con los parámetros
+sources, destinations y annotations (duration, distance) de OSRM. Las
+duraciones se devuelven en segundos y las distancias en metros.
+
+Uso (desde backend/):
+    python -m scripts.osrm_local --port 5001
+    python -m scripts.osrm_local --road-factor 1.4 --profile zonas.json --latency-ms 150
+
+y en el backend OSRM_BASE_URL=http://localhost:5001 con proveedor_matrix=osrm.
+
+--profile es un JSON {"centro": {"speed_kmh": 20, "road_factor": 1.4}, ...}
+con las zonas a pisar; --road-factor pisa el factor de todas las zonas.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.core.travel_model import TravelModel, default_model  # noqa: E402
+
+MAX_COORDINATES = 1000
+
+
+class _InvalidQuery(Exception):
+    pass
+
+
+def _parse_coordinates(raw: str) -> list[tuple[float, float]]:
+    """'lng,lat;lng,lat' → [(lat, lng)]"""
+    points = []
+    for part in raw.split(";"):
+        try:
+            lng_s, lat_s = part.split(",")
+            lng, lat = float(lng_s), float(lat_s)
+        except ValueError:
+            raise _InvalidQuery(f"Coordenada inválida: {part!r}")
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise _InvalidQuery(f"Coordenada fuera de rango: {part!r}")
+        points.append((lat, lng))
+    if len(points) < 1 or len(points) > MAX_COORDINATES:
+        raise _InvalidQuery(f"Se aceptan entre 1 y {MAX_COORDINATES} coordenadas")
+    return points
+
+
+def _parse_indexes(raw: Optional[str], n: int) -> list[int]:
+    if raw is None or raw == "all":
+        return list(range(n))
+    try:
+        idx = [int(i) for i in raw.split(";")]
+    except ValueError:
+        raise _InvalidQuery(f"Índices inválidos: {raw!r}")
+    if any(i < 0 or i >= n for i in idx):
+        raise _InvalidQuery(f"Índice fuera de rango: {raw!r}")
+    return idx
+
+
+def _waypoint(point: tuple[float, float]) -> dict:
+    lat, lng = point
+    return {"location": [lng, lat], "name": "", "distance": 0.0}
+
+
+def create_app(model: TravelModel = default_model, latency_ms: float = 0.0) -> FastAPI:
+    app = FastAPI(title="OSRM local (modelo por zonas)")
+
+    @app.exception_handler(_InvalidQuery)
+    async def _invalid(_, exc: _InvalidQuery):
+        return JSONResponse(status_code=400, content={"code": "InvalidQuery", "message": str(exc)})
+
+    @app.get("/table/v1/{profile}/{coordinates}")
+    async def table(
+        profile: str,
+        coordinates: str,
+        sources: Optional[str] = None,
+        destinations: Optional[str] = None,
+        annotations: str = "duration",
+    ):
+        points = _parse_coordinates(coordinates)
+        src = [points[i] for i in _parse_indexes(sources, len(points))]
+        dst = [points[i] for i in _parse_indexes(destinations, len(points))]
+        wanted = set(annotations.split(","))
+        if not wanted or not wanted <= {"duration", "distance"}:
+            raise _InvalidQuery(f"annotations inválido: {annotations!r}")
+
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        minutes, km = model.matrix(src, dst)
+        body = {
+            "code": "Ok",
+            "sources": [_waypoint(p) for p in src],
+            "destinations": [_waypoint(p) for p in dst],
+        }
+        if "duration" in wanted:
+            body["durations"] = [[round(m * 60, 1) for m in row] for row in minutes]
+        if "distance" in wanted:
+            body["distances"] = [[round(k * 1000, 1) for k in row] for row in km]
+        return body
+
+    return app
+
+
+def load_model(profile_path: Optional[str], road_factor: Optional[float]) -> TravelModel:
+    speeds: dict[str, float] = {}
+    factors: dict[str, float] = {}
+    if profile_path:
+        for name, params in json.loads(Path(profile_path).read_text()).items():
+            if "speed_kmh" in params:
+                speeds[name] = float(params["speed_kmh"])
+            if "road_factor" in params:
+                factors[name] = float(params["road_factor"])
+    if road_factor is not None:
+        factors = {z.name: road_factor for z in default_model.zones}
+    return default_model.with_overrides(speeds, factors)
+
+
+def main() -> None:
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5001)
+    ap.add_argument("--road-factor", type=float, default=None, help="factor de desvío para todas las zonas")
+    ap.add_argument("--profile", default=None, help="JSON con speed_kmh / road_factor por zona")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="latencia simulada por request")
+    args = ap.parse_args()
+
+    model = load_model(args.profile, args.road_factor)
+    for z in model.zones:
+        print(f"  {z.name:<11} <= {z.max_km:>5} km  {z.speed_kmh:>5.1f} km/h  x{z.road_factor:.2f}")
+    uvicorn.run(create_app(model, args.latency_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
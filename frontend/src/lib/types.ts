@@ -128,6 +128,7 @@ export interface Ruta {
   paradas: RutaParada[];
   excluidos: RutaExcluido[];
   config: Record<string, string | number | boolean>;
+  perf_profile?: Record<string, unknown> | null;
   api_cost_estimate?: number;
   created_at?: string;
 }
@@ -199,6 +200,7 @@ export interface PaginatedResponse<T> {
   page: number;
   size: number;
   pages: number;
+  next_cursor?: string | null;
 }
 
 // ── QR ────────────────────────────────────────────────────────────────────────
@@ -32,6 +32,7 @@ ADMIN_EMAIL    = "admin@molymarket.com"
 ADMIN_PASSWORD = "admin1234"
 
 POSTGRES_CONTAINER = "molymarket-postgres"
+BACKEND_CONTAINER  = "molymarket-backend"
 POSTGRES_USER      = "moly"
 POSTGRES_DB        = "molymarket"
 
@@ -442,6 +443,30 @@ def t14_geocoding_stats() -> None:
     _ok("geocoding stats endpoint reachable")
 
 
+def t15_billing_traces() -> None:
+    """billing_service.track() persiste una fila con latency_ms y response_code."""
+    _section("15  BILLING TRACES")
+
+    try:
+        res = subprocess.run(
+            ["docker", "exec", BACKEND_CONTAINER, "python", "-m", "scripts.check_billing"],
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+    except FileNotFoundError:
+        _fail("check_billing", "'docker' no encontrado en PATH")
+        return
+    out = (res.stdout + res.stderr).strip()
+    if res.returncode == 0:
+        _ok("tracked call → billing_trace row", out.splitlines()[-1] if out else "")
+    else:
+        _fail("tracked call → billing_trace row", out[-300:])
+
+    d = _get("/billing/health")
+    _eq("billing flush ok", d.get("ok"), True)
+
+
 # ══════════════════════════════════════════════════════════════════════════════════
 #  MAIN
 # ══════════════════════════════════════════════════════════════════════════════════
@@ -461,6 +486,7 @@ STEPS = [
     t12_verify_historico,
     t13_dashboard,
     t14_geocoding_stats,
+    t15_billing_traces,
 ]
 
 